@@ -1,54 +1,331 @@
+import asyncio
 import os
-import requests
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
 import google.auth.transport.requests
 import google.oauth2.id_token
-from fastapi import FastAPI, Request, UploadFile, File
-from fastapi.responses import FileResponse, JSONResponse
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from typing import List
-
-app = FastAPI()
+from google.auth import jwt
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
 
 BACKEND_URL = os.environ.get("SERVICE_URL")
 
+# Backend HTTP client settings.
+HTTP_TIMEOUT = float(os.environ.get("BACKEND_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("BACKEND_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("BACKEND_MAX_KEEPALIVE", "50"))
+# Connection failures are retried for every request; idempotent GETs are
+# also retried on 502/503/504 with exponential backoff.
+HTTP_RETRIES = int(os.environ.get("BACKEND_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.environ.get("BACKEND_RETRY_BACKOFF", "0.2"))
+RETRY_STATUSES = {502, 503, 504}
+
+# ID tokens are reused until this many seconds before they expire.
+ID_TOKEN_REFRESH_MARGIN = float(os.environ.get("ID_TOKEN_REFRESH_MARGIN", "300"))
+
+# Every request carries a trace id, taken from the incoming X-Trace-Id or
+# generated here, which is forwarded to the backend and echoed back.
+TRACE_HEADER = "X-Trace-Id"
+_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+REQUEST_SECONDS = Histogram(
+    "frontend_request_seconds", "Request latency by endpoint.",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "frontend_stage_seconds", "Latency of one stage of request handling.",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+ID_TOKEN_FETCHES = Counter("frontend_id_token_fetches_total", "ID tokens fetched from the metadata server.")
+BACKEND_RESPONSES = Counter("frontend_backend_responses_total", "Backend responses by status.", ["status"])
+
+# Per-request Server-Timing entries and trace id.
+_server_timing: ContextVar[list | None] = ContextVar("server_timing", default=None)
+_trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Times the enclosed block into frontend_stage_seconds and Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(seconds)
+        timings = _server_timing.get()
+        if timings is not None:
+            timings.append(f"{name};dur={seconds * 1000:.2f}")
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no extra task or body buffering per request):
+    records request latency, assigns the trace id and adds the Server-Timing
+    and X-Trace-Id response headers.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope["headers"]).get(TRACE_HEADER.lower().encode(), b"").decode("latin-1")
+        trace_id = incoming if _TRACE_ID.match(incoming) else uuid.uuid4().hex
+        timings = []
+        timing_token = _server_timing.set(timings)
+        trace_token = _trace_id.set(trace_id)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                entries = [*timings, f"total;dur={(time.perf_counter() - start) * 1000:.2f}"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", ", ".join(entries).encode("latin-1")),
+                    (TRACE_HEADER.lower().encode(), trace_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _server_timing.reset(timing_token)
+            _trace_id.reset(trace_token)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            if endpoint != "/metrics":
+                REQUEST_SECONDS.labels(endpoint, scope["method"], str(status)).observe(time.perf_counter() - start)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class IDTokenCache:
+    """
+    Caches Google-signed ID tokens per audience until shortly before they
+    expire. Fetching is blocking, so it runs in a thread, and concurrent
+    requests for the same audience wait on a single fetch.
+    """
+    def __init__(self, refresh_margin: float = ID_TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._tokens = {}  # audience -> (token, expires_at)
+        self._locks = {}
+
+    def _fetch(self, audience: str) -> tuple[str, float]:
+        auth_req = google.auth.transport.requests.Request()
+        token = google.oauth2.id_token.fetch_id_token(auth_req, audience)
+        ID_TOKEN_FETCHES.inc()
+        # Only the expiry is needed here; the backend verifies the signature.
+        claims = jwt.decode(token, verify=False)
+        return token, float(claims["exp"])
+
+    async def get(self, audience: str) -> str:
+        cached = self._tokens.get(audience)
+        if cached and cached[1] - self.refresh_margin > time.time():
+            return cached[0]
+        lock = self._locks.setdefault(audience, asyncio.Lock())
+        async with lock:
+            cached = self._tokens.get(audience)
+            if cached and cached[1] - self.refresh_margin > time.time():
+                return cached[0]
+            self._tokens[audience] = await asyncio.to_thread(self._fetch, audience)
+            return self._tokens[audience][0]
+
+
+id_tokens = IDTokenCache()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client per worker: connections to the backend are kept alive
+    # and, when h2 is installed, multiplexed over HTTP/2.
+    http2 = _http2_available()
+    app.state.http = httpx.AsyncClient(
+        base_url=BACKEND_URL or "",
+        http2=http2,
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        transport=httpx.AsyncHTTPTransport(retries=HTTP_RETRIES, http2=http2),
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/")
 async def read_index():
     return FileResponse('templates/index.html')
 
-def get_id_token():
-    """Helper function to get a Google-signed ID token."""
-    auth_req = google.auth.transport.requests.Request()
-    id_token = google.oauth2.id_token.fetch_id_token(auth_req, BACKEND_URL)
-    return id_token
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# Backend response headers copied onto the proxied response. X-Next-Cursor
+# is the opaque token of the next page of search results.
+PASSTHROUGH_HEADERS = ("content-type", "content-encoding", "vary", "x-next-cursor")
+
+async def backend_request(request: Request, method: str, path: str, **kwargs) -> httpx.Response:
+    """
+    Sends an authenticated request to the backend over the shared client.
+    The client's Accept-Encoding is forwarded and the body is left unread
+    and undecoded, for backend_passthrough.
+    """
+    client: httpx.AsyncClient = request.app.state.http
+    with stage("id_token"):
+        token = await id_tokens.get(BACKEND_URL)
+    headers = {
+        **kwargs.pop("headers", {}),
+        "Authorization": f"Bearer {token}",
+        TRACE_HEADER: _trace_id.get(),
+        "Accept-Encoding": request.headers.get("accept-encoding", "identity"),
+    }
+    attempts = HTTP_RETRIES + 1 if method == "GET" else 1
+    with stage("backend"):
+        for attempt in range(attempts):
+            backend = client.build_request(method, path, headers=headers, **kwargs)
+            response = await client.send(backend, stream=True)
+            BACKEND_RESPONSES.labels(str(response.status_code)).inc()
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                break
+            await response.aclose()
+            await asyncio.sleep(HTTP_RETRY_BACKOFF * 2 ** attempt)
+    # The backend's own stages are passed on, prefixed, so one header shows
+    # where the whole request went.
+    timings = _server_timing.get()
+    if timings is not None and "server-timing" in response.headers:
+        timings.extend(f"backend-{entry.strip()}" for entry in response.headers["server-timing"].split(","))
+    if response.is_error:
+        await response.aclose()
+    response.raise_for_status()
+    return response
+
+async def backend_passthrough(response: httpx.Response) -> Response:
+    """
+    Relays a backend response body as received, still compressed if the
+    backend compressed it: the frontend never parses or re-encodes JSON.
+    """
+    with stage("relay"):
+        try:
+            body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+    headers = {name: response.headers[name] for name in PASSTHROUGH_HEADERS if name in response.headers}
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+def backend_error(e: Exception) -> JSONResponse:
+    status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else 502
+    return JSONResponse(status_code=status_code, content={"message": f"Error communicating with backend: {e}"})
 
 @app.get("/api/search")
-async def search_proxy(query: str, top_k: int = 3):
+async def search_proxy(
+    request: Request, query: str, top_k: int = 3, mode: str = "vector",
+    fields: str | None = None, snippet: int | None = None, cursor: str | None = None,
+    collapse: bool | None = None, ef_search: int | None = None, probes: int | None = None,
+):
+    if not BACKEND_URL:
+        return JSONResponse(status_code=500, content={"message": "Backend service URL not configured."})
+    params = {"query": query, "top_k": top_k, "mode": mode}
+    optional = {
+        "fields": fields, "snippet": snippet, "cursor": cursor,
+        "collapse": None if collapse is None else str(collapse).lower(),
+        "ef_search": ef_search, "probes": probes,
+    }
+    params.update({name: value for name, value in optional.items() if value is not None})
+    try:
+        response = await backend_request(request, "GET", "/documents/search", params=params)
+        return await backend_passthrough(response)
+    except Exception as e:
+        return backend_error(e)
+
+@app.post("/api/search/batch")
+async def search_batch_proxy(request: Request):
+    """Forwards a batch of queries ({"queries": [...], "top_k": ...}) as-is."""
+    if not BACKEND_URL:
+        return JSONResponse(status_code=500, content={"message": "Backend service URL not configured."})
+    try:
+        response = await backend_request(
+            request, "POST", "/documents/search/batch",
+            content=await request.body(), headers={"Content-Type": "application/json"},
+        )
+        return await backend_passthrough(response)
+    except Exception as e:
+        return backend_error(e)
+
+@app.get("/api/documents")
+async def documents_proxy(request: Request):
+    """Lists stored documents a page at a time (?limit=, ?cursor=)."""
     if not BACKEND_URL:
         return JSONResponse(status_code=500, content={"message": "Backend service URL not configured."})
     try:
-        headers = {"Authorization": f"Bearer {get_id_token()}"}
-        search_url = f"{BACKEND_URL}/documents/search?query={query}&top_k={top_k}"
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()
-        return JSONResponse(content=response.json())
+        response = await backend_request(request, "GET", "/documents", params=request.query_params)
+        return await backend_passthrough(response)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"message": f"Error communicating with backend: {e}"})
+        return backend_error(e)
 
 @app.post("/api/upload")
-async def upload_proxy(files: List[UploadFile] = File(...)):
+async def upload_proxy(request: Request):
+    """
+    Streams the multipart body to the backend chunk by chunk, without
+    parsing or buffering it here. The backend replies with one job per file.
+    """
+    if not BACKEND_URL:
+        return JSONResponse(status_code=500, content={"message": "Backend service URL not configured."})
+    headers = {"Content-Type": request.headers.get("content-type", "")}
+    if "content-length" in request.headers:
+        headers["Content-Length"] = request.headers["content-length"]
+    try:
+        response = await backend_request(
+            request, "POST", "/documents/upload",
+            params=request.query_params, content=request.stream(), headers=headers,
+        )
+        return await backend_passthrough(response)
+    except Exception as e:
+        return backend_error(e)
+
+@app.get("/api/jobs")
+async def jobs_proxy(request: Request):
+    if not BACKEND_URL:
+        return JSONResponse(status_code=500, content={"message": "Backend service URL not configured."})
+    try:
+        response = await backend_request(request, "GET", "/jobs", params=request.query_params)
+        return await backend_passthrough(response)
+    except Exception as e:
+        return backend_error(e)
+
+@app.get("/api/jobs/{job_id}")
+async def job_proxy(request: Request, job_id: str):
     if not BACKEND_URL:
         return JSONResponse(status_code=500, content={"message": "Backend service URL not configured."})
     try:
-        headers = {"Authorization": f"Bearer {get_id_token()}"}
-        upload_url = f"{BACKEND_URL}/documents/upload"
-        
-        file_list = [("files", (file.filename, file.file, file.content_type)) for file in files]
-        
-        response = requests.post(upload_url, headers=headers, files=file_list)
-        response.raise_for_status()
-        
-        return JSONResponse(content=response.json())
+        response = await backend_request(request, "GET", f"/jobs/{job_id}")
+        return await backend_passthrough(response)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"message": f"Error communicating with backend: {e}"})
\ No newline at end of file
+        return backend_error(e)
@@ -8,6 +8,25 @@ document.addEventListener("DOMContentLoaded", () => {
     const searchInput = document.getElementById("search-input");
     const conversationLog = document.getElementById("conversation-log");
 
+    // Search hits carry only what is shown, with content cut to a snippet
+    // around the query terms.
+    const RESULT_FIELDS = "title,source,content";
+    const SNIPPET_CHARS = 400;
+
+    const escapeHtml = (text) => text.replace(/[&<>"']/g, (c) => (
+        {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c]
+    ));
+
+    // Escapes a snippet and wraps its [start, end) highlight ranges in <mark>.
+    const highlight = (text, ranges = []) => {
+        let html = "", last = 0;
+        for (const [start, end] of ranges) {
+            html += escapeHtml(text.slice(last, start)) + `<mark>${escapeHtml(text.slice(start, end))}</mark>`;
+            last = end;
+        }
+        return (html + escapeHtml(text.slice(last))).replace(/\n/g, "<br>");
+    };
+
     // Update file list display when files are selected
     if (fileInput) {
         fileInput.addEventListener("change", () => {
@@ -20,6 +39,50 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
+    // A job that is unknown (404, e.g. after a backend restart) or keeps
+    // failing to poll is reported as failed instead of being polled forever.
+    const MAX_POLL_FAILURES = 5;
+
+    // Poll ingestion jobs until every uploaded file is processed
+    async function pollJobs(jobs) {
+        const pending = new Map(jobs.map(job => [job.id, job]));
+        const failures = new Map();
+        const finished = [];
+        while (pending.size > 0) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            for (const id of Array.from(pending.keys())) {
+                let response = null;
+                try {
+                    response = await fetch(`/api/jobs/${id}`);
+                } catch (error) {
+                    console.error("Job poll failed:", error);
+                }
+                if (!response || !response.ok) {
+                    const count = (failures.get(id) || 0) + 1;
+                    failures.set(id, count);
+                    if ((response && response.status === 404) || count >= MAX_POLL_FAILURES) {
+                        finished.push({...pending.get(id), status: "failed"});
+                        pending.delete(id);
+                    }
+                    continue;
+                }
+                failures.delete(id);
+                const job = await response.json();
+                // "stored" covers duplicates too: they finish with duplicate_of set.
+                if (job.status === "stored" || job.status === "failed") {
+                    pending.delete(id);
+                    finished.push(job);
+                }
+            }
+            const failed = finished.filter(job => job.status === "failed");
+            const duplicates = finished.filter(job => job.status === "stored" && job.duplicate_of);
+            messageArea.textContent = `Processed ${finished.length}/${jobs.length} file(s)` +
+                (duplicates.length ? ` (skipped duplicates: ${duplicates.map(job => job.filename).join(", ")})` : "") +
+                (failed.length ? ` (failed: ${failed.map(job => job.filename).join(", ")})` : "") + ".";
+            messageArea.className = failed.length ? "status-message error" : "status-message success";
+        }
+    }
+
     // Handle upload form submission
     if (uploadForm) {
         uploadForm.addEventListener("submit", async (event) => {
@@ -54,8 +117,10 @@ document.addEventListener("DOMContentLoaded", () => {
                 }
 
                 const result = await response.json();
-                messageArea.textContent = `✅ Success! ${result.message || "Files uploaded."}`;
+                const jobs = result.jobs || [];
+                messageArea.textContent = `✅ Uploaded ${jobs.length} file(s). Processing...`;
                 messageArea.className = "status-message success";
+                pollJobs(jobs);
                 
                 // Clear the form
                 uploadForm.reset();
@@ -86,7 +151,9 @@ document.addEventListener("DOMContentLoaded", () => {
             conversationLog.scrollTop = conversationLog.scrollHeight;
 
             try {
-                const response = await fetch(`/api/search?query=${encodeURIComponent(query)}`);
+                const response = await fetch(
+                    `/api/search?query=${encodeURIComponent(query)}&fields=${RESULT_FIELDS}&snippet=${SNIPPET_CHARS}`
+                );
                 if (!response.ok) {
                     const errorData = await response.json();
                     throw new Error(errorData.message || "Search failed");
@@ -99,9 +166,9 @@ document.addEventListener("DOMContentLoaded", () => {
                 if (results.length > 0) {
                     botMessageDiv.innerHTML = results.map(doc => 
                         `<div>
-                            <strong>${doc.title}</strong><br>
-                            <small>${doc.source}</small><br>
-                            <p>${doc.content.replace(/\n/g, '<br>')}</p>
+                            <strong>${escapeHtml(doc.title || "")}</strong><br>
+                            <small>${escapeHtml(doc.source || "")}</small><br>
+                            <p>${highlight(doc.content, doc.highlights)}</p>
                         </div>`
                     ).join('<hr>');
                 } else {
@@ -13,11 +13,22 @@ def create_app():
     from . import db
     app.teardown_appcontext(db.close_db)
 
+    # Request timing, Server-Timing headers and trace ids
+    from . import metrics
+    metrics.init_app(app)
+
+    # Fast JSON and gzip/br compression; registered after metrics so the
+    # compression is timed in Server-Timing
+    from . import responses
+    responses.init_app(app)
+
     # Import and register blueprints
     from .main import main_bp
     from .views.upload import upload_bp
+    from .app.routes import routes
 
     app.register_blueprint(main_bp)
     app.register_blueprint(upload_bp)
+    app.register_blueprint(routes)
 
     return app
\ No newline at end of file
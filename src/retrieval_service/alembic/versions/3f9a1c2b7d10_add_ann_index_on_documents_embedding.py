@@ -0,0 +1,55 @@
+"""Add ANN index on documents.embedding
+
+Revision ID: 3f9a1c2b7d10
+Revises: initial_migration
+Create Date: 2025-08-18 10:00:00.000000
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2b7d10'
+down_revision = 'initial_migration'
+branch_labels = None
+depends_on = None
+
+# "hnsw" (default) or "ivfflat". HNSW gives better recall/latency and needs no
+# training data; IVFFlat builds faster and uses less memory on large corpora.
+INDEX_TYPE = os.environ.get("VECTOR_INDEX_TYPE", "hnsw").lower()
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so the
+    # index is built in an autocommit block. Searches and inserts keep working
+    # while the index is being built.
+    with op.get_context().autocommit_block():
+        op.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+        if INDEX_TYPE == "ivfflat":
+            # Rule of thumb from the pgvector docs: rows / 1000 lists for up to
+            # 1M rows. The index should be built after the initial data load.
+            lists = op.get_bind().execute(
+                sa.text("SELECT GREATEST(COUNT(*) / 1000, 10) FROM documents")
+            ).scalar()
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_ann "
+                "ON documents USING ivfflat (embedding vector_cosine_ops) "
+                f"WITH (lists = {int(lists)})"
+            )
+        else:
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_ann "
+                "ON documents USING hnsw (embedding vector_cosine_ops) "
+                f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_ann")
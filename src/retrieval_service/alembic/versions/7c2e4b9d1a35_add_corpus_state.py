@@ -0,0 +1,34 @@
+"""Add corpus_state version counter
+
+Revision ID: 7c2e4b9d1a35
+Revises: 3f9a1c2b7d10
+Create Date: 2025-08-20 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e4b9d1a35'
+down_revision = '3f9a1c2b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Single-row table holding a counter that is bumped in the same
+    # transaction as every write to the corpus. Search-result caches key on
+    # it, so cached results become unreachable as soon as the corpus changes.
+    op.create_table('corpus_state',
+        sa.Column('id', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint('id = 1', name='corpus_state_single_row'),
+    )
+    op.execute("INSERT INTO corpus_state (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table('corpus_state')
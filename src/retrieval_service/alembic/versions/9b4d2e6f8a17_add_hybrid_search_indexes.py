@@ -0,0 +1,52 @@
+"""Add full-text and trigram indexes for hybrid search
+
+Revision ID: 9b4d2e6f8a17
+Revises: 7c2e4b9d1a35
+Create Date: 2025-08-22 11:00:00.000000
+
+"""
+import os
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4d2e6f8a17'
+down_revision = '7c2e4b9d1a35'
+branch_labels = None
+depends_on = None
+
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # 'simple' lowercases and splits on punctuation without stemming or stop
+    # words, which keeps identifiers (D01F, 10-2020-0012345) and Korean
+    # tokens intact. Adding a stored generated column rewrites the table.
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+        "GENERATED ALWAYS AS ("
+        "to_tsvector('simple', coalesce(title, '') || ' ' || content)"
+        ") STORED"
+    )
+    # Trigrams match Korean words regardless of attached particles, and
+    # partial identifiers. pg_trgm only indexes characters the database
+    # locale considers alphanumeric, so a UTF-8 locale (not C) is required.
+    with op.get_context().autocommit_block():
+        op.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_content_tsv "
+            "ON documents USING gin (content_tsv)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_content_trgm "
+            "ON documents USING gin (content gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_content_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_content_tsv")
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS content_tsv")
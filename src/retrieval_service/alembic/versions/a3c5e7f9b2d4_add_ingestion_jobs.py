@@ -0,0 +1,52 @@
+"""Add ingestion_jobs table for the background ingestion worker
+
+Revision ID: a3c5e7f9b2d4
+Revises: f7b2d9c4e1a6
+Create Date: 2025-09-03 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b2d4'
+down_revision = 'f7b2d9c4e1a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('ingestion_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        # gs://bucket/object or file:///path
+        sa.Column('source_uri', sa.Text(), nullable=False),
+        # Object generation (GCS) or size/mtime (files): a new version of the
+        # same object is a new job, a repeated notification is not.
+        sa.Column('generation', sa.Text(), nullable=False),
+        sa.Column('filename', sa.Text(), nullable=False),
+        sa.Column('extractor', sa.String(length=32), nullable=False),
+        # Set for files staged on one instance's disk: only that host may run them.
+        sa.Column('host', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='queued'),
+        sa.Column('chunks', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('duplicate_of', sa.Text(), nullable=True),
+        sa.Column('trace_id', sa.String(length=64), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source_uri', 'generation', name='ingestion_jobs_source_generation_key'),
+    )
+    op.create_index('ix_ingestion_jobs_created_at', 'ingestion_jobs', ['created_at'])
+    # Workers only ever scan unfinished jobs.
+    op.create_index(
+        'ix_ingestion_jobs_pending', 'ingestion_jobs', ['created_at'],
+        postgresql_where=sa.text("status IN ('queued', 'extracting', 'embedding')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ingestion_jobs')
@@ -0,0 +1,67 @@
+"""Add embedding_spaces registry for versioned embedding models
+
+Revision ID: b8d4f1a6c2e9
+Revises: a3c5e7f9b2d4
+Create Date: 2025-09-10 10:00:00.000000
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f1a6c2e9'
+down_revision = 'a3c5e7f9b2d4'
+branch_labels = None
+depends_on = None
+
+# The model that produced chunks.embedding, registered as the base space.
+EMBEDDING_MODEL_NAME = os.environ.get("EMBEDDING_MODEL_NAME", "text-embedding-004")
+
+
+def upgrade() -> None:
+    op.create_table('embedding_spaces',
+        sa.Column('id', sa.Integer(), sa.Identity(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.Text(), nullable=False),
+        sa.Column('dimensions', sa.Integer(), nullable=False),
+        # Shadow table holding the space's vectors (chunk_embeddings_<id>);
+        # NULL for the base space, chunks.embedding.
+        sa.Column('table_name', sa.String(length=63), nullable=True),
+        # backfilling -> indexing -> ready -> retired
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='backfilling'),
+        sa.Column('active', sa.Boolean(), nullable=False, server_default=sa.false()),
+        # Backfill progress: last chunk id embedded, with the work done so far.
+        sa.Column('backfill_cursor', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('rows_embedded', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('embed_seconds', sa.Float(precision=53), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('ready_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name', name='embedding_spaces_name_key'),
+        sa.UniqueConstraint('table_name', name='embedding_spaces_table_name_key'),
+    )
+    # Searches read exactly one space.
+    op.create_index(
+        'ix_embedding_spaces_active', 'embedding_spaces', ['active'],
+        unique=True, postgresql_where=sa.text('active'),
+    )
+    op.execute(
+        sa.text(
+            "INSERT INTO embedding_spaces (name, model, dimensions, status, active, ready_at) "
+            "VALUES (:model, :model, 768, 'ready', true, now())"
+        ).bindparams(model=EMBEDDING_MODEL_NAME)
+    )
+
+
+def downgrade() -> None:
+    # Shadow tables are created by the backfill tool; drop them with the registry.
+    bind = op.get_bind()
+    for (table_name,) in bind.execute(sa.text(
+        "SELECT table_name FROM embedding_spaces WHERE table_name IS NOT NULL"
+    )):
+        op.execute(f"DROP TABLE IF EXISTS {table_name}")
+    op.drop_table('embedding_spaces')
@@ -0,0 +1,218 @@
+"""Split documents into documents and chunks tables
+
+Revision ID: d41f7a3c9e20
+Revises: 9b4d2e6f8a17
+Create Date: 2025-08-25 10:00:00.000000
+
+"""
+import os
+import time
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f7a3c9e20'
+down_revision = '9b4d2e6f8a17'
+branch_labels = None
+depends_on = None
+
+# Rows copied per backfill transaction, and an optional pause between
+# batches to limit the load on a live database.
+BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "5000"))
+BATCH_SLEEP = float(os.environ.get("MIGRATION_BATCH_SLEEP", "0"))
+
+INDEX_TYPE = os.environ.get("VECTOR_INDEX_TYPE", "hnsw").lower()
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+
+# While the backfill runs, writes to the old table are mirrored into the new
+# ones, so the service keeps loading and searching on the old schema until
+# the final rename. An UPDATE is mirrored as a delete and a re-insert.
+MIRROR_FUNCTIONS = """
+CREATE FUNCTION documents_mirror_row() RETURNS trigger AS $$
+DECLARE
+    new_document_id bigint;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM chunks WHERE id = OLD.id;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        RETURN OLD;
+    END IF;
+    INSERT INTO documents_new (source, title, authors, publication_date)
+    VALUES (NEW.source, NEW.title, NEW.authors, NEW.publication_date)
+    ON CONFLICT (source) DO UPDATE
+        SET title = EXCLUDED.title,
+            authors = EXCLUDED.authors,
+            publication_date = EXCLUDED.publication_date
+    RETURNING id INTO new_document_id;
+    INSERT INTO chunks (id, document_id, content, embedding)
+    VALUES (NEW.id, new_document_id, NEW.content, NEW.embedding)
+    ON CONFLICT (id) DO NOTHING;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION documents_mirror_truncate() RETURNS trigger AS $$
+BEGIN
+    TRUNCATE chunks, documents_new;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+BACKFILL_DOCUMENTS_SQL = sa.text("""
+    INSERT INTO documents_new (source, title, authors, publication_date)
+    SELECT DISTINCT ON (source) source, title, authors, publication_date
+    FROM documents
+    WHERE id >= :low AND id < :high
+    ORDER BY source, id
+    ON CONFLICT (source) DO NOTHING
+""")
+
+BACKFILL_CHUNKS_SQL = sa.text("""
+    INSERT INTO chunks (id, document_id, content, embedding)
+    SELECT d.id, n.id, d.content, d.embedding
+    FROM documents AS d JOIN documents_new AS n ON n.source = d.source
+    WHERE d.id >= :low AND d.id < :high
+    ON CONFLICT (id) DO NOTHING
+""")
+
+
+def _create_chunk_indexes(table: str) -> None:
+    op.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+    if INDEX_TYPE == "ivfflat":
+        lists = op.get_bind().execute(
+            sa.text(f"SELECT GREATEST(COUNT(*) / 1000, 10) FROM {table}")
+        ).scalar()
+        ann = f"ivfflat (embedding vector_cosine_ops) WITH (lists = {int(lists)})"
+    else:
+        ann = f"hnsw (embedding vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_embedding_ann ON {table} USING {ann}")
+    op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_content_tsv ON {table} USING gin (content_tsv)")
+    op.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_content_trgm "
+        f"ON {table} USING gin (content gin_trgm_ops)"
+    )
+
+
+def upgrade() -> None:
+    # 1. New tables, plus triggers that mirror writes made during the backfill.
+    op.create_table('documents_new',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('source', sa.String(length=255), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('authors', sa.Text(), nullable=True),
+        sa.Column('publication_date', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id', name='documents_new_pkey'),
+        sa.UniqueConstraint('source', name='documents_new_source_key'),
+    )
+    # Chunk ids are the old documents ids, so ids seen by clients stay valid.
+    op.create_table('chunks',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('document_id', sa.BigInteger(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('embedding', Vector(dim=768), nullable=False),
+        sa.Column(
+            'content_tsv',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', content)", persisted=True),
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(
+            ['document_id'], ['documents_new.id'], name='chunks_document_id_fkey', ondelete='CASCADE'
+        ),
+    )
+    op.create_index('ix_chunks_document_id', 'chunks', ['document_id'])
+    op.execute(MIRROR_FUNCTIONS)
+    op.execute(
+        "CREATE TRIGGER documents_mirror_row AFTER INSERT OR UPDATE OR DELETE ON documents "
+        "FOR EACH ROW EXECUTE FUNCTION documents_mirror_row()"
+    )
+    op.execute(
+        "CREATE TRIGGER documents_mirror_truncate AFTER TRUNCATE ON documents "
+        "FOR EACH STATEMENT EXECUTE FUNCTION documents_mirror_truncate()"
+    )
+
+    # 2. Backfill existing rows in short autocommitted batches, then build the
+    #    chunk indexes without blocking the mirrored writes.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM documents")).one()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                params = {"low": start, "high": start + BATCH_SIZE}
+                bind.execute(BACKFILL_DOCUMENTS_SQL, params)
+                bind.execute(BACKFILL_CHUNKS_SQL, params)
+                if BATCH_SLEEP:
+                    time.sleep(BATCH_SLEEP)
+        _create_chunk_indexes("chunks")
+
+    # 3. Swap in one short transaction. Dropping the old table only unlinks
+    #    its files at commit. Mirrored inserts keep taking ids from the old
+    #    sequence until the lock, so the chunks sequence is moved past them
+    #    only once writes are blocked.
+    op.execute("LOCK TABLE documents IN ACCESS EXCLUSIVE MODE")
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('chunks', 'id'), "
+        "COALESCE(GREATEST((SELECT max(id) FROM chunks), (SELECT max(id) FROM documents)), 0) + 1, false)"
+    )
+    op.execute("DROP TABLE documents")
+    op.execute("DROP FUNCTION documents_mirror_row(), documents_mirror_truncate()")
+    op.rename_table('documents_new', 'documents')
+    op.execute("ALTER TABLE documents RENAME CONSTRAINT documents_new_pkey TO documents_pkey")
+    op.execute("ALTER TABLE documents RENAME CONSTRAINT documents_new_source_key TO documents_source_key")
+    op.execute("ALTER SEQUENCE documents_new_id_seq RENAME TO documents_id_seq")
+    op.execute("UPDATE corpus_state SET version = version + 1, updated_at = now() WHERE id = 1")
+
+
+def downgrade() -> None:
+    # Rebuilds the denormalized table offline; not meant for a live service.
+    op.create_table('documents_flat',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=255), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('authors', sa.Text(), nullable=True),
+        sa.Column('publication_date', sa.String(length=50), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('embedding', Vector(dim=768), nullable=False),
+        sa.Column(
+            'content_tsv',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', coalesce(title, '') || ' ' || content)", persisted=True),
+        ),
+        sa.PrimaryKeyConstraint('id', name='documents_flat_pkey'),
+    )
+    op.execute(
+        "INSERT INTO documents_flat (id, source, title, authors, publication_date, content, embedding) "
+        "SELECT c.id, d.source, d.title, d.authors, d.publication_date, c.content, c.embedding "
+        "FROM chunks AS c JOIN documents AS d ON d.id = c.document_id"
+    )
+    op.drop_table('chunks')
+    op.drop_table('documents')
+    op.rename_table('documents_flat', 'documents')
+    op.execute("ALTER TABLE documents RENAME CONSTRAINT documents_flat_pkey TO documents_pkey")
+    op.execute("CREATE SEQUENCE documents_id_seq OWNED BY documents.id")
+    op.execute("ALTER TABLE documents ALTER COLUMN id SET DEFAULT nextval('documents_id_seq')")
+    op.execute("SELECT setval('documents_id_seq', COALESCE((SELECT max(id) FROM documents), 0) + 1, false)")
+    with op.get_context().autocommit_block():
+        op.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_ann "
+            "ON documents USING hnsw (embedding vector_cosine_ops) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_content_tsv "
+            "ON documents USING gin (content_tsv)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_content_trgm "
+            "ON documents USING gin (content gin_trgm_ops)"
+        )
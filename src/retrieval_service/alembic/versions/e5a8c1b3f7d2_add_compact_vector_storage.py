@@ -0,0 +1,108 @@
+"""Add compact (halfvec or bit) vector storage for chunks
+
+Revision ID: e5a8c1b3f7d2
+Revises: d41f7a3c9e20
+Create Date: 2025-08-27 10:00:00.000000
+
+Builds the storage for the VECTOR_STORAGE_MODE set when it runs. A service
+running a compact mode refuses to connect until its index exists; if this
+revision ran under another mode, build it without replaying the others:
+
+    alembic stamp d41f7a3c9e20
+    VECTOR_STORAGE_MODE=halfvec alembic upgrade e5a8c1b3f7d2
+    alembic stamp head
+"""
+import os
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c1b3f7d2'
+down_revision = 'd41f7a3c9e20'
+branch_labels = None
+depends_on = None
+
+# Must match the VECTOR_STORAGE_MODE the service runs with: "full" (no
+# change), "halfvec" or "bit". Needs pgvector >= 0.7 and, so that it can be
+# re-run for another mode, PostgreSQL >= 14.
+STORAGE_MODE = os.environ.get("VECTOR_STORAGE_MODE", "full").lower()
+# The float32 ANN index is what occupies memory; once searches go through
+# the compact index it is only dead weight. Set to "false" to keep it.
+DROP_FULL_INDEX = os.environ.get("DROP_FULL_VECTOR_INDEX", "true").lower() in ("1", "true", "yes")
+
+BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", "5000"))
+BATCH_SLEEP = float(os.environ.get("MIGRATION_BATCH_SLEEP", "0"))
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+
+# column, column type, expression computing it from {source}, index opclass
+MODES = {
+    "halfvec": ("embedding_half", "halfvec(768)", "CAST({source} AS halfvec(768))", "halfvec_cosine_ops"),
+    "bit": ("embedding_bit", "bit(768)", "CAST(binary_quantize({source}) AS bit(768))", "bit_hamming_ops"),
+}
+
+
+def upgrade() -> None:
+    if STORAGE_MODE == "full":
+        return
+    column, column_type, expression, opclass = MODES[STORAGE_MODE]
+
+    # A nullable column is added without rewriting the table. A trigger fills
+    # it for new and updated rows while existing rows are backfilled.
+    op.execute(f"ALTER TABLE chunks ADD COLUMN IF NOT EXISTS {column} {column_type}")
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION chunks_set_{column}() RETURNS trigger AS $$
+        BEGIN
+            NEW.{column} := {expression.format(source='NEW.embedding')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(
+        f"CREATE OR REPLACE TRIGGER chunks_set_{column} BEFORE INSERT OR UPDATE OF embedding ON chunks "
+        f"FOR EACH ROW EXECUTE FUNCTION chunks_set_{column}()"
+    )
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM chunks")).one()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                bind.execute(
+                    sa.text(
+                        f"UPDATE chunks SET {column} = {expression.format(source='embedding')} "
+                        f"WHERE id >= :low AND id < :high AND {column} IS NULL"
+                    ),
+                    {"low": start, "high": start + BATCH_SIZE},
+                )
+                if BATCH_SLEEP:
+                    time.sleep(BATCH_SLEEP)
+        op.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chunks_{column}_ann "
+            f"ON chunks USING hnsw ({column} {opclass}) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+        if DROP_FULL_INDEX:
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chunks_embedding_ann")
+
+
+def downgrade() -> None:
+    if STORAGE_MODE == "full":
+        return
+    column = MODES[STORAGE_MODE][0]
+    with op.get_context().autocommit_block():
+        op.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chunks_embedding_ann "
+            "ON chunks USING hnsw (embedding vector_cosine_ops) "
+            f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_chunks_{column}_ann")
+    op.execute(f"DROP TRIGGER IF EXISTS chunks_set_{column} ON chunks")
+    op.execute(f"DROP FUNCTION IF EXISTS chunks_set_{column}()")
+    op.execute(f"ALTER TABLE chunks DROP COLUMN IF EXISTS {column}")
@@ -0,0 +1,55 @@
+"""Add duplicate detection columns and MinHash LSH bands to documents
+
+Revision ID: f7b2d9c4e1a6
+Revises: e5a8c1b3f7d2
+Create Date: 2025-09-01 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b2d9c4e1a6'
+down_revision = 'e5a8c1b3f7d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nullable columns without defaults: no table rewrite. Existing documents
+    # simply have no fingerprint until they are re-ingested.
+    op.add_column('documents', sa.Column('canonical_id', sa.BigInteger(), nullable=True))
+    op.add_column('documents', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('minhash', sa.LargeBinary(), nullable=True))
+    op.create_foreign_key(
+        'documents_canonical_id_fkey', 'documents', 'documents',
+        ['canonical_id'], ['id'], ondelete='SET NULL',
+    )
+    op.create_index('ix_documents_content_sha256', 'documents', ['content_sha256'])
+    op.create_index(
+        'ix_documents_canonical_id', 'documents', ['canonical_id'],
+        postgresql_where=sa.text('canonical_id IS NOT NULL'),
+    )
+    # One row per (LSH band, band hash) of each canonical document; documents
+    # sharing any row are near-duplicate candidates.
+    op.create_table('document_minhash_bands',
+        sa.Column('band', sa.SmallInteger(), nullable=False),
+        sa.Column('hash', sa.BigInteger(), nullable=False),
+        sa.Column('document_id', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('band', 'hash', 'document_id'),
+        sa.ForeignKeyConstraint(
+            ['document_id'], ['documents.id'], name='document_minhash_bands_document_id_fkey', ondelete='CASCADE'
+        ),
+    )
+    op.create_index('ix_document_minhash_bands_document_id', 'document_minhash_bands', ['document_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('document_minhash_bands')
+    op.drop_index('ix_documents_canonical_id', table_name='documents')
+    op.drop_index('ix_documents_content_sha256', table_name='documents')
+    op.drop_constraint('documents_canonical_id_fkey', 'documents', type_='foreignkey')
+    op.drop_column('documents', 'minhash')
+    op.drop_column('documents', 'content_sha256')
+    op.drop_column('documents', 'canonical_id')
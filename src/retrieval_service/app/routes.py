@@ -1,41 +1,662 @@
 # Filename: src/retrieval_service/app/routes.py
+import base64
+import hashlib
+import json
 import os
+import re
+import time
 from datetime import timedelta
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import numpy as np
 from google.cloud import storage
 
-# This is now the only required import at the top
-from datastore.datastore import get_datastore
+from ..datastore.providers.cloudsql_postgres import document_row
+from ..db import get_datastore
+from ..embeddings import embed_queries, embed_query
+from ..ingestion.extractors import get_extractor
+from ..jobs import JOB_STATUSES, get_job_runner
+from ..metrics import INGESTED_CHUNKS, stage
+from ..search_cache import get_search_cache
+from ..worker import INGEST_EXTRACTOR, file_uri, gcs_uri, parse_notification, staging_path
 
 # Create a Blueprint, not a full app
 routes = Blueprint('routes', __name__)
 
+LOAD_BATCH_SIZE = int(os.environ.get("LOAD_BATCH_SIZE", "500"))
+MAX_LOAD_BATCH_SIZE = 5000
+
+UPLOAD_EXTRACTOR = os.environ.get("UPLOAD_EXTRACTOR", "papers")
+# Notifications for other buckets are ignored when set.
+INGEST_BUCKET = os.environ.get("INGEST_BUCKET") or os.environ.get("GCS_BUCKET_NAME")
+MAX_JOBS_LISTED = 1000
+
+SEARCH_MODES = ("vector", "hybrid")
+DEFAULT_TOP_K = 3
+MAX_TOP_K = int(os.environ.get("MAX_TOP_K", "1000"))
+MAX_BATCH_QUERIES = int(os.environ.get("MAX_BATCH_QUERIES", "100"))
+# With collapse, this many times top_k hits are fetched so that enough
+# distinct documents remain after keeping one hit per document.
+COLLAPSE_OVERFETCH = int(os.environ.get("COLLAPSE_OVERFETCH", "4"))
+
+# Fields a hit can be projected to with fields=; score is only set in hybrid
+# mode. Embeddings are never part of a hit.
+RESULT_FIELDS = (
+    "id", "document_id", "canonical_document_id", "source", "title", "authors", "publication_date",
+    "content", "distance", "score",
+)
+MAX_SNIPPET_CHARS = 5000
+MAX_DOCUMENTS_LISTED = 1000
+# Carries the cursor of the next page of /documents/search.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# A page ends at the (distance, id) of its last hit, but ANN scans and exact
+# top-k selection pick arbitrarily among hits tied on distance (identical
+# chunks). Pages fetch this many extra hits and keep the first top_k by
+# (distance, id), so a tie at the page boundary resolves by id; a tied
+# group larger than this can still lose its lower ids at the boundary.
+PAGE_TIE_OVERFETCH = int(os.environ.get("PAGE_TIE_OVERFETCH", "8"))
+
+def parse_top_k(value) -> int:
+    """Validates top_k from a query string or JSON body; None is the default."""
+    if value is None:
+        return DEFAULT_TOP_K
+    if isinstance(value, str):
+        value = int(value) if value.strip().lstrip("-").isdecimal() else None
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_TOP_K:
+        raise ValueError(f"top_k must be an integer between 1 and {MAX_TOP_K}")
+    return value
+
+def _fetch_k(top_k: int, collapse: bool) -> int:
+    return top_k * COLLAPSE_OVERFETCH if collapse else top_k
+
+def collapse_duplicates(results: list[dict], top_k: int) -> list[dict]:
+    """
+    Keeps the best-ranked hit per canonical document, so chunks of one
+    document and of its duplicates do not crowd out other documents.
+    """
+    seen, kept = set(), []
+    for result in results:
+        key = result.get("canonical_document_id", result["document_id"])
+        if key not in seen:
+            seen.add(key)
+            kept.append(result)
+    return kept[:top_k]
+
+def parse_fields(value) -> list[str] | None:
+    """Parses fields= (comma-separated, or a list in a JSON body); None keeps every field."""
+    if value is None:
+        return None
+    names = value.split(",") if isinstance(value, str) else value
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        names = None
+    else:
+        names = [name.strip() for name in names if name.strip()]
+    if not names or any(name not in RESULT_FIELDS for name in names):
+        raise ValueError(f"fields must be a subset of {', '.join(RESULT_FIELDS)}")
+    return names
+
+def parse_snippet(value) -> int | None:
+    """Validates snippet= from a query string or JSON body; None keeps content whole."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = int(value) if value.strip().isdecimal() else None
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_SNIPPET_CHARS:
+        raise ValueError(f"snippet must be between 1 and {MAX_SNIPPET_CHARS} characters")
+    return value
+
+def query_terms_pattern(query: str):
+    """Matches the words of query (two characters or longer), case-insensitively."""
+    terms = {term for term in re.findall(r"\w+", query.lower()) if len(term) > 1}
+    if not terms:
+        return None
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})", re.IGNORECASE)
+
+def snippet(content: str, pattern, chars: int) -> tuple[str, list[list[int]]]:
+    """
+    Cuts content to about chars characters around its densest run of query
+    term matches. Returns the snippet and the [start, end) offsets of the
+    matches in it; a cut end is marked with an ellipsis.
+    """
+    matches = [match.span() for match in pattern.finditer(content)] if pattern else []
+    start, end = 0, len(content)
+    if end > chars:
+        if matches:
+            # The match followed by the most matches within one snippet;
+            # match ends increase with their starts, so one pass finds it.
+            best, count, j = 0, 0, 0
+            for i, (first, _) in enumerate(matches):
+                j = max(j, i)
+                while j < len(matches) and matches[j][1] <= first + chars:
+                    j += 1
+                if j - i > count:
+                    best, count = i, j - i
+            start = max(0, min(matches[best][0] - chars // 4, len(content) - chars))
+        end = start + chars
+        # Snap to word boundaries when one is close.
+        if start > 0:
+            space = content.find(" ", start, start + min(20, chars // 4))
+            start = space + 1 if space != -1 else start
+        if end < len(content):
+            space = content.rfind(" ", start, end)
+            end = space if space > end - 20 else end
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(content) else ""
+    offset = len(prefix) - start
+    highlights = [[s + offset, e + offset] for s, e in matches if s >= start and e <= end]
+    return prefix + content[start:end] + suffix, highlights
+
+def shape_results(results: list[dict], fields: list[str] | None, snippet_chars: int | None, query: str) -> list[dict]:
+    """
+    Cuts each hit's content to a highlighted snippet (adding "highlights")
+    and keeps only the requested fields. Cached hits are never modified.
+    """
+    if fields is None and snippet_chars is None:
+        return results
+    pattern = query_terms_pattern(query) if snippet_chars is not None else None
+    keep = None
+    if fields is not None:
+        keep = [*fields, "highlights"] if "content" in fields else fields
+    shaped = []
+    for result in results:
+        if snippet_chars is not None:
+            content, highlights = snippet(result["content"], pattern, snippet_chars)
+            result = {**result, "content": content, "highlights": highlights}
+        if keep is not None:
+            result = {name: result[name] for name in keep if name in result}
+        shaped.append(result)
+    return shaped
+
+def encode_cursor(key: dict) -> str:
+    """An opaque, URL-safe page token for key."""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, fields: dict) -> dict:
+    """Decodes a token from encode_cursor whose key has fields {name: type}."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, dict) or any(
+        not isinstance(key.get(name), kind) or isinstance(key.get(name), bool) for name, kind in fields.items()
+    ):
+        raise ValueError("Invalid cursor")
+    return key
+
+def _search_fingerprint(query: str, space) -> str:
+    # Ties a search cursor to the query and space it is a position in.
+    return hashlib.sha256(json.dumps([query, space.name]).encode()).hexdigest()[:16]
+
+def _search_after(cursor: str, query: str, space) -> tuple[float, int]:
+    key = decode_cursor(cursor, {"q": str, "d": (int, float), "i": int})
+    if key["q"] != _search_fingerprint(query, space):
+        raise ValueError("cursor belongs to another query or embedding space")
+    return float(key["d"]), key["i"]
+
+def _next_search_cursor(results: list[dict], top_k: int, query: str, space) -> str | None:
+    """The cursor of the page after results, or None if results were the last page."""
+    if not results or len(results) < top_k:
+        return None
+    last = results[-1]
+    return encode_cursor({"q": _search_fingerprint(query, space), "d": float(last["distance"]), "i": int(last["id"])})
+
+def _run_search(
+    datastore, mode, query, query_embedding, top_k, ef_search, probes, collapse=False, space=None, after=None
+):
+    fetch_k = _fetch_k(top_k, collapse)
+    with stage("search"):
+        if mode == "hybrid":
+            results = datastore.hybrid_search_documents(
+                query, query_embedding, fetch_k, ef_search=ef_search, probes=probes, space=space
+            )
+        elif collapse:
+            results = datastore.search_documents(
+                query_embedding, fetch_k, ef_search=ef_search, probes=probes, space=space
+            )
+        else:
+            results = datastore.search_documents(
+                query_embedding, fetch_k + PAGE_TIE_OVERFETCH,
+                ef_search=ef_search, probes=probes, space=space, after=after,
+            )
+            results = sorted(results, key=lambda hit: (hit["distance"], hit["id"]))[:top_k]
+    return collapse_duplicates(results, top_k) if collapse else results
+
+def _embed_query(query: str, space) -> list[float]:
+    # The query must be embedded by the model of the space it searches.
+    with stage("embed"):
+        return embed_query(query, space.model)
+
+def _json_response(payload):
+    with stage("serialize"):
+        return jsonify(payload)
+
 @routes.route("/documents/search", methods=["GET"])
 def search():
-    # ... (rest of the function is correct)
+    """
+    Vector-mode responses without collapse carry an X-Next-Cursor header
+    when more hits may follow; pass it back as cursor= (same query) for the
+    next top_k. Pages are keyed on (distance, id), so each one resumes the
+    index scan past the previous page instead of re-running a larger top_k.
+    """
     query = request.args.get("query")
-    top_k = request.args.get("top_k", 3)
+    if not query:
+        return {"error": "query is required"}, 400
+    # "hybrid" fuses vector similarity with full-text and trigram matches,
+    # for exact identifiers such as IPC codes and application numbers.
+    mode = request.args.get("mode", "vector")
+    if mode not in SEARCH_MODES:
+        return {"error": f"mode must be one of {', '.join(SEARCH_MODES)}"}, 400
+    # collapse=true returns at most one hit per (canonical) document.
+    collapse = request.args.get("collapse", "false").lower() in ("1", "true", "yes")
+    # Fused scores and collapsed hits have no (distance, id) order to resume.
+    paged = mode == "vector" and not collapse
+    cursor = request.args.get("cursor")
+    if cursor and not paged:
+        return {"error": "cursor is only supported in vector mode without collapse"}, 400
+    try:
+        # fields= keeps only the listed fields of each hit; snippet=N cuts
+        # content to about N characters around the query terms.
+        fields = parse_fields(request.args.get("fields"))
+        snippet_chars = parse_snippet(request.args.get("snippet"))
+        top_k = parse_top_k(request.args.get("top_k"))
+        # Optional per-request ANN tuning: trade recall for latency.
+        ef_search = _query_int("ef_search")
+        probes = _query_int("probes")
+        datastore = get_datastore()
+        # Read once, so the query is embedded and searched in the same space.
+        space = datastore.active_embedding_space()
+        after = _search_after(cursor, query, space) if cursor else None
+        cache = get_search_cache()
+        if cache is None:
+            results = _run_search(
+                datastore, mode, query, _embed_query(query, space), top_k, ef_search, probes, collapse, space, after
+            )
+        else:
+            results = _cached_search(datastore, cache, mode, query, top_k, ef_search, probes, collapse, space, after)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    # Shaping happens after the cache, so it is not part of the key.
+    response = _json_response(shape_results(results, fields, snippet_chars, query))
+    next_cursor = _next_search_cursor(results, top_k, query, space) if paged else None
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+def _cached_search(datastore, cache, mode, query, top_k, ef_search, probes, collapse, space, after):
+    # Everything that changes the result set belongs in the cache key.
+    filters = {
+        "ef_search": ef_search, "probes": probes, "mode": mode, "collapse": collapse, "space": space.name,
+        "after": list(after) if after else None,
+    }
+    with stage("corpus_version"):
+        version = datastore.get_corpus_version()
+    with stage("cache"):
+        results = cache.get(query, top_k, filters, version)
+    if results is None:
+        query_embedding = _embed_query(query, space)
+        # Lexical matches depend on the exact query text, and the next-page
+        # cursor is a position in this query's own ranking, so only
+        # collapsed vector results are reused for a merely similar query.
+        if mode == "vector" and collapse:
+            with stage("cache_near"):
+                results = cache.get_near(query_embedding, top_k, filters, version)
+        else:
+            cache.count_miss()
+        if results is None:
+            results = _run_search(
+                datastore, mode, query, query_embedding, top_k, ef_search, probes, collapse, space, after
+            )
+            # First pages share entries with batch search, which matches
+            # near-duplicates; later pages are never looked up that way.
+            near_key = query_embedding if mode == "vector" and after is None else None
+            cache.put(query, top_k, filters, version, results, near_key)
+    return results
+
+def _query_int(name: str) -> int | None:
+    """An optional integer query parameter; anything else is a ValueError, not the default."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if not value.strip().lstrip("-").isdecimal():
+        raise ValueError(f"{name} must be an integer")
+    return int(value)
+
+def _optional_int(body: dict, name: str) -> int | None:
+    value = body.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer")
+    return value
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+@routes.route("/documents/search/batch", methods=["POST"])
+def search_batch():
+    """
+    Runs many vector searches in one call. Body: {"queries": [...], "top_k",
+    "ef_search", "probes", "collapse", "fields", "snippet"}. Cache misses are embedded with one batched
+    request and searched with one SQL statement.
+
+    Each entry reports its own timing: the cache lookup, plus the duration
+    of the shared embedding and SQL calls it took part in, if any.
+    """
+    started = time.perf_counter()
+    body = request.get_json(silent=True) or {}
+    queries = body.get("queries")
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q for q in queries):
+        return {"error": "queries must be a non-empty list of strings"}, 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return {"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}, 400
+    try:
+        top_k = parse_top_k(body.get("top_k"))
+        ef_search = _optional_int(body, "ef_search")
+        probes = _optional_int(body, "probes")
+        collapse = body.get("collapse", False)
+        if not isinstance(collapse, bool):
+            raise ValueError("collapse must be true or false")
+        fields = parse_fields(body.get("fields"))
+        snippet_chars = parse_snippet(body.get("snippet"))
+        datastore = get_datastore()
+        space = datastore.active_embedding_space()
+        cache = get_search_cache()
+        # Same key as a vector-mode /documents/search, so both share entries.
+        filters = {
+            "ef_search": ef_search, "probes": probes, "mode": "vector", "collapse": collapse, "space": space.name,
+            "after": None,
+        }
+        with stage("corpus_version"):
+            version = datastore.get_corpus_version() if cache else None
+
+        entries = [{"query": q, "results": None, "cached": False, "timing_ms": {}} for q in queries]
+        pending = entries
+        if cache:
+            pending = []
+            with stage("cache"):
+                for entry in entries:
+                    start = time.perf_counter()
+                    entry["results"] = cache.get(entry["query"], top_k, filters, version)
+                    entry["timing_ms"]["cache"] = _elapsed_ms(start)
+                    if entry["results"] is None:
+                        pending.append(entry)
+                    else:
+                        entry["cached"] = True
+
+        to_search = []
+        if pending:
+            with stage("embed") as timer:
+                embeddings = embed_queries([entry["query"] for entry in pending], space.model)
+            for entry, embedding in zip(pending, embeddings):
+                entry["timing_ms"]["embed"] = timer.ms
+                near = cache.get_near(embedding, top_k, filters, version) if cache else None
+                if near is None:
+                    to_search.append((entry, embedding))
+                else:
+                    entry["results"], entry["cached"] = near, True
+
+        if to_search:
+            with stage("search") as timer:
+                result_lists = datastore.batch_search_documents(
+                    [embedding for _, embedding in to_search], _fetch_k(top_k, collapse),
+                    ef_search=ef_search, probes=probes, space=space,
+                )
+            if collapse:
+                result_lists = [collapse_duplicates(results, top_k) for results in result_lists]
+            for (entry, embedding), results in zip(to_search, result_lists):
+                entry["results"] = results
+                entry["timing_ms"]["search"] = timer.ms
+                if cache:
+                    cache.put(entry["query"], top_k, filters, version, results, embedding)
+        for entry in entries:
+            entry["results"] = shape_results(entry["results"], fields, snippet_chars, entry["query"])
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return _json_response({"results": entries, "timing_ms": {"total": _elapsed_ms(started)}})
+
+# Metadata a CSV row may leave empty; empty means NULL, not "".
+NULLABLE_LOAD_FIELDS = ("title", "authors", "publication_date")
+
+def _decode_load_record(record: dict) -> dict:
+    for field in NULLABLE_LOAD_FIELDS:
+        if record.get(field) == "":
+            record[field] = None
+    # Clients may send the embedding as base64 little-endian float32 instead
+    # of a JSON list, which is ~3x smaller and much cheaper to parse.
+    if "embedding_b64" in record:
+        record["embedding"] = np.frombuffer(
+            base64.b64decode(record.pop("embedding_b64")), dtype="<f4"
+        )
+    return record
+
+def _load_records():
+    """
+    Yields (line number, record) pairs from an NDJSON or JSON array body.
+    Records may carry their own "line" number (e.g. the source CSV row);
+    acknowledgements then refer to those numbers.
+    """
+    if request.mimetype == "application/json":
+        # Legacy clients post the whole load as one JSON array.
+        body = request.get_json(silent=True)
+        if not isinstance(body, list):
+            raise ValueError("a JSON body must be an array of records")
+        lines = enumerate(body, start=1)
+    else:
+        lines = ((n, json.loads(line)) for n, line in enumerate(request.stream, start=1) if line.strip())
+    for line_no, record in lines:
+        if not isinstance(record, dict):
+            raise ValueError(f"line {line_no} is not a JSON object")
+        yield record.pop("line", line_no), _decode_load_record(record)
+
+@routes.route("/documents/load", methods=["POST"])
+def load():
+    """
+    Bulk-loads processed chunks from a streamed NDJSON body (one chunk per
+    line) using binary COPY, about batch_size rows per transaction.
+
+    Each transaction replaces the chunks of the documents it writes, and a
+    batch only ends where the source changes, so the chunks of one source
+    must be sent together. The response is NDJSON with one acknowledgement
+    per committed batch. A client that loses the connection resumes by
+    re-sending only the lines after the last acknowledged last_line; a
+    batch committed without its acknowledgement is then replaced, not
+    duplicated.
+    """
+    batch_size = request.args.get("batch_size", str(LOAD_BATCH_SIZE)).strip()
+    if not batch_size.isdecimal() or not 1 <= int(batch_size) <= MAX_LOAD_BATCH_SIZE:
+        return {"error": f"batch_size must be between 1 and {MAX_LOAD_BATCH_SIZE}"}, 400
+    batch_size = int(batch_size)
     datastore = get_datastore()
-    results = datastore.search(query=query, top_k=int(top_k))
-    output = [doc.to_dict() for doc in results]
-    return jsonify(output)
+
+    def generate():
+        batch, first_line, last_line = [], None, 0
+        batches = rows = 0
+        records = _load_records()
+        while True:
+            invalid = None
+            try:
+                line_no, record = next(records, (None, None))
+            except ValueError as e:
+                # Lines before the invalid one are still committed.
+                record, invalid = None, e
+            # A batch ends at the end of the body, or once full, where the source changes.
+            if batch and (
+                record is None
+                or (len(batch) >= batch_size and document_row(record)["source"] != document_row(batch[-1])["source"])
+            ):
+                try:
+                    with stage("load_batch"):
+                        version = datastore.copy_documents(batch)
+                except Exception as e:
+                    yield _ack({"error": str(e), "batch": batches, "first_line": first_line})
+                    return
+                INGESTED_CHUNKS.labels("load").inc(len(batch))
+                rows += len(batch)
+                yield _ack({
+                    "batch": batches,
+                    "rows": len(batch),
+                    "first_line": first_line,
+                    "last_line": last_line,
+                    "corpus_version": version,
+                })
+                batches += 1
+                batch, first_line = [], None
+            if invalid is not None:
+                yield _ack({"error": f"Invalid record after line {last_line}: {invalid}", "first_line": last_line + 1})
+                return
+            if record is None:
+                break
+            first_line = first_line or line_no
+            last_line = line_no
+            batch.append(record)
+        yield _ack({"done": True, "batches": batches, "rows": rows})
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def _ack(payload: dict) -> str:
+    return json.dumps(payload) + "\n"
+
+def _requested_extractor() -> str:
+    name = request.args.get("extractor", UPLOAD_EXTRACTOR)
+    get_extractor(name)  # raises ValueError for unknown names
+    return name
 
 @routes.route("/documents/upload", methods=["POST"])
 def upload():
-    # Import Document model inside the function to avoid circular imports
-    from models.models import Document
-    # ... (rest of the function is correct)
-    if "file" not in request.files:
+    """
+    Accepts one or more PDFs as multipart "files" (or a single "file"),
+    stages each on local disk and queues an ingestion job per file.
+    Returns 202 with the job ids; poll /jobs/<id> for progress.
+    """
+    files = [f for f in request.files.getlist("files") + request.files.getlist("file") if f.filename]
+    if not files:
         return {"error": "No file part"}, 400
-    file = request.files["file"]
-    if file.filename == "":
-        return {"error": "No selected file"}, 400
-    if file:
-        datastore = get_datastore()
-        doc = Document.from_file(file)
-        datastore.upload(documents=[doc])
-        return {"message": f"File {file.filename} uploaded successfully"}, 200
-    return {"error": "File not allowed"}, 400
+    try:
+        extractor_name = _requested_extractor()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    runner = get_job_runner()
+    jobs = []
+    for file in files:
+        path = staging_path(file.filename)
+        # Werkzeug spools large parts to disk while parsing; save() copies
+        # in chunks, so no file is ever held in memory.
+        file.save(path)
+        # The staged file is only on this instance's disk.
+        job, _ = runner.submit(file_uri(path), os.path.basename(path), extractor_name, local=True)
+        jobs.append(job.to_dict())
+    return {"jobs": jobs}, 202
+
+@routes.route("/documents/ingest-gcs", methods=["POST"])
+def ingest_gcs():
+    """
+    Queues ingestion of objects already uploaded to GCS_BUCKET_NAME through
+    /documents/generate-upload-url. Body: {"filenames": [...]}. An object
+    version already queued (e.g. by a notification) returns its job.
+    """
+    bucket_name = os.environ.get("GCS_BUCKET_NAME")
+    if not bucket_name:
+        return {"error": "GCS_BUCKET_NAME is not configured"}, 500
+    filenames = (request.get_json(silent=True) or {}).get("filenames") or []
+    if not filenames:
+        return {"error": "filenames is required"}, 400
+    try:
+        extractor_name = _requested_extractor()
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    bucket = storage.Client().bucket(bucket_name)
+    blobs = [(name, bucket.get_blob(name)) for name in filenames]
+    missing = [name for name, blob in blobs if blob is None]
+    if missing:
+        return {"error": f"Objects not found: {', '.join(missing)}"}, 404
+    runner = get_job_runner()
+    jobs = [
+        runner.submit(
+            gcs_uri(bucket_name, name), os.path.basename(name), extractor_name, generation=str(blob.generation)
+        )[0].to_dict()
+        for name, blob in blobs
+    ]
+    return {"jobs": jobs}, 202
+
+@routes.route("/ingestion/notifications", methods=["POST"])
+def ingestion_notification():
+    """
+    Push endpoint for Cloud Storage OBJECT_FINALIZE notifications (Pub/Sub
+    push or Eventarc): queues one job per new PDF object version.
+    Everything else is acknowledged and ignored, so it is not redelivered.
+    """
+    notification = parse_notification(request.get_json(silent=True) or {})
+    if notification is None:
+        return "", 204
+    bucket_name, name, generation = notification
+    if (INGEST_BUCKET and bucket_name != INGEST_BUCKET) or not name.lower().endswith(".pdf"):
+        return "", 204
+    job, created = get_job_runner().submit(
+        gcs_uri(bucket_name, name), os.path.basename(name), INGEST_EXTRACTOR, generation=generation
+    )
+    return job.to_dict(), 202 if created else 200
+
+@routes.route("/jobs", methods=["GET"])
+def list_jobs():
+    """
+    Most recent ingestion jobs, newest first (?status=, ?limit=), with the
+    number of jobs in each status.
+    """
+    status = request.args.get("status")
+    if status is not None and status not in JOB_STATUSES:
+        return {"error": f"status must be one of {', '.join(JOB_STATUSES)}"}, 400
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), MAX_JOBS_LISTED)
+    except ValueError:
+        return {"error": "limit must be an integer"}, 400
+    runner = get_job_runner()
+    return {
+        "jobs": [job.to_dict() for job in runner.list_jobs(status, limit)],
+        "counts": runner.counts(),
+    }
+
+@routes.route("/documents", methods=["GET"])
+def list_documents():
+    """
+    Stored documents in id order, ?limit= at a time. next_cursor, passed
+    back as ?cursor=, fetches the next page; it is null on the last one.
+    Every page is a primary key range scan however deep it is, so the
+    corpus can be exported page by page.
+    """
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), MAX_DOCUMENTS_LISTED)
+    except ValueError:
+        return {"error": "limit must be an integer"}, 400
+    cursor = request.args.get("cursor")
+    try:
+        after_id = decode_cursor(cursor, {"i": int})["i"] if cursor else 0
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    documents = get_datastore().list_documents(after_id, limit)
+    next_cursor = encode_cursor({"i": documents[-1]["id"]}) if len(documents) == limit else None
+    return _json_response({"documents": documents, "next_cursor": next_cursor})
+
+@routes.route("/embedding-spaces", methods=["GET"])
+def embedding_spaces():
+    """
+    Every embedding space with its status and backfill progress, and the
+    one searches currently read. Spaces are managed with
+    python -m retrieval_service.embedding_spaces.
+    """
+    datastore = get_datastore()
+    return {
+        "active": datastore.active_embedding_space().name,
+        "spaces": [space.to_dict() for space in datastore.list_embedding_spaces()],
+    }
+
+@routes.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_runner().get(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    return job.to_dict()
 
 @routes.route("/documents/generate-upload-url", methods=["POST"])
 def generate_upload_url():
@@ -0,0 +1,5 @@
+# src/retrieval_service/benchmarks/__init__.py
+from .corpus import SyntheticCorpus
+from .runner import bench_embed, bench_ingest, bench_search, recall_at_k
+
+__all__ = ["SyntheticCorpus", "bench_embed", "bench_ingest", "bench_search", "recall_at_k"]
@@ -0,0 +1,114 @@
+# src/retrieval_service/benchmarks/__main__.py
+"""
+Search and ingestion benchmark.
+
+Run from src/ against a scratch database (the ingest phase replaces the
+corpus):
+
+    DATASTORE_KIND=cloudsql-postgres DB_USER=... DB_NAME=... \\
+        python -m retrieval_service.benchmarks --chunks 1000000 --concurrency 1,8,32
+
+The datastore is configured from the same environment variables as the
+service (DATASTORE_KIND, DB_*, HNSW_EF_SEARCH, VECTOR_STORAGE_MODE, ...).
+Results are written as JSON, tagged with the git commit, so runs can be
+compared across changes.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+
+from ..db import get_datastore
+from ..embeddings import create_embedding_client
+from .corpus import SyntheticCorpus
+from .runner import bench_embed, bench_ingest, bench_search, recall_at_k
+
+OUTPUT_DIR = "./data/benchmarks"
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m retrieval_service.benchmarks", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunks", type=int, default=100000, help="synthetic corpus size")
+    parser.add_argument("--topics", type=int, default=256, help="embedding clusters in the corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10000, help="chunks per ingest batch")
+    parser.add_argument("--skip-ingest", action="store_true", help="reuse a corpus loaded by an earlier run")
+    parser.add_argument("--queries", type=int, default=500, help="queries per search run")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    parser.add_argument("--ef-search", type=_int_list, default=[], help="hnsw.ef_search values to sweep")
+    parser.add_argument("--modes", default="vector,hybrid")
+    parser.add_argument("--embed-sample", type=int, default=0, help="also time the fake embedder on N chunk texts")
+    parser.add_argument("--output", help=f"result file (default: {OUTPUT_DIR}/<time>-<commit>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    commit = _git_commit()
+    corpus = SyntheticCorpus(args.chunks, num_topics=args.topics, seed=args.seed, batch_size=args.batch_size)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {
+            **{key: value for key, value in vars(args).items() if key != "output"},
+            "datastore_kind": os.environ.get("DATASTORE_KIND", "cloudsql-postgres"),
+            "vector_storage_mode": os.environ.get("VECTOR_STORAGE_MODE", "full"),
+            "dimensions": corpus.dimensions,
+        },
+    }
+    datastore = get_datastore()
+
+    if args.embed_sample:
+        print(f"Embedding {args.embed_sample} chunk texts with the fake embedder...")
+        texts = [chunk["content"] for chunk in corpus.batch(0)[:args.embed_sample]]
+        report["embed"] = bench_embed(create_embedding_client(backend="fake"), texts)
+
+    if not args.skip_ingest:
+        print(f"Ingesting {args.chunks} synthetic chunks...")
+        report["ingest"] = bench_ingest(datastore, corpus)
+
+    query_texts, query_embeddings = corpus.queries(args.queries)
+    print(f"Computing exact top-{args.top_k} for {args.queries} queries...")
+    exact = corpus.exact_neighbours(query_embeddings, args.top_k)
+
+    report["search"] = []
+    for ef_search in args.ef_search or [None]:
+        for mode in args.modes.split(","):
+            for concurrency in args.concurrency:
+                summary, results = bench_search(
+                    datastore, query_texts, query_embeddings, args.top_k, concurrency, mode=mode, ef_search=ef_search
+                )
+                if mode == "vector":
+                    summary["recall"] = recall_at_k(results, exact, args.top_k)
+                print(f"  {json.dumps(summary)}")
+                report["search"].append(summary)
+    report["pool"] = datastore.pool_status()
+
+    output = args.output or os.path.join(
+        OUTPUT_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{(commit or 'nocommit')[:12]}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# src/retrieval_service/benchmarks/corpus.py
+import numpy as np
+
+EMBEDDING_DIMENSIONS = 768
+WORDS_PER_CHUNK = 150
+CHUNKS_PER_DOCUMENT = 20
+VOCABULARY_SIZE = 20000
+
+
+class SyntheticCorpus:
+    """
+    Deterministic synthetic corpus of chunks with clustered embeddings.
+
+    Embeddings are unit vectors scattered around num_topics random
+    centroids, which gives an ANN index the neighbourhood structure of real
+    text embeddings (uniform random vectors are an unrealistic worst case).
+    Chunk text is drawn from a Zipf-distributed vocabulary skewed by topic,
+    so lexical search has something to match.
+
+    Every batch is generated from (seed, batch index) alone, so the corpus
+    is never held in memory: iterating twice yields identical chunks, and
+    millions of rows cost only one batch of RAM at a time.
+    """
+    def __init__(
+        self,
+        num_chunks: int,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        num_topics: int = 256,
+        spread: float = 0.35,
+        seed: int = 0,
+        batch_size: int = 10000,
+    ):
+        self.num_chunks = num_chunks
+        self.dimensions = dimensions
+        self.num_topics = num_topics
+        self.spread = spread
+        self.seed = seed
+        self.batch_size = batch_size
+        rng = np.random.default_rng([seed, 0])
+        self.centroids = _normalize(rng.standard_normal((num_topics, dimensions)).astype(np.float32))
+        # Each topic favours its own slice of the vocabulary.
+        self._topic_offsets = rng.integers(0, VOCABULARY_SIZE, num_topics)
+
+    def _rng(self, stream: int, index: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, stream, index])
+
+    def _vectors(self, rng: np.random.Generator, topics: np.ndarray) -> np.ndarray:
+        noise = rng.standard_normal((len(topics), self.dimensions)).astype(np.float32)
+        noise *= self.spread / np.sqrt(self.dimensions)
+        return _normalize(self.centroids[topics] + noise)
+
+    def _texts(self, rng: np.random.Generator, topics: np.ndarray, first_row: int) -> list[str]:
+        ranks = rng.zipf(1.3, (len(topics), WORDS_PER_CHUNK)) % VOCABULARY_SIZE
+        words = (ranks + self._topic_offsets[topics][:, None]) % VOCABULARY_SIZE
+        return [
+            f"chunk {first_row + i} topic{topic} " + " ".join(f"w{word}" for word in row)
+            for i, (topic, row) in enumerate(zip(topics, words))
+        ]
+
+    def batch_embeddings(self, index: int) -> np.ndarray:
+        """Embedding matrix of batch `index`, without generating its text."""
+        rows = min(self.batch_size, self.num_chunks - index * self.batch_size)
+        rng = self._rng(1, index)
+        topics = rng.integers(0, self.num_topics, rows)
+        return self._vectors(rng, topics)
+
+    def batch(self, index: int) -> list[dict]:
+        """Chunk records of batch `index`, in the shape ingestion produces."""
+        first_row = index * self.batch_size
+        rows = min(self.batch_size, self.num_chunks - first_row)
+        rng = self._rng(1, index)
+        topics = rng.integers(0, self.num_topics, rows)
+        embeddings = self._vectors(rng, topics)
+        texts = self._texts(self._rng(2, index), topics, first_row)
+        # A document never spans two batches: writing a batch replaces the
+        # chunks its documents already have.
+        first_document = index * -(-self.batch_size // CHUNKS_PER_DOCUMENT)
+        return [
+            {
+                "source": f"synthetic-{first_document + i // CHUNKS_PER_DOCUMENT:08d}.pdf",
+                "title": f"Synthetic document {first_document + i // CHUNKS_PER_DOCUMENT}",
+                "authors": "Benchmark",
+                "publication_date": "2025",
+                "content": text,
+                "embedding": embedding,
+            }
+            for i, (text, embedding) in enumerate(zip(texts, embeddings))
+        ]
+
+    @property
+    def num_batches(self) -> int:
+        return -(-self.num_chunks // self.batch_size)
+
+    def __iter__(self):
+        for index in range(self.num_batches):
+            yield self.batch(index)
+
+    def queries(self, count: int) -> tuple[list[str], np.ndarray]:
+        """
+        Query texts and embeddings drawn from the same topics as the corpus
+        but distinct from every chunk.
+        """
+        rng = self._rng(3, 0)
+        topics = rng.integers(0, self.num_topics, count)
+        embeddings = self._vectors(rng, topics)
+        ranks = rng.zipf(1.3, (count, 3)) % VOCABULARY_SIZE
+        words = (ranks + self._topic_offsets[topics][:, None]) % VOCABULARY_SIZE
+        texts = [" ".join(f"w{word}" for word in row) for row in words]
+        return texts, embeddings
+
+    def exact_neighbours(self, query_embeddings: np.ndarray, k: int) -> np.ndarray:
+        """
+        Exact top-k chunk ids (1-based insertion order) by cosine distance,
+        computed by streaming the corpus batch by batch.
+        """
+        queries = _normalize(np.asarray(query_embeddings, dtype=np.float32))
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for index in range(self.num_batches):
+            block = self.batch_embeddings(index)
+            first_row = index * self.batch_size
+            scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            rows = np.concatenate(
+                [best_rows, np.broadcast_to(np.arange(first_row, first_row + len(block)), (len(queries), len(block)))],
+                axis=1,
+            )
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores, best_rows = scores, rows
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1) + 1
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
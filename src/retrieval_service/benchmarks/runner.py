@@ -0,0 +1,126 @@
+# src/retrieval_service/benchmarks/runner.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .corpus import SyntheticCorpus
+
+PERCENTILES = (50, 95, 99)
+
+
+def chunk_row(result: dict) -> int:
+    """
+    1-based corpus row of a search result. Synthetic chunk text starts with
+    "chunk <row>", which stays valid whatever ids the datastore assigned.
+    """
+    return int(result["content"].split(" ", 2)[1]) + 1
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    values = np.asarray(latencies) * 1000.0
+    summary = {f"p{p}_ms": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+    summary["mean_ms"] = round(float(values.mean()), 3)
+    summary["max_ms"] = round(float(values.max()), 3)
+    return summary
+
+
+def bench_ingest(datastore, corpus: SyntheticCorpus) -> dict:
+    """
+    Replaces the datastore's corpus with the synthetic one, batch by batch,
+    and reports write throughput. Generation time is excluded.
+    """
+    write_seconds = 0.0
+    batch_seconds = []
+    for index, chunks in enumerate(corpus):
+        start = time.perf_counter()
+        if index == 0:
+            datastore.initialize_data(chunks)
+        else:
+            datastore.copy_documents(chunks)
+        elapsed = time.perf_counter() - start
+        write_seconds += elapsed
+        batch_seconds.append(elapsed)
+        print(f"  ingest batch {index + 1}/{corpus.num_batches}: {len(chunks)} chunks in {elapsed:.2f}s")
+    return {
+        "chunks": corpus.num_chunks,
+        "batches": corpus.num_batches,
+        "batch_size": corpus.batch_size,
+        "seconds": round(write_seconds, 3),
+        "chunks_per_second": round(corpus.num_chunks / write_seconds, 1) if write_seconds else None,
+        "batch_latency": latency_summary(batch_seconds),
+    }
+
+
+def bench_embed(embedding_client, texts: list[str]) -> dict:
+    """Reports bulk embedding throughput for texts."""
+    start = time.perf_counter()
+    embedding_client.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+    result = {
+        "texts": len(texts),
+        "seconds": round(elapsed, 3),
+        "texts_per_second": round(len(texts) / elapsed, 1) if elapsed else None,
+    }
+    if hasattr(embedding_client, "stats"):
+        result["client"] = embedding_client.stats()
+    return result
+
+
+def _timed(fn, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_search(
+    datastore,
+    query_texts: list[str],
+    query_embeddings: np.ndarray,
+    top_k: int,
+    concurrency: int,
+    mode: str = "vector",
+    ef_search: int | None = None,
+    warmup: int = 10,
+) -> tuple[dict, list[list[dict]]]:
+    """
+    Runs every query once from `concurrency` threads and reports throughput
+    and latency percentiles. Also returns the results, in query order.
+    """
+    embeddings = [list(map(float, embedding)) for embedding in query_embeddings]
+    if mode == "hybrid":
+        def search(i):
+            return datastore.hybrid_search_documents(query_texts[i], embeddings[i], top_k, ef_search=ef_search)
+    else:
+        def search(i):
+            return datastore.search_documents(embeddings[i], top_k, ef_search=ef_search)
+
+    # Warm the pool, caches and index pages before timing.
+    for i in range(min(warmup, len(embeddings))):
+        search(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timed = list(executor.map(lambda i: _timed(search, i), range(len(embeddings))))
+    wall = time.perf_counter() - start
+    latencies = [seconds for seconds, _ in timed]
+    summary = {
+        "mode": mode,
+        "concurrency": concurrency,
+        "queries": len(embeddings),
+        "top_k": top_k,
+        "ef_search": ef_search,
+        "seconds": round(wall, 3),
+        "qps": round(len(embeddings) / wall, 1) if wall else None,
+        **latency_summary(latencies),
+    }
+    return summary, [results for _, results in timed]
+
+
+def recall_at_k(results: list[list[dict]], exact: np.ndarray, k: int) -> dict:
+    """Mean and worst recall@k of results against the exact neighbour ids."""
+    recalls = [
+        len({chunk_row(r) for r in found[:k]} & set(truth[:k].tolist())) / k
+        for found, truth in zip(results, exact)
+    ]
+    return {"k": k, "queries": len(recalls), "mean": round(float(np.mean(recalls)), 4), "min": round(float(np.min(recalls)), 4)}
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Generic, TypeVar
 
+from .spaces import EmbeddingSpace
+
 class AbstractConfig(ABC):
     kind: str
 
@@ -24,10 +26,176 @@ class Client(ABC, Generic[C]):
 
     @abstractmethod
     async def search_documents(
-        self, query_embedding: list[float], top_k: int
+        self,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+        after: tuple[float, int] | None = None,
+    ) -> list[dict]:
+        """
+        The top_k chunks nearest to query_embedding, ordered by (distance,
+        id). With after, only chunks ordered after that (distance, id) key,
+        i.e. the next page of a previous search.
+        """
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def batch_search_documents(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[list[dict]]:
+        """Runs search_documents for every embedding in one round trip."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def hybrid_search_documents(
+        self,
+        query: str,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
     ) -> list[dict]:
+        """Fuses vector and lexical rankings of query into one result list."""
         raise NotImplementedError("Subclass should implement this!")
 
     @abstractmethod
     async def add_documents(self, paper_chunks: list[dict]) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def list_documents(self, after_id: int, limit: int) -> list[dict]:
+        """Up to limit documents with an id greater than after_id, in id order."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def find_duplicate_candidates(
+        self, source: str, content_sha256: str, band_hashes: list[int]
+    ) -> list[dict]:
+        """
+        Returns canonical documents other than source sharing its content hash
+        or an LSH band hash, as dicts with id, source, content_sha256, minhash.
+        """
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def link_duplicate_document(
+        self, document: dict, canonical_id: int, content_sha256: str, minhash: bytes
+    ) -> int:
+        """Stores document as a chunk-less duplicate of canonical_id."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def save_document_fingerprint(
+        self, source: str, content_sha256: str, minhash: bytes, band_hashes: list[int]
+    ) -> None:
+        """Stores the fingerprint of an ingested canonical document."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def enqueue_job(self, job: dict) -> tuple[dict, bool]:
+        """
+        Queues an ingestion job unless its (source_uri, generation) already
+        has one. Returns the job row and whether it was created.
+        """
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def claim_job(
+        self, host: str, lease_seconds: float, max_attempts: int, pinned_seconds: float
+    ) -> dict | None:
+        """
+        Claims the oldest runnable ingestion job for host, if any, after
+        failing jobs lost on every attempt and jobs pinned to another host
+        that has left them untouched for pinned_seconds.
+        """
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def update_job(
+        self, job_id: str, attempt: int, status: str,
+        chunks: int | None = None, error: str | None = None, duplicate_of: str | None = None,
+    ) -> bool:
+        """Advances a claimed job; False once the claim has passed to another worker."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def get_job(self, job_id: str) -> dict | None:
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def list_jobs(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def job_counts(self) -> dict[str, int]:
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def active_embedding_space(self) -> EmbeddingSpace:
+        """Returns the embedding space searches read when none is given."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def list_embedding_spaces(self) -> list[EmbeddingSpace]:
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def get_embedding_space(self, name: str) -> EmbeddingSpace | None:
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def create_embedding_space(self, name: str, model: str, dimensions: int) -> EmbeddingSpace:
+        """Registers a space for model with an empty shadow table."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def next_backfill_chunks(self, space: EmbeddingSpace, after_id: int, limit: int) -> list[tuple[int, str]]:
+        """Returns up to limit (id, content) pairs of chunks after after_id missing from space, in id order."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def count_missing_chunks(self, space: EmbeddingSpace) -> int:
+        """Counts the chunks that have no vector in space yet."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def store_space_embeddings(
+        self, space: EmbeddingSpace, chunk_ids: list[int], embeddings: list, cursor: int, seconds: float
+    ) -> EmbeddingSpace:
+        """
+        Writes backfilled vectors and advances the space's cursor atomically,
+        bumping the corpus version when the space is the active one.
+        """
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def set_embedding_space_status(self, space: EmbeddingSpace, status: str) -> EmbeddingSpace:
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def build_embedding_space_index(self, space: EmbeddingSpace) -> None:
+        """Builds the ANN index of a shadow space without blocking writes."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def activate_embedding_space(self, space: EmbeddingSpace) -> int:
+        """Switches searches to a ready space; returns the bumped corpus version."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def retire_embedding_space(self, space: EmbeddingSpace) -> EmbeddingSpace:
+        """Drops an inactive shadow space's vectors."""
+        raise NotImplementedError("Subclass should implement this!")
+
+    @abstractmethod
+    async def get_corpus_version(self) -> int:
+        """Returns a counter that increases on every write to the corpus."""
+        raise NotImplementedError("Subclass should implement this!")
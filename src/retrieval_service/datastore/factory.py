@@ -1,5 +1,7 @@
 # Import from the current package using relative imports
+from .providers.asyncpg_postgres import AsyncpgPostgresDatastore
 from .providers.cloudsql_postgres import CloudSQLPostgresDatastore, Config
+from .providers.memory_numpy import MemoryNumpyDatastore
 
 def create_datastore(config: Config):
     """
@@ -7,5 +9,9 @@ def create_datastore(config: Config):
     """
     if config.kind == "cloudsql-postgres":
         return CloudSQLPostgresDatastore(config)
+    elif config.kind == "asyncpg-postgres":
+        return AsyncpgPostgresDatastore(config)
+    elif config.kind == "memory-numpy":
+        return MemoryNumpyDatastore(config)
     else:
         raise ValueError(f"Unsupported datastore kind: {config.kind}")
\ No newline at end of file
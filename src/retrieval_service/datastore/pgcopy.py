@@ -0,0 +1,48 @@
+import struct
+from typing import Iterable
+
+import numpy as np
+
+# PostgreSQL binary COPY format:
+# https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+COPY_HEADER = COPY_SIGNATURE + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+NULL_FIELD = struct.pack(">i", -1)
+
+
+def encode_text(value) -> bytes:
+    if value is None:
+        return NULL_FIELD
+    data = str(value).encode("utf-8")
+    return struct.pack(">i", len(data)) + data
+
+
+def encode_int8(value) -> bytes:
+    if value is None:
+        return NULL_FIELD
+    return struct.pack(">iq", 8, value)
+
+
+def encode_vector(values) -> bytes:
+    """
+    Encodes a pgvector `vector` in its binary send/recv format: int16
+    dimensions, int16 unused, then big-endian float4 values.
+    """
+    array = np.asarray(values, dtype=">f4")
+    payload = struct.pack(">hh", array.shape[0], 0) + array.tobytes()
+    return struct.pack(">i", len(payload)) + payload
+
+
+def encode_copy_binary(rows: Iterable[tuple], encoders: list) -> bytes:
+    """
+    Encodes rows as one binary COPY stream. encoders holds one callable per
+    column that turns a Python value into a length-prefixed field.
+    """
+    field_count = struct.pack(">h", len(encoders))
+    parts = [COPY_HEADER]
+    for row in rows:
+        parts.append(field_count)
+        parts.extend(encode(value) for encode, value in zip(encoders, row))
+    parts.append(COPY_TRAILER)
+    return b"".join(parts)
@@ -12,6 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from . import cloudsql_postgres
+from . import asyncpg_postgres, cloudsql_postgres, memory_numpy
 
-__ALL__ = ["cloudsql_postgres"]
+__ALL__ = ["asyncpg_postgres", "cloudsql_postgres", "memory_numpy"]
@@ -0,0 +1,573 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+from google.cloud.sql.connector import Connector, IPTypes
+from pgvector.asyncpg import register_vector
+
+from ..datastore import Client, classproperty
+from ..spaces import (
+    ACTIVE_SPACE_TTL,
+    INDEX_MAINTENANCE_WORK_MEM,
+    EmbeddingSpace,
+    base_space,
+    check_dimensions,
+    shadow_table_name,
+)
+from .cloudsql_postgres import (
+    ACTIVATE_SPACE_TEMPLATE,
+    ADVANCE_BACKFILL_TEMPLATE,
+    BATCH_SEARCH_TEMPLATE,
+    CHUNK_COLUMNS,
+    CLAIM_JOB_TEMPLATE,
+    COUNT_MISSING_CHUNKS_TEMPLATE,
+    CREATE_SHADOW_TABLE_TEMPLATE,
+    CREATE_SPACE_TEMPLATE,
+    DEACTIVATE_SPACES_TEMPLATE,
+    DEFAULT_EF_SEARCH,
+    DEFAULT_PROBES,
+    EMBEDDING_DIMENSIONS,
+    ENQUEUE_JOB_TEMPLATE,
+    FAIL_ABANDONED_JOBS_TEMPLATE,
+    FIND_DUPLICATE_CANDIDATES_TEMPLATE,
+    HYBRID_CANDIDATES,
+    HYBRID_RRF_K,
+    HYBRID_SEARCH_TEMPLATE,
+    INDEX_IS_VALID_TEMPLATE,
+    INSERT_BANDS_TEMPLATE,
+    ITERATIVE_SCAN_SQL,
+    JOB_COLUMNS,
+    LINK_DUPLICATE_TEMPLATE,
+    LIST_DOCUMENTS_TEMPLATE,
+    LIST_JOBS_TEMPLATE,
+    MAX_EF_SEARCH,
+    MAX_PROBES,
+    NEXT_BACKFILL_CHUNKS_TEMPLATE,
+    PAGED_ITERATIVE_SCAN,
+    RESET_SPACES_TEMPLATE,
+    RETIRE_SPACE_TEMPLATE,
+    SEARCH_DOCUMENTS_TEMPLATE,
+    SET_SPACE_STATUS_TEMPLATE,
+    SET_SPACE_TABLE_TEMPLATE,
+    SPACE_COLUMNS,
+    STORAGE_MODE_CHECK_SQL,
+    STORE_SPACE_EMBEDDINGS_TEMPLATE,
+    Config,
+    PoolStats,
+    SAVE_FINGERPRINT_TEMPLATE,
+    UPDATE_JOB_TEMPLATE,
+    UPSERT_DOCUMENTS_TEMPLATE,
+    _bounded,
+    check_storage_mode,
+    create_space_index_sql,
+    group_batch_rows,
+    nearest_sql,
+    reranks,
+    search_limits,
+    space_distance_sql,
+    split_chunks,
+    vector_literal,
+)
+
+# asyncpg prepares every statement it runs and keeps it in a per-connection
+# LRU, so the hot queries below are parsed and planned once per connection.
+STATEMENT_CACHE_SIZE = int(os.environ.get("ASYNCPG_STATEMENT_CACHE_SIZE", "256"))
+
+SET_SEARCH_PARAMS_SQL = (
+    "SELECT set_config('hnsw.ef_search', $1, true), "
+    "set_config('ivfflat.probes', $2, true)"
+)
+
+UPSERT_DOCUMENTS_SQL = UPSERT_DOCUMENTS_TEMPLATE.format(
+    sources="$1", titles="$2", authors="$3", publication_dates="$4"
+)
+
+
+def search_statements(space: EmbeddingSpace | None = None) -> tuple[str, str, str, str]:
+    """
+    Returns the (search, batch search, hybrid search, next page search)
+    statements reading space, or the base space if it is None. The rerank
+    limit is always the last parameter, so it is simply left out where
+    reranks(space) is false.
+    """
+    distance, space_join = space_distance_sql("$1", space)
+    return (
+        SEARCH_DOCUMENTS_TEMPLATE.format(nearest=nearest_sql("$1", "$2", "$3", space=space)),
+        BATCH_SEARCH_TEMPLATE.format(
+            nearest=nearest_sql("q.embedding", "$2", "$3", space=space),
+            embeddings="$1",
+            dimensions=space.dimensions if space is not None else EMBEDDING_DIMENSIONS,
+        ),
+        HYBRID_SEARCH_TEMPLATE.format(
+            nearest=nearest_sql("$1", "$3", "$6", space=space),
+            distance=distance, space_join=space_join,
+            query="$2", candidates="$3", rrf_k="$4", top_k="$5",
+        ),
+        SEARCH_DOCUMENTS_TEMPLATE.format(
+            nearest=nearest_sql("$1", "$2", "$5", space=space, after=("$3", "$4"))
+        ),
+    )
+
+SEARCH_DOCUMENTS_SQL, BATCH_SEARCH_SQL, HYBRID_SEARCH_SQL, PAGED_SEARCH_SQL = search_statements()
+
+LIST_DOCUMENTS_SQL = LIST_DOCUMENTS_TEMPLATE.format(after_id="$1", limit="$2")
+
+FIND_DUPLICATE_CANDIDATES_SQL = FIND_DUPLICATE_CANDIDATES_TEMPLATE.format(
+    source="$1", content_sha256="$2", band_hashes="$3"
+)
+
+LINK_DUPLICATE_SQL = LINK_DUPLICATE_TEMPLATE.format(
+    source="$1", title="$2", authors="$3", publication_date="$4",
+    canonical_id="$5", content_sha256="$6", minhash="$7",
+)
+
+SAVE_FINGERPRINT_SQL = SAVE_FINGERPRINT_TEMPLATE.format(source="$1", content_sha256="$2", minhash="$3")
+
+INSERT_BANDS_SQL = INSERT_BANDS_TEMPLATE.format(document_id="$1", band_hashes="$2")
+
+DELETE_CHUNKS_SQL = "DELETE FROM chunks WHERE document_id = $1"
+DELETE_BANDS_SQL = "DELETE FROM document_minhash_bands WHERE document_id = $1"
+
+ENQUEUE_JOB_SQL = ENQUEUE_JOB_TEMPLATE.format(
+    id="$1", source_uri="$2", generation="$3", filename="$4", extractor="$5", host="$6", trace_id="$7",
+    columns=JOB_COLUMNS,
+)
+CLAIM_JOB_SQL = CLAIM_JOB_TEMPLATE.format(host="$1", lease_seconds="$2", max_attempts="$3", columns=JOB_COLUMNS)
+FAIL_ABANDONED_JOBS_SQL = FAIL_ABANDONED_JOBS_TEMPLATE.format(
+    host="$1", lease_seconds="$2", max_attempts="$3", pinned_seconds="$4"
+)
+UPDATE_JOB_SQL = UPDATE_JOB_TEMPLATE.format(
+    id="$1", attempt="$2", status="$3", chunks="$4", error="$5", duplicate_of="$6"
+)
+GET_JOB_SQL = f"SELECT {JOB_COLUMNS} FROM ingestion_jobs WHERE id = $1"
+LIST_JOBS_SQL = LIST_JOBS_TEMPLATE.format(status="$1", limit="$2", columns=JOB_COLUMNS)
+COUNT_JOBS_SQL = "SELECT status, count(*) FROM ingestion_jobs GROUP BY status"
+
+GET_ACTIVE_SPACE_SQL = f"SELECT {SPACE_COLUMNS} FROM embedding_spaces WHERE active"
+LIST_SPACES_SQL = f"SELECT {SPACE_COLUMNS} FROM embedding_spaces ORDER BY id"
+GET_SPACE_SQL = f"SELECT {SPACE_COLUMNS} FROM embedding_spaces WHERE name = $1"
+CREATE_SPACE_SQL = CREATE_SPACE_TEMPLATE.format(name="$1", model="$2", dimensions="$3")
+SET_SPACE_TABLE_SQL = SET_SPACE_TABLE_TEMPLATE.format(id="$1", table_name="$2", columns=SPACE_COLUMNS)
+ADVANCE_BACKFILL_SQL = ADVANCE_BACKFILL_TEMPLATE.format(
+    id="$1", cursor="$2", rows="$3", seconds="$4", columns=SPACE_COLUMNS
+)
+SET_SPACE_STATUS_SQL = SET_SPACE_STATUS_TEMPLATE.format(id="$1", status="$2", columns=SPACE_COLUMNS)
+DEACTIVATE_SPACES_SQL = DEACTIVATE_SPACES_TEMPLATE.format(shadow_only="$1")
+ACTIVATE_SPACE_SQL = ACTIVATE_SPACE_TEMPLATE.format(id="CAST($1 AS integer)")
+RETIRE_SPACE_SQL = RETIRE_SPACE_TEMPLATE.format(id="$1", columns=SPACE_COLUMNS)
+INDEX_IS_VALID_SQL = INDEX_IS_VALID_TEMPLATE.format(name="$1")
+RESET_SPACES_SQL = RESET_SPACES_TEMPLATE
+
+GET_CORPUS_VERSION_SQL = "SELECT version FROM corpus_state WHERE id = 1"
+
+BUMP_CORPUS_VERSION_SQL = (
+    "UPDATE corpus_state SET version = version + 1, updated_at = now() "
+    "WHERE id = 1 RETURNING version"
+)
+
+
+class AsyncpgPostgresDatastore(Client[Config]):
+    """
+    Native asyncio provider. A single asyncpg pool serves every coroutine
+    running on the event loop that owns it.
+    """
+    def __init__(self, config: Config):
+        self.config = config
+        if not self.config.password:
+            self.config.password = os.environ.get("DB_PASSWORD")
+        self.pool_stats = PoolStats()
+        self._pool = None
+        self._pool_lock = None
+        self._connector = None
+        # (active embedding space, monotonic time it must be re-read).
+        self._active_space = None
+        # Search statements of shadow spaces, by (table, dimensions).
+        self._space_statements = {}
+
+    @classproperty
+    def kind(cls):
+        return "asyncpg-postgres"
+
+    async def _init_connection(self, conn):
+        """Registers the pgvector codec so vectors travel in binary form."""
+        self.pool_stats.record_connect()
+        await register_vector(conn)
+
+    async def _create_pool(self):
+        pool_options = dict(
+            min_size=1,
+            max_size=self.config.pool_size + self.config.max_overflow,
+            max_inactive_connection_lifetime=self.config.pool_recycle,
+            statement_cache_size=STATEMENT_CACHE_SIZE,
+            init=self._init_connection,
+        )
+        if not all([self.config.project, self.config.region, self.config.instance]):
+            # Fallback for local development or the Cloud SQL Auth Proxy
+            return await asyncpg.create_pool(
+                host=os.environ.get("DB_HOST", "127.0.0.1"),
+                port=int(os.environ.get("DB_PORT", "5432")),
+                user=self.config.user,
+                password=self.config.password,
+                database=self.config.database,
+                **pool_options,
+            )
+
+        # The async Cloud SQL Connector must be bound to the running loop.
+        self._connector = Connector(loop=asyncio.get_running_loop())
+
+        async def connect(*args, **kwargs):
+            return await self._connector.connect_async(
+                f"{self.config.project}:{self.config.region}:{self.config.instance}",
+                "asyncpg",
+                user=self.config.user,
+                password=self.config.password,
+                db=self.config.database,
+                ip_type=IPTypes.PRIVATE if os.environ.get("PRIVATE_IP") else IPTypes.PUBLIC,
+            )
+
+        return await asyncpg.create_pool(connect=connect, **pool_options)
+
+    async def pool(self) -> asyncpg.Pool:
+        """Returns the connection pool, creating it on first use."""
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    pool = await self._create_pool()
+                    if STORAGE_MODE_CHECK_SQL:
+                        try:
+                            check_storage_mode(await pool.fetchval(STORAGE_MODE_CHECK_SQL))
+                        except BaseException:
+                            await pool.close()
+                            raise
+                    self._pool = pool
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self):
+        """Acquires a pooled connection, recording how long the wait took."""
+        pool = await self.pool()
+        start = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=self.config.pool_timeout)
+        except asyncio.TimeoutError:
+            self.pool_stats.record_timeout()
+            raise
+        self.pool_stats.record_checkout(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    async def initialize_data(self, paper_chunks: list[dict]) -> None:
+        """Replaces the contents of the documents and chunks tables."""
+        async with self.connection() as conn, conn.transaction():
+            # CASCADE empties the shadow tables of the embedding spaces too.
+            await conn.execute("TRUNCATE chunks, document_minhash_bands, documents RESTART IDENTITY CASCADE")
+            await conn.execute(RESET_SPACES_SQL)
+            if await conn.fetchval(DEACTIVATE_SPACES_SQL, True) is not None:
+                await conn.execute(ACTIVATE_SPACE_SQL, None)
+            await self._copy_documents(conn, paper_chunks)
+            await conn.fetchval(BUMP_CORPUS_VERSION_SQL)
+        self._active_space = None
+
+    async def add_documents(self, paper_chunks: list[dict]) -> None:
+        await self.copy_documents(paper_chunks)
+
+    async def list_documents(self, after_id: int, limit: int) -> list[dict]:
+        async with self.connection() as conn:
+            rows = await conn.fetch(LIST_DOCUMENTS_SQL, after_id, limit)
+        return [dict(row) for row in rows]
+
+    async def copy_documents(self, paper_chunks: list[dict]) -> int:
+        """
+        Bulk-loads chunks, replacing any chunks their documents already had,
+        and returns the new corpus version.
+        """
+        async with self.connection() as conn, conn.transaction():
+            if paper_chunks:
+                await self._copy_documents(conn, paper_chunks)
+            return await conn.fetchval(BUMP_CORPUS_VERSION_SQL)
+
+    async def _copy_documents(self, conn, paper_chunks: list[dict]) -> None:
+        params, rows = split_chunks(paper_chunks)
+        document_ids = dict(await conn.fetch(
+            UPSERT_DOCUMENTS_SQL,
+            params["sources"], params["titles"], params["authors"], params["publication_dates"],
+        ))
+        await conn.executemany(DELETE_CHUNKS_SQL, [(document_id,) for document_id in document_ids.values()])
+        records = [(document_ids[source], content, embedding) for source, content, embedding in rows]
+        await conn.copy_records_to_table("chunks", records=records, columns=CHUNK_COLUMNS)
+
+    async def get_corpus_version(self) -> int:
+        async with self.connection() as conn:
+            return await conn.fetchval(GET_CORPUS_VERSION_SQL) or 0
+
+    async def find_duplicate_candidates(
+        self, source: str, content_sha256: str, band_hashes: list[int]
+    ) -> list[dict]:
+        async with self.connection() as conn:
+            rows = await conn.fetch(FIND_DUPLICATE_CANDIDATES_SQL, source, content_sha256, band_hashes)
+        return [dict(row) for row in rows]
+
+    async def link_duplicate_document(
+        self, document: dict, canonical_id: int, content_sha256: str, minhash: bytes
+    ) -> int:
+        async with self.connection() as conn, conn.transaction():
+            document_id = await conn.fetchval(
+                LINK_DUPLICATE_SQL,
+                document["source"], document["title"], document["authors"], document["publication_date"],
+                canonical_id, content_sha256, minhash,
+            )
+            await conn.execute(DELETE_CHUNKS_SQL, document_id)
+            await conn.execute(DELETE_BANDS_SQL, document_id)
+            return await conn.fetchval(BUMP_CORPUS_VERSION_SQL)
+
+    async def save_document_fingerprint(
+        self, source: str, content_sha256: str, minhash: bytes, band_hashes: list[int]
+    ) -> None:
+        async with self.connection() as conn, conn.transaction():
+            document_id = await conn.fetchval(SAVE_FINGERPRINT_SQL, source, content_sha256, minhash)
+            if document_id is None:
+                return
+            await conn.execute(DELETE_BANDS_SQL, document_id)
+            await conn.execute(INSERT_BANDS_SQL, document_id, band_hashes)
+
+    async def enqueue_job(self, job: dict) -> tuple[dict, bool]:
+        async with self.connection() as conn:
+            row = dict(await conn.fetchrow(
+                ENQUEUE_JOB_SQL,
+                job["id"], job["source_uri"], job["generation"], job["filename"],
+                job["extractor"], job["host"], job["trace_id"],
+            ))
+        return row, row.pop("created")
+
+    async def claim_job(
+        self, host: str, lease_seconds: float, max_attempts: int, pinned_seconds: float
+    ) -> dict | None:
+        async with self.connection() as conn, conn.transaction():
+            await conn.execute(FAIL_ABANDONED_JOBS_SQL, host, lease_seconds, max_attempts, pinned_seconds)
+            row = await conn.fetchrow(CLAIM_JOB_SQL, host, lease_seconds, max_attempts)
+        return dict(row) if row else None
+
+    async def update_job(
+        self, job_id: str, attempt: int, status: str,
+        chunks: int | None = None, error: str | None = None, duplicate_of: str | None = None,
+    ) -> bool:
+        async with self.connection() as conn:
+            return await conn.fetchval(
+                UPDATE_JOB_SQL, job_id, attempt, status, chunks, error, duplicate_of
+            ) is not None
+
+    async def get_job(self, job_id: str) -> dict | None:
+        async with self.connection() as conn:
+            row = await conn.fetchrow(GET_JOB_SQL, job_id)
+        return dict(row) if row else None
+
+    async def list_jobs(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        async with self.connection() as conn:
+            rows = await conn.fetch(LIST_JOBS_SQL, status, limit)
+        return [dict(row) for row in rows]
+
+    async def job_counts(self) -> dict[str, int]:
+        async with self.connection() as conn:
+            return dict(await conn.fetch(COUNT_JOBS_SQL))
+
+    async def active_embedding_space(self) -> EmbeddingSpace:
+        cached = self._active_space
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+        async with self.connection() as conn:
+            row = await conn.fetchrow(GET_ACTIVE_SPACE_SQL)
+        space = EmbeddingSpace.from_row(dict(row)) if row else base_space(EMBEDDING_DIMENSIONS)
+        self._active_space = (space, time.monotonic() + ACTIVE_SPACE_TTL)
+        return space
+
+    async def list_embedding_spaces(self) -> list[EmbeddingSpace]:
+        async with self.connection() as conn:
+            return [EmbeddingSpace.from_row(dict(row)) for row in await conn.fetch(LIST_SPACES_SQL)]
+
+    async def get_embedding_space(self, name: str) -> EmbeddingSpace | None:
+        async with self.connection() as conn:
+            row = await conn.fetchrow(GET_SPACE_SQL, name)
+        return EmbeddingSpace.from_row(dict(row)) if row else None
+
+    async def create_embedding_space(self, name: str, model: str, dimensions: int) -> EmbeddingSpace:
+        check_dimensions(dimensions)
+        async with self.connection() as conn, conn.transaction():
+            space_id = await conn.fetchval(CREATE_SPACE_SQL, name, model, dimensions)
+            space = EmbeddingSpace.from_row(dict(
+                await conn.fetchrow(SET_SPACE_TABLE_SQL, space_id, shadow_table_name(space_id))
+            ))
+            await conn.execute(CREATE_SHADOW_TABLE_TEMPLATE.format(
+                table_name=space.table_name, vector_type=space.vector_type, dimensions=space.dimensions
+            ))
+        return space
+
+    async def next_backfill_chunks(
+        self, space: EmbeddingSpace, after_id: int, limit: int
+    ) -> list[tuple[int, str]]:
+        sql = NEXT_BACKFILL_CHUNKS_TEMPLATE.format(table_name=space.table_name, after_id="$1", limit="$2")
+        async with self.connection() as conn:
+            return [tuple(row) for row in await conn.fetch(sql, after_id, limit)]
+
+    async def count_missing_chunks(self, space: EmbeddingSpace) -> int:
+        async with self.connection() as conn:
+            return await conn.fetchval(COUNT_MISSING_CHUNKS_TEMPLATE.format(table_name=space.table_name))
+
+    async def store_space_embeddings(
+        self, space: EmbeddingSpace, chunk_ids: list[int], embeddings: list, cursor: int, seconds: float
+    ) -> EmbeddingSpace:
+        async with self.connection() as conn, conn.transaction():
+            if chunk_ids:
+                await conn.execute(
+                    STORE_SPACE_EMBEDDINGS_TEMPLATE.format(
+                        table_name=space.table_name, vector_type=space.vector_type, dimensions=space.dimensions,
+                        chunk_ids="$1", embeddings="$2",
+                    ),
+                    chunk_ids, [vector_literal(e) for e in embeddings],
+                )
+            row = await conn.fetchrow(ADVANCE_BACKFILL_SQL, space.id, cursor, len(chunk_ids), seconds)
+            if row["active"] and chunk_ids:
+                # Cached results of the space being searched are now stale.
+                await conn.fetchval(BUMP_CORPUS_VERSION_SQL)
+        return EmbeddingSpace.from_row(dict(row))
+
+    async def set_embedding_space_status(self, space: EmbeddingSpace, status: str) -> EmbeddingSpace:
+        async with self.connection() as conn:
+            return EmbeddingSpace.from_row(dict(await conn.fetchrow(SET_SPACE_STATUS_SQL, space.id, status)))
+
+    async def build_embedding_space_index(self, space: EmbeddingSpace) -> None:
+        # Outside a transaction block asyncpg runs every statement in autocommit,
+        # which CREATE INDEX CONCURRENTLY requires.
+        async with self.connection() as conn:
+            if await conn.fetchval(INDEX_IS_VALID_SQL, space.index_name) is False:
+                await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {space.index_name}")
+            await conn.execute(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+            await conn.execute(create_space_index_sql(space))
+            await conn.execute("RESET maintenance_work_mem")
+
+    async def activate_embedding_space(self, space: EmbeddingSpace) -> int:
+        async with self.connection() as conn, conn.transaction():
+            await conn.execute(DEACTIVATE_SPACES_SQL, False)
+            if await conn.fetchval(ACTIVATE_SPACE_SQL, space.id) is None:
+                raise ValueError(f"Embedding space {space.name} is not ready")
+            version = await conn.fetchval(BUMP_CORPUS_VERSION_SQL)
+        self._active_space = None
+        return version
+
+    async def retire_embedding_space(self, space: EmbeddingSpace) -> EmbeddingSpace:
+        async with self.connection() as conn, conn.transaction():
+            row = await conn.fetchrow(RETIRE_SPACE_SQL, space.id)
+            if row is None:
+                raise ValueError(f"Embedding space {space.name} is active or the base space")
+            await conn.execute(f"DROP TABLE IF EXISTS {space.table_name}")
+        return EmbeddingSpace.from_row(dict(row))
+
+    def _search_statements(self, space: EmbeddingSpace) -> tuple[str, str, str, str]:
+        if space.is_base:
+            return SEARCH_DOCUMENTS_SQL, BATCH_SEARCH_SQL, HYBRID_SEARCH_SQL, PAGED_SEARCH_SQL
+        key = (space.table_name, space.dimensions)
+        if key not in self._space_statements:
+            self._space_statements[key] = search_statements(space)
+        return self._space_statements[key]
+
+    async def search_documents(
+        self,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+        after: tuple[float, int] | None = None,
+    ) -> list[dict]:
+        space = space or await self.active_embedding_space()
+        search_sql, _, _, paged_sql = self._search_statements(space)
+        ef_search = _bounded("ef_search", ef_search, DEFAULT_EF_SEARCH, MAX_EF_SEARCH)
+        probes = _bounded("probes", probes, DEFAULT_PROBES, MAX_PROBES)
+        rerank_limit, ef_search = search_limits(top_k, ef_search, space)
+        # asyncpg needs exactly as many arguments as placeholders, and the
+        # rerank limit placeholder only appears where the space reranks.
+        args = (query_embedding, top_k)
+        if after is not None:
+            search_sql = paged_sql
+            args += (float(after[0]), int(after[1]))
+        args += (rerank_limit,) if reranks(space) else ()
+        async with self.connection() as conn, conn.transaction():
+            await conn.execute(SET_SEARCH_PARAMS_SQL, str(ef_search), str(probes))
+            if after is not None and PAGED_ITERATIVE_SCAN:
+                await conn.execute(ITERATIVE_SCAN_SQL)
+            rows = await conn.fetch(search_sql, *args)
+        return [dict(row) for row in rows]
+
+    async def batch_search_documents(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[list[dict]]:
+        if not query_embeddings:
+            return []
+        space = space or await self.active_embedding_space()
+        _, batch_sql, _, _ = self._search_statements(space)
+        ef_search = _bounded("ef_search", ef_search, DEFAULT_EF_SEARCH, MAX_EF_SEARCH)
+        probes = _bounded("probes", probes, DEFAULT_PROBES, MAX_PROBES)
+        rerank_limit, ef_search = search_limits(top_k, ef_search, space)
+        args = ([vector_literal(e) for e in query_embeddings], top_k)
+        args += (rerank_limit,) if reranks(space) else ()
+        async with self.connection() as conn, conn.transaction():
+            await conn.execute(SET_SEARCH_PARAMS_SQL, str(ef_search), str(probes))
+            rows = await conn.fetch(batch_sql, *args)
+        return group_batch_rows(rows, len(query_embeddings))
+
+    async def hybrid_search_documents(
+        self,
+        query: str,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[dict]:
+        space = space or await self.active_embedding_space()
+        _, _, hybrid_sql, _ = self._search_statements(space)
+        ef_search = _bounded("ef_search", ef_search, DEFAULT_EF_SEARCH, MAX_EF_SEARCH)
+        probes = _bounded("probes", probes, DEFAULT_PROBES, MAX_PROBES)
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        rerank_limit, ef_search = search_limits(candidates, ef_search, space)
+        args = (query_embedding, query, candidates, HYBRID_RRF_K, top_k)
+        args += (rerank_limit,) if reranks(space) else ()
+        async with self.connection() as conn, conn.transaction():
+            await conn.execute(SET_SEARCH_PARAMS_SQL, str(ef_search), str(probes))
+            rows = await conn.fetch(hybrid_sql, *args)
+        return [dict(row) for row in rows]
+
+    def pool_status(self) -> dict:
+        status = {"pool_size": 0, "max_size": self.config.pool_size + self.config.max_overflow}
+        if self._pool is not None:
+            status.update(
+                pool_size=self._pool.get_size(),
+                checked_out=self._pool.get_size() - self._pool.get_idle_size(),
+                checked_in=self._pool.get_idle_size(),
+            )
+        status.update(self.pool_stats.snapshot())
+        return status
+
+    def after_fork(self):
+        # Sockets and the loop that owned them belong to the parent process.
+        self._pool = None
+        self._pool_lock = None
+        self._connector = None
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        if self._connector is not None:
+            await self._connector.close_async()
+            self._connector = None
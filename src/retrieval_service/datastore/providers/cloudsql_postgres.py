@@ -1,19 +1,797 @@
+import io
 import os
+import threading
+import time
+from contextlib import contextmanager
 import sqlalchemy
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, event, exc, text
 from sqlalchemy.orm import sessionmaker
+from pgvector.sqlalchemy import Vector
 # Use psycopg2 as specified in requirements.txt
 from google.cloud.sql.connector import Connector, IPTypes
 from pydantic import BaseModel
 
+from ..pgcopy import encode_copy_binary, encode_int8, encode_text, encode_vector
+from ..spaces import (
+    ACTIVE_SPACE_TTL,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_M,
+    INDEX_MAINTENANCE_WORK_MEM,
+    EmbeddingSpace,
+    base_space,
+    check_dimensions,
+    shadow_table_name,
+)
+
 class Config(BaseModel):
     kind: str
-    project: str = None
-    region: str = None
-    instance: str = None
+    project: str | None = None
+    region: str | None = None
+    instance: str | None = None
     user: str
-    password: str = None   # Allow password to be optional in config if set via env var
+    password: str | None = None   # Allow password to be optional in config if set via env var
     database: str
+    # Connection pool settings. One pool is shared by every request in a
+    # worker process, so size it as (max DB connections / total workers).
+    pool_size: int = 5
+    max_overflow: int = 2
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+
+EMBEDDING_DIMENSIONS = 768
+
+# Default ANN search settings, used when a request does not override them.
+# hnsw.ef_search is the size of the HNSW candidate list (higher = better recall,
+# slower); ivfflat.probes is the number of IVF lists scanned.
+DEFAULT_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "40"))
+DEFAULT_PROBES = int(os.environ.get("IVFFLAT_PROBES", "1"))
+MAX_EF_SEARCH = 1000
+MAX_PROBES = 1000
+
+# How embeddings are searched, chosen per deployment to match the columns
+# and index created by the compact-vectors migration:
+#   "full"    - HNSW/IVFFlat index on the float32 embedding column.
+#   "halfvec" - index on a float16 copy (half the index memory).
+#   "bit"     - index on a binary-quantized copy (1/32 of the memory).
+# The compact modes over-fetch VECTOR_RERANK_FACTOR x the requested rows from
+# the compact index and re-rank them exactly on the float32 embeddings.
+VECTOR_STORAGE_MODE = os.environ.get("VECTOR_STORAGE_MODE", "full").lower()
+DEFAULT_RERANK_FACTORS = {"full": 1, "halfvec": 4, "bit": 10}
+if VECTOR_STORAGE_MODE not in DEFAULT_RERANK_FACTORS:
+    raise ValueError(f"Unsupported VECTOR_STORAGE_MODE: {VECTOR_STORAGE_MODE}")
+VECTOR_RERANK_FACTOR = int(
+    os.environ.get("VECTOR_RERANK_FACTOR", DEFAULT_RERANK_FACTORS[VECTOR_STORAGE_MODE])
+)
+
+# The ANN index the compact-vectors migration builds for each compact mode.
+# That migration does what VECTOR_STORAGE_MODE said when it ran, so the
+# service checks on its first connection that the index for its own mode
+# exists instead of failing every search later.
+COMPACT_INDEXES = {"halfvec": "ix_chunks_embedding_half_ann", "bit": "ix_chunks_embedding_bit_ann"}
+STORAGE_MODE_CHECK_SQL = (
+    f"SELECT to_regclass('{COMPACT_INDEXES[VECTOR_STORAGE_MODE]}') IS NOT NULL"
+    if VECTOR_STORAGE_MODE in COMPACT_INDEXES else None
+)
+
+
+def check_storage_mode(index_exists: bool) -> None:
+    """Raises unless the database has the index VECTOR_STORAGE_MODE searches."""
+    if not index_exists:
+        raise RuntimeError(
+            f"VECTOR_STORAGE_MODE={VECTOR_STORAGE_MODE} needs index "
+            f"{COMPACT_INDEXES[VECTOR_STORAGE_MODE]}, which the database lacks; re-run "
+            f"migration e5a8c1b3f7d2 with VECTOR_STORAGE_MODE={VECTOR_STORAGE_MODE} (see its docstring)"
+        )
+
+
+COMPACT_ORDER_BY = {
+    # The inner cast pins the parameter's type to vector for drivers that
+    # infer parameter types (asyncpg).
+    "halfvec": "embedding_half <=> CAST(CAST({embedding} AS vector({dimensions})) AS halfvec({dimensions}))",
+    "bit": (
+        "embedding_bit <~> "
+        "CAST(binary_quantize(CAST({embedding} AS vector({dimensions}))) AS bit({dimensions}))"
+    ),
+}
+
+
+def space_query_sql(space: EmbeddingSpace, embedding: str) -> str:
+    """The query vector cast to the column type of space's shadow table."""
+    vector = f"CAST({embedding} AS vector({space.dimensions}))"
+    if space.vector_type == "vector":
+        return vector
+    return f"CAST({vector} AS halfvec({space.dimensions}))"
+
+
+def after_sql(distance: str, id_column: str, after: tuple[str, str] | None, indent: int = 12) -> str:
+    """WHERE clause keeping rows ordered after the (distance, id) key, given as placeholders."""
+    if after is None:
+        return ""
+    after_distance, after_id = after
+    return (
+        "\n" + " " * indent
+        + f"WHERE ({distance}, {id_column}) > (CAST({after_distance} AS double precision), CAST({after_id} AS bigint))"
+    )
+
+
+def nearest_sql(
+    embedding: str, limit: str, rerank_limit: str, mode: str = VECTOR_STORAGE_MODE,
+    space: EmbeddingSpace | None = None, after: tuple[str, str] | None = None,
+) -> str:
+    """
+    Returns a query for the limit chunks nearest to embedding, as (id,
+    document_id, content, distance), using the given parameter placeholders.
+    rerank_limit is the compact-index over-fetch and is unused in "full" mode
+    and in shadow spaces, whose vectors are searched as stored. after, a
+    (distance, id) pair of placeholders, keeps only the chunks past that
+    key; the index scan itself applies it, so a page never re-reads the
+    rows of earlier pages.
+    """
+    if space is not None and not space.is_base:
+        query = space_query_sql(space, embedding)
+        return f"""
+            SELECT c.id, c.document_id, c.content, n.distance
+            FROM (
+                SELECT chunk_id, embedding <=> {query} AS distance
+                FROM {space.table_name}{after_sql(f"embedding <=> {query}", "chunk_id", after, 16)}
+                ORDER BY embedding <=> {query}
+                LIMIT {limit}
+            ) AS n
+            JOIN chunks AS c ON c.id = n.chunk_id"""
+    if mode == "full":
+        return f"""
+            SELECT id, document_id, content, embedding <=> {embedding} AS distance
+            FROM chunks{after_sql(f"embedding <=> {embedding}", "id", after)}
+            ORDER BY embedding <=> {embedding}
+            LIMIT {limit}"""
+    order_by = COMPACT_ORDER_BY[mode].format(embedding=embedding, dimensions=EMBEDDING_DIMENSIONS)
+    # The key is on the exact distance the results are ordered by, not on
+    # the compact one the index is ordered by.
+    return f"""
+            SELECT c.id, c.document_id, c.content, c.embedding <=> {embedding} AS distance
+            FROM (
+                SELECT id FROM chunks{after_sql(f"embedding <=> {embedding}", "id", after, 16)}
+                ORDER BY {order_by}
+                LIMIT {rerank_limit}
+            ) AS candidates
+            JOIN chunks AS c ON c.id = candidates.id
+            ORDER BY distance
+            LIMIT {limit}"""
+
+
+def space_distance_sql(embedding: str, space: EmbeddingSpace | None = None) -> tuple[str, str]:
+    """
+    Returns (distance of chunk c to embedding, join bringing in c's vector).
+    Chunks not yet backfilled into a shadow space have a NULL distance.
+    """
+    if space is None or space.is_base:
+        return f"c.embedding <=> {embedding}", ""
+    return (
+        f"e.embedding <=> {space_query_sql(space, embedding)}",
+        f"LEFT JOIN {space.table_name} AS e ON e.chunk_id = c.id",
+    )
+
+
+def reranks(space: EmbeddingSpace | None = None) -> bool:
+    """Whether searches of space over-fetch from a compact index."""
+    return VECTOR_STORAGE_MODE != "full" and (space is None or space.is_base)
+
+
+def search_limits(limit: int, ef_search: int, space: EmbeddingSpace | None = None) -> tuple[int, int]:
+    """
+    Returns (rerank_limit, ef_search) for a query that needs limit rows.
+    HNSW returns at most ef_search rows, so it is raised to cover them.
+    """
+    rerank_limit = limit * VECTOR_RERANK_FACTOR if reranks(space) else limit
+    return rerank_limit, min(MAX_EF_SEARCH, max(ef_search, rerank_limit))
+
+
+# Metadata lives on documents; it is joined in only for the top_k hits.
+SEARCH_DOCUMENTS_TEMPLATE = """
+    WITH nearest AS ({nearest}
+    )
+    SELECT n.id, n.document_id, COALESCE(d.canonical_id, d.id) AS canonical_document_id,
+           d.source, d.title, d.authors, d.publication_date, n.content, n.distance
+    FROM nearest AS n JOIN documents AS d ON d.id = n.document_id
+    ORDER BY n.distance, n.id
+"""
+
+# Pages after the first filter the index scan by their cursor, so HNSW has
+# to keep walking the graph past the rows of earlier pages: pgvector 0.8+
+# iterative scans do that until a full page passes the filter (bounded by
+# hnsw.max_scan_tuples). Set PAGED_ITERATIVE_SCAN=off on older pgvector,
+# where deeper pages may come back short.
+PAGED_ITERATIVE_SCAN = os.environ.get("PAGED_ITERATIVE_SCAN", "on").lower() not in ("0", "off", "false")
+ITERATIVE_SCAN_SQL = (
+    "SELECT set_config('hnsw.iterative_scan', 'strict_order', true), "
+    "set_config('ivfflat.iterative_scan', 'relaxed_order', true)"
+)
+
+# Many queries in one statement: the query vectors arrive as a text[] of
+# pgvector literals and each one drives a LATERAL nearest-neighbour scan.
+BATCH_SEARCH_TEMPLATE = """
+    SELECT q.query_index, n.id, n.document_id, COALESCE(d.canonical_id, d.id) AS canonical_document_id,
+           d.source, d.title, d.authors, d.publication_date, n.content, n.distance
+    FROM (
+        SELECT CAST(ordinality AS integer) - 1 AS query_index,
+               CAST(vector_text AS vector({dimensions})) AS embedding
+        FROM unnest(CAST({embeddings} AS text[])) WITH ORDINALITY AS u(vector_text, ordinality)
+    ) AS q
+    CROSS JOIN LATERAL ({nearest}
+    ) AS n
+    JOIN documents AS d ON d.id = n.document_id
+    ORDER BY q.query_index, n.distance, n.id
+"""
+
+
+def vector_literal(values) -> str:
+    """Formats an embedding in pgvector's text input format."""
+    return "[" + ",".join(repr(float(x)) for x in values) + "]"
+
+
+def group_batch_rows(rows, count: int) -> list[list[dict]]:
+    """Splits batch search rows into one result list per query."""
+    results = [[] for _ in range(count)]
+    for row in rows:
+        row = dict(row)
+        results[row.pop("query_index")].append(row)
+    return results
+
+
+# Hybrid search: each ranking contributes its top HYBRID_CANDIDATES ids, and
+# reciprocal rank fusion scores an id as sum(1 / (HYBRID_RRF_K + rank)).
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "60"))
+HYBRID_RRF_K = int(os.environ.get("HYBRID_RRF_K", "60"))
+
+# Shared by the providers; placeholders are filled with each driver's
+# parameter syntax. Vector, full-text and trigram rankings are fused in a
+# single statement. Trigram matching needs at least one full trigram.
+HYBRID_SEARCH_TEMPLATE = """
+    WITH vector AS (
+        SELECT id, row_number() OVER (ORDER BY distance) AS rank
+        FROM ({nearest}
+        ) AS nearest
+    ),
+    fulltext AS (
+        SELECT id, row_number() OVER (ORDER BY ts_rank_cd(content_tsv, q) DESC) AS rank
+        FROM chunks, websearch_to_tsquery('simple', CAST({query} AS text)) AS q
+        WHERE content_tsv @@ q
+        ORDER BY ts_rank_cd(content_tsv, q) DESC
+        LIMIT {candidates}
+    ),
+    trigram AS (
+        SELECT id, row_number() OVER (
+                   ORDER BY word_similarity(CAST({query} AS text), content) DESC
+               ) AS rank
+        FROM chunks
+        WHERE length(CAST({query} AS text)) >= 3 AND CAST({query} AS text) <% content
+        ORDER BY word_similarity(CAST({query} AS text), content) DESC
+        LIMIT {candidates}
+    ),
+    fused AS (
+        SELECT id, CAST(sum(1.0 / (CAST({rrf_k} AS integer) + rank)) AS double precision) AS score
+        FROM (
+            SELECT id, rank FROM vector
+            UNION ALL SELECT id, rank FROM fulltext
+            UNION ALL SELECT id, rank FROM trigram
+        ) AS ranks
+        GROUP BY id
+        ORDER BY score DESC
+        LIMIT {top_k}
+    )
+    SELECT c.id, c.document_id, COALESCE(d.canonical_id, d.id) AS canonical_document_id,
+           d.source, d.title, d.authors, d.publication_date,
+           c.content, {distance} AS distance, f.score
+    FROM fused AS f
+    JOIN chunks AS c ON c.id = f.id
+    {space_join}
+    JOIN documents AS d ON d.id = c.document_id
+    ORDER BY f.score DESC
+"""
+
+
+def search_statements(space: EmbeddingSpace | None = None) -> tuple:
+    """
+    Returns the (search, batch search, hybrid search, next page search)
+    statements reading space, or the base space (chunks.embedding) if it
+    is None.
+    """
+    dimensions = space.dimensions if space is not None else EMBEDDING_DIMENSIONS
+    distance, space_join = space_distance_sql(":embedding", space)
+    search = SEARCH_DOCUMENTS_TEMPLATE.format(
+        nearest=nearest_sql(":embedding", ":top_k", ":rerank_limit", space=space)
+    )
+    paged = SEARCH_DOCUMENTS_TEMPLATE.format(
+        nearest=nearest_sql(
+            ":embedding", ":top_k", ":rerank_limit", space=space, after=(":after_distance", ":after_id")
+        )
+    )
+    batch = BATCH_SEARCH_TEMPLATE.format(
+        nearest=nearest_sql("q.embedding", ":top_k", ":rerank_limit", space=space),
+        embeddings=":embeddings",
+        dimensions=dimensions,
+    )
+    hybrid = HYBRID_SEARCH_TEMPLATE.format(
+        nearest=nearest_sql(":embedding", ":candidates", ":rerank_limit", space=space),
+        distance=distance, space_join=space_join,
+        query=":query", candidates=":candidates", rrf_k=":rrf_k", top_k=":top_k",
+    )
+    return (
+        text(search).bindparams(bindparam("embedding", type_=Vector(dimensions))),
+        text(batch),
+        text(hybrid).bindparams(bindparam("embedding", type_=Vector(dimensions))),
+        text(paged).bindparams(bindparam("embedding", type_=Vector(dimensions))),
+    )
+
+SEARCH_DOCUMENTS_SQL, BATCH_SEARCH_SQL, HYBRID_SEARCH_SQL, PAGED_SEARCH_SQL = search_statements()
+
+# Keyset listing: every page is a primary key range scan, however deep.
+LIST_DOCUMENTS_TEMPLATE = """
+    SELECT id, source, title, authors, publication_date,
+           COALESCE(canonical_id, id) AS canonical_document_id, created_at
+    FROM documents
+    WHERE id > CAST({after_id} AS bigint)
+    ORDER BY id
+    LIMIT {limit}
+"""
+LIST_DOCUMENTS_SQL = text(LIST_DOCUMENTS_TEMPLATE.format(after_id=":after_id", limit=":limit"))
+
+CHUNK_COLUMNS = ["document_id", "content", "embedding"]
+CHUNK_ENCODERS = [encode_int8, encode_text, encode_vector]
+
+COPY_CHUNKS_SQL = (
+    f"COPY chunks ({', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+)
+
+# Upserts one row per source and returns every id, so chunks can reference
+# documents created by this or an earlier load.
+UPSERT_DOCUMENTS_TEMPLATE = """
+    INSERT INTO documents (source, title, authors, publication_date)
+    SELECT * FROM unnest(
+        CAST({sources} AS text[]), CAST({titles} AS text[]),
+        CAST({authors} AS text[]), CAST({publication_dates} AS text[])
+    )
+    ON CONFLICT (source) DO UPDATE
+        SET title = EXCLUDED.title,
+            authors = EXCLUDED.authors,
+            publication_date = EXCLUDED.publication_date
+    RETURNING source, id
+"""
+
+UPSERT_DOCUMENTS_SQL = text(
+    UPSERT_DOCUMENTS_TEMPLATE.format(
+        sources=":sources", titles=":titles", authors=":authors", publication_dates=":publication_dates"
+    )
+)
+
+# Duplicate detection (see ingestion/dedup.py). Candidates are canonical
+# documents, other than the one being ingested, with the same exact hash or
+# at least one equal LSH band hash.
+FIND_DUPLICATE_CANDIDATES_TEMPLATE = """
+    SELECT id, source, content_sha256, minhash
+    FROM documents
+    WHERE canonical_id IS NULL
+      AND minhash IS NOT NULL
+      AND source <> CAST({source} AS text)
+      AND (
+          content_sha256 = CAST({content_sha256} AS text)
+          OR id IN (
+              SELECT b.document_id
+              FROM unnest(CAST({band_hashes} AS bigint[])) WITH ORDINALITY AS u(hash, ordinality)
+              JOIN document_minhash_bands AS b
+                ON b.band = CAST(u.ordinality AS integer) - 1 AND b.hash = u.hash
+          )
+      )
+"""
+
+FIND_DUPLICATE_CANDIDATES_SQL = text(
+    FIND_DUPLICATE_CANDIDATES_TEMPLATE.format(
+        source=":source", content_sha256=":content_sha256", band_hashes=":band_hashes"
+    )
+)
+
+# A duplicate keeps its own documents row, pointing at the canonical one,
+# and no chunks.
+LINK_DUPLICATE_TEMPLATE = """
+    INSERT INTO documents (source, title, authors, publication_date, canonical_id, content_sha256, minhash)
+    VALUES ({source}, {title}, {authors}, {publication_date}, {canonical_id}, {content_sha256}, {minhash})
+    ON CONFLICT (source) DO UPDATE
+        SET title = EXCLUDED.title,
+            authors = EXCLUDED.authors,
+            publication_date = EXCLUDED.publication_date,
+            canonical_id = EXCLUDED.canonical_id,
+            content_sha256 = EXCLUDED.content_sha256,
+            minhash = EXCLUDED.minhash
+    RETURNING id
+"""
+
+LINK_DUPLICATE_SQL = text(
+    LINK_DUPLICATE_TEMPLATE.format(
+        source=":source", title=":title", authors=":authors", publication_date=":publication_date",
+        canonical_id=":canonical_id", content_sha256=":content_sha256", minhash=":minhash",
+    )
+)
+
+SAVE_FINGERPRINT_TEMPLATE = """
+    UPDATE documents
+    SET content_sha256 = {content_sha256}, minhash = {minhash}, canonical_id = NULL
+    WHERE source = {source}
+    RETURNING id
+"""
+
+SAVE_FINGERPRINT_SQL = text(
+    SAVE_FINGERPRINT_TEMPLATE.format(source=":source", content_sha256=":content_sha256", minhash=":minhash")
+)
+
+INSERT_BANDS_TEMPLATE = """
+    INSERT INTO document_minhash_bands (band, hash, document_id)
+    SELECT CAST(ordinality AS integer) - 1, hash, {document_id}
+    FROM unnest(CAST({band_hashes} AS bigint[])) WITH ORDINALITY AS u(hash, ordinality)
+    ON CONFLICT DO NOTHING
+"""
+
+INSERT_BANDS_SQL = text(INSERT_BANDS_TEMPLATE.format(document_id=":document_id", band_hashes=":band_hashes"))
+
+DELETE_CHUNKS_SQL = text("DELETE FROM chunks WHERE document_id = :document_id")
+DELETE_BANDS_SQL = text("DELETE FROM document_minhash_bands WHERE document_id = :document_id")
+
+GET_CORPUS_VERSION_SQL = text("SELECT version FROM corpus_state WHERE id = 1")
+
+BUMP_CORPUS_VERSION_SQL = text(
+    "UPDATE corpus_state SET version = version + 1, updated_at = now() "
+    "WHERE id = 1 RETURNING version"
+)
+
+
+# Ingestion job queue (see jobs.py). Rows are claimed with SKIP LOCKED, so
+# any number of worker threads and processes can share the table; a claimed
+# job whose row has not been touched for the lease period is presumed lost
+# with its worker and is claimed again, up to max_attempts times.
+JOB_COLUMNS = (
+    "id, source_uri, generation, filename, extractor, host, status, chunks, error, "
+    "duplicate_of, trace_id, attempts, created_at, updated_at, finished_at"
+)
+
+# A repeated notification for the same object generation returns the
+# existing job instead of queuing a second one.
+ENQUEUE_JOB_TEMPLATE = """
+    WITH inserted AS (
+        INSERT INTO ingestion_jobs (id, source_uri, generation, filename, extractor, host, trace_id)
+        VALUES ({id}, {source_uri}, {generation}, {filename}, {extractor}, {host}, {trace_id})
+        ON CONFLICT (source_uri, generation) DO NOTHING
+        RETURNING {columns}, true AS created
+    )
+    SELECT * FROM inserted
+    UNION ALL
+    SELECT {columns}, false AS created
+    FROM ingestion_jobs
+    WHERE source_uri = {source_uri} AND generation = {generation}
+      AND NOT EXISTS (SELECT 1 FROM inserted)
+"""
+
+CLAIM_JOB_TEMPLATE = """
+    UPDATE ingestion_jobs
+    SET status = 'extracting', attempts = attempts + 1, error = NULL, updated_at = now()
+    WHERE id = (
+        SELECT id
+        FROM ingestion_jobs
+        WHERE (
+                status = 'queued'
+                OR (status IN ('extracting', 'embedding')
+                    AND updated_at < now() - make_interval(secs => CAST({lease_seconds} AS double precision)))
+            )
+          AND attempts < CAST({max_attempts} AS integer)
+          AND (host IS NULL OR host = CAST({host} AS text))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING {columns}
+"""
+
+# Also fails jobs pinned to another host that has not touched them for
+# pinned_seconds: their staged file is on that host's disk, so once it is
+# gone no other worker can run them.
+FAIL_ABANDONED_JOBS_TEMPLATE = """
+    UPDATE ingestion_jobs
+    SET status = 'failed',
+        error = CASE WHEN host IS NULL OR host = CAST({host} AS text)
+                     THEN 'Worker lost on every attempt'
+                     ELSE 'Host holding the staged upload went away' END,
+        updated_at = now(), finished_at = now()
+    WHERE (
+            status IN ('extracting', 'embedding')
+            AND updated_at < now() - make_interval(secs => CAST({lease_seconds} AS double precision))
+            AND attempts >= CAST({max_attempts} AS integer)
+        )
+       OR (
+            status IN ('queued', 'extracting', 'embedding')
+            AND host <> CAST({host} AS text)
+            AND updated_at < now() - make_interval(secs => CAST({pinned_seconds} AS double precision))
+        )
+"""
+
+# Only the worker holding the current attempt may move a job on; a worker
+# that lost its lease gets no row back and abandons the job.
+UPDATE_JOB_TEMPLATE = """
+    UPDATE ingestion_jobs
+    SET status = CAST({status} AS text),
+        chunks = COALESCE(CAST({chunks} AS integer), chunks),
+        error = CAST({error} AS text),
+        duplicate_of = COALESCE(CAST({duplicate_of} AS text), duplicate_of),
+        updated_at = now(),
+        finished_at = CASE WHEN CAST({status} AS text) IN ('stored', 'failed') THEN now() END
+    WHERE id = {id} AND attempts = CAST({attempt} AS integer)
+    RETURNING id
+"""
+
+LIST_JOBS_TEMPLATE = """
+    SELECT {columns}
+    FROM ingestion_jobs
+    WHERE CAST({status} AS text) IS NULL OR status = CAST({status} AS text)
+    ORDER BY created_at DESC
+    LIMIT {limit}
+"""
+
+ENQUEUE_JOB_SQL = text(
+    ENQUEUE_JOB_TEMPLATE.format(
+        id=":id", source_uri=":source_uri", generation=":generation", filename=":filename",
+        extractor=":extractor", host=":host", trace_id=":trace_id", columns=JOB_COLUMNS,
+    )
+)
+CLAIM_JOB_SQL = text(
+    CLAIM_JOB_TEMPLATE.format(
+        lease_seconds=":lease_seconds", max_attempts=":max_attempts", host=":host", columns=JOB_COLUMNS
+    )
+)
+FAIL_ABANDONED_JOBS_SQL = text(
+    FAIL_ABANDONED_JOBS_TEMPLATE.format(
+        lease_seconds=":lease_seconds", max_attempts=":max_attempts", host=":host", pinned_seconds=":pinned_seconds"
+    )
+)
+UPDATE_JOB_SQL = text(
+    UPDATE_JOB_TEMPLATE.format(
+        id=":id", attempt=":attempt", status=":status", chunks=":chunks", error=":error", duplicate_of=":duplicate_of"
+    )
+)
+GET_JOB_SQL = text(f"SELECT {JOB_COLUMNS} FROM ingestion_jobs WHERE id = :id")
+LIST_JOBS_SQL = text(LIST_JOBS_TEMPLATE.format(status=":status", limit=":limit", columns=JOB_COLUMNS))
+COUNT_JOBS_SQL = text("SELECT status, count(*) FROM ingestion_jobs GROUP BY status")
+
+
+# Embedding spaces (see datastore/spaces.py and embedding_spaces.py).
+SPACE_COLUMNS = (
+    "id, name, model, dimensions, table_name, status, active, backfill_cursor, rows_embedded, "
+    "embed_seconds, created_at, updated_at, ready_at"
+)
+
+CREATE_SPACE_TEMPLATE = """
+    INSERT INTO embedding_spaces (name, model, dimensions, status)
+    VALUES ({name}, {model}, {dimensions}, 'backfilling')
+    RETURNING id
+"""
+
+SET_SPACE_TABLE_TEMPLATE = """
+    UPDATE embedding_spaces SET table_name = {table_name}
+    WHERE id = {id}
+    RETURNING {columns}
+"""
+
+# Shadow tables are created at run time, once the model's dimensions are
+# known. Deleting a chunk deletes its vectors in every space.
+CREATE_SHADOW_TABLE_TEMPLATE = """
+    CREATE TABLE {table_name} (
+        chunk_id bigint PRIMARY KEY REFERENCES chunks (id) ON DELETE CASCADE,
+        embedding {vector_type}({dimensions}) NOT NULL
+    )
+"""
+
+# The backfill pages through the chunks that have no vector in the space
+# yet, in primary key order. Within a pass each page starts after the last id
+# of the previous one; every pass starts from the first chunk, so chunks
+# committed behind an earlier pass (ids are not committed in order) are
+# picked up by the next one rather than skipped.
+NEXT_BACKFILL_CHUNKS_TEMPLATE = """
+    SELECT c.id, c.content
+    FROM chunks AS c
+    WHERE c.id > {after_id}
+      AND NOT EXISTS (SELECT 1 FROM {table_name} AS e WHERE e.chunk_id = c.id)
+    ORDER BY c.id
+    LIMIT {limit}
+"""
+
+COUNT_MISSING_CHUNKS_TEMPLATE = """
+    SELECT count(*)
+    FROM chunks AS c
+    WHERE NOT EXISTS (SELECT 1 FROM {table_name} AS e WHERE e.chunk_id = c.id)
+"""
+
+# Vectors arrive as a text[] of pgvector literals. Chunks deleted since the
+# page was read are skipped.
+STORE_SPACE_EMBEDDINGS_TEMPLATE = """
+    INSERT INTO {table_name} (chunk_id, embedding)
+    SELECT u.chunk_id, CAST(u.vector_text AS {vector_type}({dimensions}))
+    FROM unnest(CAST({chunk_ids} AS bigint[]), CAST({embeddings} AS text[])) AS u(chunk_id, vector_text)
+    JOIN chunks AS c ON c.id = u.chunk_id
+    ON CONFLICT (chunk_id) DO UPDATE SET embedding = EXCLUDED.embedding
+"""
+
+# Committed with the page's vectors. The cursor is the highest chunk id
+# stored so far and is only reported; what is missing is found by the
+# anti-join above.
+ADVANCE_BACKFILL_TEMPLATE = """
+    UPDATE embedding_spaces
+    SET backfill_cursor = GREATEST(backfill_cursor, CAST({cursor} AS bigint)),
+        rows_embedded = rows_embedded + CAST({rows} AS bigint),
+        embed_seconds = embed_seconds + CAST({seconds} AS double precision),
+        updated_at = now()
+    WHERE id = {id}
+    RETURNING {columns}
+"""
+
+SET_SPACE_STATUS_TEMPLATE = """
+    UPDATE embedding_spaces
+    SET status = CAST({status} AS text),
+        updated_at = now(),
+        ready_at = CASE WHEN CAST({status} AS text) = 'ready' THEN now() ELSE ready_at END
+    WHERE id = {id}
+    RETURNING {columns}
+"""
+
+# At most one space is active (a partial unique index), so the old one is
+# switched off in a statement of its own before the new one is switched on.
+DEACTIVATE_SPACES_TEMPLATE = """
+    UPDATE embedding_spaces SET active = false, updated_at = now()
+    WHERE active AND (NOT CAST({shadow_only} AS boolean) OR table_name IS NOT NULL)
+    RETURNING id
+"""
+
+ACTIVATE_SPACE_TEMPLATE = """
+    UPDATE embedding_spaces SET active = true, updated_at = now()
+    WHERE status = 'ready' AND (id = {id} OR ({id} IS NULL AND table_name IS NULL))
+    RETURNING id
+"""
+
+RETIRE_SPACE_TEMPLATE = """
+    UPDATE embedding_spaces SET status = 'retired', updated_at = now()
+    WHERE id = {id} AND NOT active AND table_name IS NOT NULL
+    RETURNING {columns}
+"""
+
+# Reloading the corpus restarts chunk ids: shadow spaces start over and
+# searches go back to the base space.
+RESET_SPACES_TEMPLATE = """
+    UPDATE embedding_spaces
+    SET backfill_cursor = 0, rows_embedded = 0, embed_seconds = 0, status = 'backfilling', updated_at = now()
+    WHERE table_name IS NOT NULL AND status <> 'retired'
+"""
+
+INDEX_IS_VALID_TEMPLATE = "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(CAST({name} AS text))"
+
+
+def create_space_index_sql(space: EmbeddingSpace) -> str:
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {space.index_name} "
+        f"ON {space.table_name} USING hnsw (embedding {space.vector_type}_cosine_ops) "
+        f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    )
+
+
+GET_ACTIVE_SPACE_SQL = text(f"SELECT {SPACE_COLUMNS} FROM embedding_spaces WHERE active")
+LIST_SPACES_SQL = text(f"SELECT {SPACE_COLUMNS} FROM embedding_spaces ORDER BY id")
+GET_SPACE_SQL = text(f"SELECT {SPACE_COLUMNS} FROM embedding_spaces WHERE name = :name")
+CREATE_SPACE_SQL = text(CREATE_SPACE_TEMPLATE.format(name=":name", model=":model", dimensions=":dimensions"))
+SET_SPACE_TABLE_SQL = text(SET_SPACE_TABLE_TEMPLATE.format(table_name=":table_name", id=":id", columns=SPACE_COLUMNS))
+ADVANCE_BACKFILL_SQL = text(
+    ADVANCE_BACKFILL_TEMPLATE.format(
+        cursor=":cursor", rows=":rows", seconds=":seconds", id=":id", columns=SPACE_COLUMNS
+    )
+)
+SET_SPACE_STATUS_SQL = text(SET_SPACE_STATUS_TEMPLATE.format(status=":status", id=":id", columns=SPACE_COLUMNS))
+DEACTIVATE_SPACES_SQL = text(DEACTIVATE_SPACES_TEMPLATE.format(shadow_only=":shadow_only"))
+ACTIVATE_SPACE_SQL = text(ACTIVATE_SPACE_TEMPLATE.format(id="CAST(:id AS integer)"))
+RETIRE_SPACE_SQL = text(RETIRE_SPACE_TEMPLATE.format(id=":id", columns=SPACE_COLUMNS))
+INDEX_IS_VALID_SQL = text(INDEX_IS_VALID_TEMPLATE.format(name=":name"))
+RESET_SPACES_SQL = text(RESET_SPACES_TEMPLATE)
+
+
+def document_row(chunk: dict) -> dict:
+    """Maps a processed chunk record onto the documents table columns."""
+    return {
+        "source": chunk.get("source") or chunk.get("source_filename"),
+        "title": chunk.get("title"),
+        "authors": chunk.get("authors"),
+        "publication_date": chunk.get("publication_date"),
+    }
+
+
+def split_chunks(paper_chunks: list[dict]) -> tuple[dict, list[tuple]]:
+    """
+    Splits processed chunk records into the upsert parameters for their
+    documents and (source, content, embedding) rows for the chunks table.
+    """
+    documents = {}
+    rows = []
+    for chunk in paper_chunks:
+        document = document_row(chunk)
+        documents[document["source"]] = document
+        rows.append((document["source"], chunk["content"], chunk["embedding"]))
+    params = {
+        "sources": list(documents),
+        "titles": [d["title"] for d in documents.values()],
+        "authors": [d["authors"] for d in documents.values()],
+        "publication_dates": [d["publication_date"] for d in documents.values()],
+    }
+    return params, rows
+
+
+# The Cloud SQL Connector owns a background thread and an event loop that
+# refresh instance certificates. It is created once per process and shared by
+# every engine; a forked child must never reuse its parent's connector.
+_connector = None
+_connector_lock = threading.Lock()
+
+def _get_connector() -> Connector:
+    global _connector
+    if _connector is None:
+        with _connector_lock:
+            if _connector is None:
+                _connector = Connector()
+    return _connector
+
+def _reset_connector_after_fork():
+    global _connector, _connector_lock
+    _connector = None
+    _connector_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_connector_after_fork)
+
+def close_connector():
+    """Closes the process-wide Cloud SQL Connector, if one was created."""
+    global _connector
+    if _connector is not None:
+        _connector.close()
+        _connector = None
+
+
+class PoolStats:
+    """
+    Thread-safe counters for connection checkouts from the engine's pool.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self, *args):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "connections_opened": self.connects,
+                "checkout_wait_seconds_total": round(self.total_wait, 6),
+                "checkout_wait_seconds_avg": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                "checkout_wait_seconds_max": round(self.max_wait, 6),
+            }
+
 
 class CloudSQLPostgresDatastore:
     def __init__(self, config: Config):
@@ -22,13 +800,29 @@ class CloudSQLPostgresDatastore:
         if not self.config.password:
             self.config.password = os.environ.get("DB_PASSWORD")
         
+        self.pool_stats = PoolStats()
         self.engine = self._create_engine()
+        event.listen(self.engine, "connect", self.pool_stats.record_connect)
+        if STORAGE_MODE_CHECK_SQL:
+            # Retried on the next connection for as long as it raises.
+            event.listen(self.engine, "first_connect", self._check_storage_mode)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # (active embedding space, monotonic time it must be re-read).
+        self._active_space = None
+        # Search statements of shadow spaces, by (table, dimensions).
+        self._space_statements = {}
 
     def _create_engine(self):
         """
         Creates a SQLAlchemy engine for connecting to Cloud SQL for PostgreSQL.
         """
+        pool_options = dict(
+            pool_size=self.config.pool_size,
+            max_overflow=self.config.max_overflow,
+            pool_timeout=self.config.pool_timeout,
+            pool_recycle=self.config.pool_recycle,
+            pool_pre_ping=self.config.pool_pre_ping,
+        )
         if not all([self.config.project, self.config.region, self.config.instance]):
             # Fallback for local development or migration steps
             db_host = os.environ.get("DB_HOST", "127.0.0.1")
@@ -37,12 +831,11 @@ class CloudSQLPostgresDatastore:
                 f"postgresql+psycopg2://{self.config.user}:{self.config.password}@"
                 f"{db_host}:{db_port}/{self.config.database}"
             )
-            return create_engine(connection_string)
+            return create_engine(connection_string, **pool_options)
 
         # Use Cloud SQL Connector for Cloud Run environment
         def getconn():
-            connector = Connector()
-            conn = connector.connect(
+            conn = _get_connector().connect(
                 f"{self.config.project}:{self.config.region}:{self.config.instance}",
                 "psycopg2", # Use psycopg2 driver
                 user=self.config.user,
@@ -56,15 +849,471 @@ class CloudSQLPostgresDatastore:
         engine = create_engine(
             "postgresql+psycopg2://", # Use psycopg2 dialect
             creator=getconn,
+            **pool_options,
         )
         return engine
 
+    def _check_storage_mode(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(STORAGE_MODE_CHECK_SQL)
+            check_storage_mode(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+            # Leave no transaction open on the connection the dialect reuses.
+            dbapi_connection.rollback()
+
     def get_session(self):
         return self.SessionLocal()
 
+    @contextmanager
+    def begin(self):
+        """
+        Checks a connection out of the pool, recording how long the checkout
+        waited, and yields it inside a transaction.
+        """
+        start = time.perf_counter()
+        try:
+            conn = self.engine.connect()
+        except exc.TimeoutError:
+            self.pool_stats.record_timeout()
+            raise
+        self.pool_stats.record_checkout(time.perf_counter() - start)
+        try:
+            with conn.begin():
+                yield conn
+        finally:
+            conn.close()
+
+    def pool_status(self) -> dict:
+        """Returns the current pool occupancy plus cumulative checkout stats."""
+        pool = self.engine.pool
+        status = {
+            "pool_size": self.config.pool_size,
+            "max_overflow": self.config.max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        }
+        status.update(self.pool_stats.snapshot())
+        return status
+
+    def after_fork(self):
+        """
+        Drops pooled connections inherited from a parent process without
+        closing them, so the parent's sockets are left untouched.
+        """
+        self.engine.dispose(close=False)
+
+    def initialize_data(self, paper_chunks: list[dict]) -> None:
+        """Replaces the contents of the documents and chunks tables."""
+        with self.begin() as conn:
+            # CASCADE empties the shadow tables of the embedding spaces too.
+            conn.execute(text("TRUNCATE chunks, document_minhash_bands, documents RESTART IDENTITY CASCADE"))
+            self._reset_embedding_spaces(conn)
+            self._copy_documents(conn, paper_chunks)
+            self._bump_corpus_version(conn)
+        self._active_space = None
+
+    def add_documents(self, paper_chunks: list[dict]) -> None:
+        self.copy_documents(paper_chunks)
+
+    def list_documents(self, after_id: int, limit: int) -> list[dict]:
+        with self.begin() as conn:
+            rows = conn.execute(LIST_DOCUMENTS_SQL, {"after_id": after_id, "limit": limit}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def copy_documents(self, paper_chunks: list[dict]) -> int:
+        """
+        Bulk-loads chunks with binary COPY, replacing any chunks their
+        documents already had, and bumps the corpus version in the same
+        transaction. Returns the new corpus version.
+        """
+        with self.begin() as conn:
+            if paper_chunks:
+                self._copy_documents(conn, paper_chunks)
+            return self._bump_corpus_version(conn)
+
+    def _copy_documents(self, conn, paper_chunks: list[dict]) -> None:
+        params, rows = split_chunks(paper_chunks)
+        document_ids = dict(conn.execute(UPSERT_DOCUMENTS_SQL, params).all())
+        # Re-sent loads and re-ingested sources replace their chunks instead
+        # of adding a second copy.
+        conn.execute(DELETE_CHUNKS_SQL, [{"document_id": document_id} for document_id in document_ids.values()])
+        payload = encode_copy_binary(
+            ((document_ids[source], content, embedding) for source, content, embedding in rows),
+            CHUNK_ENCODERS,
+        )
+        # COPY runs on the raw psycopg2 connection, inside the transaction
+        # opened by begin().
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(COPY_CHUNKS_SQL, io.BytesIO(payload))
+
+    def _bump_corpus_version(self, conn) -> int:
+        return conn.execute(BUMP_CORPUS_VERSION_SQL).scalar()
+
+    def get_corpus_version(self) -> int:
+        """Returns the current corpus version; it changes on every write."""
+        with self.begin() as conn:
+            return conn.execute(GET_CORPUS_VERSION_SQL).scalar() or 0
+
+    def find_duplicate_candidates(self, source: str, content_sha256: str, band_hashes: list[int]) -> list[dict]:
+        """
+        Returns canonical documents other than source that share its exact
+        hash or an LSH band, with their stored MinHash signatures.
+        """
+        with self.begin() as conn:
+            rows = conn.execute(
+                FIND_DUPLICATE_CANDIDATES_SQL,
+                {"source": source, "content_sha256": content_sha256, "band_hashes": band_hashes},
+            ).mappings().all()
+        return [dict(row) for row in rows]
+
+    def link_duplicate_document(
+        self, document: dict, canonical_id: int, content_sha256: str, minhash: bytes
+    ) -> int:
+        """
+        Records document as a duplicate of canonical_id, dropping any chunks
+        it had from an earlier ingestion. Returns the new corpus version.
+        """
+        with self.begin() as conn:
+            document_id = conn.execute(
+                LINK_DUPLICATE_SQL,
+                {**document, "canonical_id": canonical_id, "content_sha256": content_sha256, "minhash": minhash},
+            ).scalar()
+            conn.execute(DELETE_CHUNKS_SQL, {"document_id": document_id})
+            conn.execute(DELETE_BANDS_SQL, {"document_id": document_id})
+            return self._bump_corpus_version(conn)
+
+    def save_document_fingerprint(
+        self, source: str, content_sha256: str, minhash: bytes, band_hashes: list[int]
+    ) -> None:
+        """Stores the fingerprint of an ingested (canonical) document."""
+        with self.begin() as conn:
+            document_id = conn.execute(
+                SAVE_FINGERPRINT_SQL, {"source": source, "content_sha256": content_sha256, "minhash": minhash}
+            ).scalar()
+            if document_id is None:
+                return
+            conn.execute(DELETE_BANDS_SQL, {"document_id": document_id})
+            conn.execute(INSERT_BANDS_SQL, {"document_id": document_id, "band_hashes": band_hashes})
+
+    def enqueue_job(self, job: dict) -> tuple[dict, bool]:
+        """
+        Queues job (id, source_uri, generation, filename, extractor, host,
+        trace_id) unless that object generation already has a job. Returns
+        the job row and whether it was created.
+        """
+        with self.begin() as conn:
+            row = dict(conn.execute(ENQUEUE_JOB_SQL, job).mappings().one())
+        return row, row.pop("created")
+
+    def claim_job(
+        self, host: str, lease_seconds: float, max_attempts: int, pinned_seconds: float
+    ) -> dict | None:
+        """
+        Moves the oldest runnable job to 'extracting' for the caller and
+        returns it, or None when there is nothing to do.
+        """
+        params = {
+            "host": host, "lease_seconds": lease_seconds, "max_attempts": max_attempts,
+            "pinned_seconds": pinned_seconds,
+        }
+        with self.begin() as conn:
+            conn.execute(FAIL_ABANDONED_JOBS_SQL, params)
+            row = conn.execute(CLAIM_JOB_SQL, params).mappings().first()
+        return dict(row) if row else None
+
+    def update_job(
+        self, job_id: str, attempt: int, status: str,
+        chunks: int | None = None, error: str | None = None, duplicate_of: str | None = None,
+    ) -> bool:
+        """Sets a claimed job's status; False if the claim has been lost."""
+        with self.begin() as conn:
+            return conn.execute(
+                UPDATE_JOB_SQL,
+                {
+                    "id": job_id, "attempt": attempt, "status": status,
+                    "chunks": chunks, "error": error, "duplicate_of": duplicate_of,
+                },
+            ).first() is not None
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self.begin() as conn:
+            row = conn.execute(GET_JOB_SQL, {"id": job_id}).mappings().first()
+        return dict(row) if row else None
+
+    def list_jobs(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        """Returns the most recently queued jobs, optionally of one status."""
+        with self.begin() as conn:
+            rows = conn.execute(LIST_JOBS_SQL, {"status": status, "limit": limit}).mappings().all()
+        return [dict(row) for row in rows]
+
+    def job_counts(self) -> dict[str, int]:
+        with self.begin() as conn:
+            return dict(conn.execute(COUNT_JOBS_SQL).all())
+
+    def active_embedding_space(self) -> EmbeddingSpace:
+        """
+        Returns the embedding space searches read, re-read from the database
+        at most every ACTIVE_SPACE_TTL seconds.
+        """
+        cached = self._active_space
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+        with self.begin() as conn:
+            row = conn.execute(GET_ACTIVE_SPACE_SQL).mappings().first()
+        space = EmbeddingSpace.from_row(row) if row else base_space(EMBEDDING_DIMENSIONS)
+        self._active_space = (space, time.monotonic() + ACTIVE_SPACE_TTL)
+        return space
+
+    def list_embedding_spaces(self) -> list[EmbeddingSpace]:
+        with self.begin() as conn:
+            return [EmbeddingSpace.from_row(row) for row in conn.execute(LIST_SPACES_SQL).mappings()]
+
+    def get_embedding_space(self, name: str) -> EmbeddingSpace | None:
+        with self.begin() as conn:
+            row = conn.execute(GET_SPACE_SQL, {"name": name}).mappings().first()
+        return EmbeddingSpace.from_row(row) if row else None
+
+    def create_embedding_space(self, name: str, model: str, dimensions: int) -> EmbeddingSpace:
+        """Registers a space for model and creates its empty shadow table."""
+        check_dimensions(dimensions)
+        with self.begin() as conn:
+            space_id = conn.execute(
+                CREATE_SPACE_SQL, {"name": name, "model": model, "dimensions": dimensions}
+            ).scalar()
+            row = conn.execute(
+                SET_SPACE_TABLE_SQL, {"id": space_id, "table_name": shadow_table_name(space_id)}
+            ).mappings().one()
+            space = EmbeddingSpace.from_row(row)
+            conn.execute(text(CREATE_SHADOW_TABLE_TEMPLATE.format(
+                table_name=space.table_name, vector_type=space.vector_type, dimensions=space.dimensions
+            )))
+        return space
+
+    def next_backfill_chunks(self, space: EmbeddingSpace, after_id: int, limit: int) -> list[tuple[int, str]]:
+        """
+        Returns up to limit (id, content) pairs of the chunks after after_id
+        that have no vector in space, in id order.
+        """
+        sql = text(NEXT_BACKFILL_CHUNKS_TEMPLATE.format(
+            table_name=space.table_name, after_id=":after_id", limit=":limit"
+        ))
+        with self.begin() as conn:
+            return [tuple(row) for row in conn.execute(sql, {"after_id": after_id, "limit": limit})]
+
+    def count_missing_chunks(self, space: EmbeddingSpace) -> int:
+        with self.begin() as conn:
+            return conn.execute(text(COUNT_MISSING_CHUNKS_TEMPLATE.format(table_name=space.table_name))).scalar()
+
+    def store_space_embeddings(
+        self, space: EmbeddingSpace, chunk_ids: list[int], embeddings: list, cursor: int, seconds: float
+    ) -> EmbeddingSpace:
+        """
+        Writes a page of backfilled vectors and moves the space's cursor to
+        cursor in the same transaction, bumping the corpus version if the
+        space is being searched. Returns the updated space.
+        """
+        with self.begin() as conn:
+            if chunk_ids:
+                conn.execute(
+                    text(STORE_SPACE_EMBEDDINGS_TEMPLATE.format(
+                        table_name=space.table_name, vector_type=space.vector_type, dimensions=space.dimensions,
+                        chunk_ids=":chunk_ids", embeddings=":embeddings",
+                    )),
+                    {"chunk_ids": chunk_ids, "embeddings": [vector_literal(e) for e in embeddings]},
+                )
+            row = conn.execute(
+                ADVANCE_BACKFILL_SQL,
+                {"id": space.id, "cursor": cursor, "rows": len(chunk_ids), "seconds": seconds},
+            ).mappings().one()
+            if row["active"] and chunk_ids:
+                self._bump_corpus_version(conn)
+        return EmbeddingSpace.from_row(row)
+
+    def set_embedding_space_status(self, space: EmbeddingSpace, status: str) -> EmbeddingSpace:
+        with self.begin() as conn:
+            row = conn.execute(SET_SPACE_STATUS_SQL, {"id": space.id, "status": status}).mappings().one()
+        return EmbeddingSpace.from_row(row)
+
+    def build_embedding_space_index(self, space: EmbeddingSpace) -> None:
+        """
+        Builds the HNSW index of a shadow table without blocking writes. An
+        invalid index left by an interrupted build is dropped and rebuilt.
+        """
+        with self.engine.connect() as conn:
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            if conn.execute(INDEX_IS_VALID_SQL, {"name": space.index_name}).scalar() is False:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {space.index_name}"))
+            conn.execute(text(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'"))
+            conn.execute(text(create_space_index_sql(space)))
+            conn.execute(text("RESET maintenance_work_mem"))
+
+    def activate_embedding_space(self, space: EmbeddingSpace) -> int:
+        """
+        Makes space the one searches read and bumps the corpus version, so no
+        cached result of the old space is served. Returns the new version.
+        """
+        with self.begin() as conn:
+            conn.execute(DEACTIVATE_SPACES_SQL, {"shadow_only": False})
+            if conn.execute(ACTIVATE_SPACE_SQL, {"id": space.id}).first() is None:
+                raise ValueError(f"Embedding space {space.name} is not ready")
+            version = self._bump_corpus_version(conn)
+        self._active_space = None
+        return version
+
+    def retire_embedding_space(self, space: EmbeddingSpace) -> EmbeddingSpace:
+        """Drops an inactive shadow space's table; its registry row is kept."""
+        with self.begin() as conn:
+            row = conn.execute(RETIRE_SPACE_SQL, {"id": space.id}).mappings().first()
+            if row is None:
+                raise ValueError(f"Embedding space {space.name} is active or the base space")
+            conn.execute(text(f"DROP TABLE IF EXISTS {space.table_name}"))
+        return EmbeddingSpace.from_row(row)
+
+    def _reset_embedding_spaces(self, conn) -> None:
+        conn.execute(RESET_SPACES_SQL)
+        if conn.execute(DEACTIVATE_SPACES_SQL, {"shadow_only": True}).first() is not None:
+            conn.execute(ACTIVATE_SPACE_SQL, {"id": None})
+
+    def _search_statements(self, space: EmbeddingSpace) -> tuple:
+        if space.is_base:
+            return SEARCH_DOCUMENTS_SQL, BATCH_SEARCH_SQL, HYBRID_SEARCH_SQL, PAGED_SEARCH_SQL
+        key = (space.table_name, space.dimensions)
+        if key not in self._space_statements:
+            self._space_statements[key] = search_statements(space)
+        return self._space_statements[key]
+
+    def search_documents(
+        self,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+        after: tuple[float, int] | None = None,
+    ) -> list[dict]:
+        """
+        Returns the top_k chunks closest to query_embedding by cosine distance,
+        or with after, the top_k that follow that (distance, id) key.
+
+        ef_search and probes tune the ANN index for this query only: they are
+        applied with SET LOCAL semantics, so they never leak into other
+        requests sharing the pooled connection.
+        """
+        space = space or self.active_embedding_space()
+        search_sql, _, _, paged_sql = self._search_statements(space)
+        ef_search = _bounded("ef_search", ef_search, DEFAULT_EF_SEARCH, MAX_EF_SEARCH)
+        probes = _bounded("probes", probes, DEFAULT_PROBES, MAX_PROBES)
+        rerank_limit, ef_search = search_limits(top_k, ef_search, space)
+        params = {"embedding": query_embedding, "top_k": top_k, "rerank_limit": rerank_limit}
+        if after is not None:
+            search_sql = paged_sql
+            params.update(after_distance=after[0], after_id=after[1])
+        with self.begin() as conn:
+            # set_config(..., true) is the parameterised form of SET LOCAL.
+            conn.execute(
+                text(
+                    "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+                    "set_config('ivfflat.probes', :probes, true)"
+                ),
+                {"ef_search": str(ef_search), "probes": str(probes)},
+            )
+            if after is not None and PAGED_ITERATIVE_SCAN:
+                conn.execute(text(ITERATIVE_SCAN_SQL))
+            rows = conn.execute(search_sql, params).mappings().all()
+        return [dict(row) for row in rows]
+
+    def batch_search_documents(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[list[dict]]:
+        """
+        Runs one vector search per embedding in a single statement and
+        returns the result lists in the same order.
+        """
+        if not query_embeddings:
+            return []
+        space = space or self.active_embedding_space()
+        _, batch_sql, _, _ = self._search_statements(space)
+        ef_search = _bounded("ef_search", ef_search, DEFAULT_EF_SEARCH, MAX_EF_SEARCH)
+        probes = _bounded("probes", probes, DEFAULT_PROBES, MAX_PROBES)
+        rerank_limit, ef_search = search_limits(top_k, ef_search, space)
+        with self.begin() as conn:
+            conn.execute(
+                text(
+                    "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+                    "set_config('ivfflat.probes', :probes, true)"
+                ),
+                {"ef_search": str(ef_search), "probes": str(probes)},
+            )
+            rows = conn.execute(
+                batch_sql,
+                {
+                    "embeddings": [vector_literal(e) for e in query_embeddings],
+                    "top_k": top_k,
+                    "rerank_limit": rerank_limit,
+                },
+            ).mappings().all()
+        return group_batch_rows(rows, len(query_embeddings))
+
+    def hybrid_search_documents(
+        self,
+        query: str,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[dict]:
+        """
+        Fuses cosine, full-text and trigram rankings with reciprocal rank
+        fusion in one round trip. Rows carry the fused score and their
+        cosine distance.
+        """
+        space = space or self.active_embedding_space()
+        _, _, hybrid_sql, _ = self._search_statements(space)
+        ef_search = _bounded("ef_search", ef_search, DEFAULT_EF_SEARCH, MAX_EF_SEARCH)
+        probes = _bounded("probes", probes, DEFAULT_PROBES, MAX_PROBES)
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        rerank_limit, ef_search = search_limits(candidates, ef_search, space)
+        with self.begin() as conn:
+            conn.execute(
+                text(
+                    "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+                    "set_config('ivfflat.probes', :probes, true)"
+                ),
+                {"ef_search": str(ef_search), "probes": str(probes)},
+            )
+            rows = conn.execute(
+                hybrid_sql,
+                {
+                    "embedding": query_embedding,
+                    "query": query,
+                    "candidates": candidates,
+                    "rerank_limit": rerank_limit,
+                    "rrf_k": HYBRID_RRF_K,
+                    "top_k": top_k,
+                },
+            ).mappings().all()
+        return [dict(row) for row in rows]
+
     def close(self):
         """
         Closes the database engine.
         """
         if self.engine:
-            self.engine.dispose()
\ No newline at end of file
+            self.engine.dispose()
+
+def _bounded(name: str, value: int | None, default: int, maximum: int) -> int:
+    if value is None:
+        return default
+    if not 1 <= value <= maximum:
+        raise ValueError(f"{name} must be between 1 and {maximum}")
+    return value
@@ -0,0 +1,465 @@
+import itertools
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from pydantic import BaseModel
+
+from ...ingestion.artifacts import is_artifact, read_artifact, write_artifact
+from ..datastore import classproperty
+from ..spaces import EmbeddingSpace, base_space
+
+EMBEDDING_DIMENSIONS = 768
+# Rows scored per matrix product, to bound the (queries x rows) score buffer.
+SCORE_BLOCK_ROWS = int(os.environ.get("MEMORY_SCORE_BLOCK_ROWS", "65536"))
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "60"))
+HYBRID_RRF_K = int(os.environ.get("HYBRID_RRF_K", "60"))
+
+
+class Config(BaseModel):
+    kind: str
+    # Artifact directory (see ingestion/artifacts.py) or legacy processed CSV
+    # loaded at startup. Several paths may be given, separated by commas.
+    path: str | None = None
+    # Memory-map artifact embeddings instead of reading them into RAM, so
+    # workers share the page cache and start instantly.
+    mmap: bool = True
+    dimensions: int = EMBEDDING_DIMENSIONS
+
+
+class MemoryNumpyDatastore:
+    """
+    Exact cosine search over a float32 matrix held in memory.
+
+    Rows loaded at startup stay in their (possibly memory-mapped) matrix;
+    appended rows go to a growable buffer, so adds never copy the corpus.
+    Queries are scored with blocked matrix products and the top k picked
+    with argpartition. Useful for small deployments, local work without a
+    database, and as the ground truth when measuring ANN recall.
+    """
+    def __init__(self, config: Config):
+        self.config = config
+        self._lock = threading.Lock()
+        # Ingestion jobs by id; unlike the corpus they survive initialize_data.
+        self._jobs = {}
+        self._reset()
+        for path in (config.path or "").split(","):
+            if path.strip():
+                self._load(path.strip())
+
+    @classproperty
+    def kind(cls):
+        return "memory-numpy"
+
+    def _reset(self):
+        # segments: list of (matrix, row norms); chunk i lives in the segment
+        # covering row i of their concatenation.
+        self._segments = []
+        self._buffer = np.empty((0, self.config.dimensions), dtype=np.float32)
+        self._buffer_norms = np.empty(0, dtype=np.float32)
+        self._buffer_rows = 0
+        self._chunks = []
+        self._document_ids = {}
+        # document id -> metadata, in id order.
+        self._documents = {}
+        self._version = 0
+        # Duplicate detection: source -> (content_sha256, minhash, band hashes)
+        # of canonical documents, (band, hash) -> sources, and duplicate
+        # source -> canonical document id.
+        self._fingerprints = {}
+        self._bands = {}
+        self._canonical_ids = {}
+
+    def _load(self, path: str):
+        metadata, embeddings = read_artifact(path, mmap=self.config.mmap and is_artifact(path))
+        if embeddings.shape[1] != self.config.dimensions:
+            raise ValueError(f"{path} has {embeddings.shape[1]}-d embeddings, expected {self.config.dimensions}")
+        norms = np.linalg.norm(embeddings, axis=1).astype(np.float32)
+        with self._lock:
+            self._segments.append((embeddings, norms))
+            for chunk in metadata:
+                self._add_chunk(chunk)
+            self._version += 1
+
+    def _add_chunk(self, chunk: dict):
+        source = chunk.get("source") or chunk.get("source_filename")
+        document_id = self._document_ids.setdefault(source, len(self._document_ids) + 1)
+        self._documents.setdefault(document_id, {
+            "id": document_id,
+            "source": source,
+            "title": chunk.get("title"),
+            "authors": chunk.get("authors"),
+            "publication_date": chunk.get("publication_date"),
+            "canonical_document_id": document_id,
+            "created_at": datetime.now(timezone.utc),
+        })
+        self._chunks.append({
+            "id": len(self._chunks) + 1,
+            "document_id": document_id,
+            "canonical_document_id": document_id,
+            "source": source,
+            "title": chunk.get("title"),
+            "authors": chunk.get("authors"),
+            "publication_date": chunk.get("publication_date"),
+            "content": chunk["content"],
+        })
+
+    def _append(self, matrix: np.ndarray):
+        needed = self._buffer_rows + len(matrix)
+        if needed > len(self._buffer):
+            capacity = max(needed, 2 * len(self._buffer), 1024)
+            buffer = np.empty((capacity, self.config.dimensions), dtype=np.float32)
+            buffer[:self._buffer_rows] = self._buffer[:self._buffer_rows]
+            norms = np.empty(capacity, dtype=np.float32)
+            norms[:self._buffer_rows] = self._buffer_norms[:self._buffer_rows]
+            self._buffer, self._buffer_norms = buffer, norms
+        self._buffer[self._buffer_rows:needed] = matrix
+        self._buffer_norms[self._buffer_rows:needed] = np.linalg.norm(matrix, axis=1)
+        self._buffer_rows = needed
+
+    def _snapshot(self):
+        """
+        The segments and the chunk list. Chunks are only ever appended (and
+        _reset swaps in a new list), so the list is shared, not copied: the
+        rows covered by the segments stay valid however it grows.
+        """
+        with self._lock:
+            segments = list(self._segments)
+            if self._buffer_rows:
+                segments.append((self._buffer[:self._buffer_rows], self._buffer_norms[:self._buffer_rows]))
+            return segments, self._chunks
+
+    @staticmethod
+    def _rows(segments, rows: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """The embeddings and norms of rows, read from the segments that hold them."""
+        starts = np.cumsum([0] + [len(matrix) for matrix, _ in segments])
+        owners = np.searchsorted(starts, rows, side="right") - 1
+        vectors = np.stack([segments[s][0][row - starts[s]] for row, s in zip(rows, owners)])
+        norms = np.asarray([segments[s][1][row - starts[s]] for row, s in zip(rows, owners)], dtype=np.float32)
+        return vectors, norms
+
+    def initialize_data(self, paper_chunks: list[dict]) -> None:
+        """Replaces the corpus."""
+        with self._lock:
+            version = self._version
+            self._reset()
+            self._version = version
+        self.copy_documents(paper_chunks)
+
+    def add_documents(self, paper_chunks: list[dict]) -> None:
+        self.copy_documents(paper_chunks)
+
+    def copy_documents(self, paper_chunks: list[dict]) -> int:
+        """Appends chunks and returns the new corpus version."""
+        matrix = np.asarray([chunk["embedding"] for chunk in paper_chunks], dtype=np.float32)
+        with self._lock:
+            if len(paper_chunks):
+                self._append(matrix.reshape(len(paper_chunks), self.config.dimensions))
+                for chunk in paper_chunks:
+                    self._add_chunk(chunk)
+            self._version += 1
+            return self._version
+
+    def get_corpus_version(self) -> int:
+        return self._version
+
+    def find_duplicate_candidates(self, source: str, content_sha256: str, band_hashes: list[int]) -> list[dict]:
+        with self._lock:
+            sources = {s for s, (sha, _, _) in self._fingerprints.items() if sha == content_sha256}
+            for band in enumerate(band_hashes):
+                sources.update(self._bands.get(band, ()))
+            sources.discard(source)
+            return [
+                {
+                    "id": self._document_ids[s],
+                    "source": s,
+                    "content_sha256": self._fingerprints[s][0],
+                    "minhash": self._fingerprints[s][1],
+                }
+                for s in sorted(sources)
+            ]
+
+    def link_duplicate_document(self, document: dict, canonical_id: int, content_sha256: str, minhash: bytes) -> int:
+        """
+        Records document as a duplicate of canonical_id. Rows it already has
+        stay in the matrix but search results point at the canonical document.
+        """
+        source = document["source"]
+        with self._lock:
+            document_id = self._document_ids.setdefault(source, len(self._document_ids) + 1)
+            self._canonical_ids[source] = canonical_id
+            self._forget_fingerprint(source)
+            for chunk in self._chunks:
+                if chunk["document_id"] == document_id:
+                    chunk["canonical_document_id"] = canonical_id
+            if document_id in self._documents:
+                self._documents[document_id]["canonical_document_id"] = canonical_id
+            self._version += 1
+            return self._version
+
+    def save_document_fingerprint(
+        self, source: str, content_sha256: str, minhash: bytes, band_hashes: list[int]
+    ) -> None:
+        with self._lock:
+            if source not in self._document_ids:
+                return
+            self._forget_fingerprint(source)
+            self._canonical_ids.pop(source, None)
+            self._fingerprints[source] = (content_sha256, minhash, band_hashes)
+            for band in enumerate(band_hashes):
+                self._bands.setdefault(band, set()).add(source)
+
+    def _forget_fingerprint(self, source: str):
+        previous = self._fingerprints.pop(source, None)
+        if previous is not None:
+            for band in enumerate(previous[2]):
+                self._bands.get(band, set()).discard(source)
+
+    def enqueue_job(self, job: dict) -> tuple[dict, bool]:
+        with self._lock:
+            for existing in self._jobs.values():
+                if (existing["source_uri"], existing["generation"]) == (job["source_uri"], job["generation"]):
+                    return dict(existing), False
+            now = datetime.now(timezone.utc)
+            row = {
+                **job, "status": "queued", "chunks": 0, "error": None, "duplicate_of": None,
+                "attempts": 0, "created_at": now, "updated_at": now, "finished_at": None,
+            }
+            self._jobs[row["id"]] = row
+            return dict(row), True
+
+    def claim_job(
+        self, host: str, lease_seconds: float, max_attempts: int, pinned_seconds: float
+    ) -> dict | None:
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            expired = now - timedelta(seconds=lease_seconds)
+            pinned_expired = now - timedelta(seconds=pinned_seconds)
+            claimable = None
+            for job in self._jobs.values():  # insertion order is queue order
+                lost = job["status"] in ("extracting", "embedding") and job["updated_at"] < expired
+                stranded = (
+                    job["status"] in ("queued", "extracting", "embedding")
+                    and job["host"] not in (None, host)
+                    and job["updated_at"] < pinned_expired
+                )
+                if lost and job["attempts"] >= max_attempts and job["host"] in (None, host):
+                    job.update(status="failed", error="Worker lost on every attempt", updated_at=now, finished_at=now)
+                elif stranded or (lost and job["attempts"] >= max_attempts):
+                    job.update(
+                        status="failed", error="Host holding the staged upload went away",
+                        updated_at=now, finished_at=now,
+                    )
+                elif (
+                    claimable is None
+                    and (job["status"] == "queued" or lost)
+                    and job["attempts"] < max_attempts
+                    and job["host"] in (None, host)
+                ):
+                    claimable = job
+            if claimable is None:
+                return None
+            claimable.update(status="extracting", attempts=claimable["attempts"] + 1, error=None, updated_at=now)
+            return dict(claimable)
+
+    def update_job(
+        self, job_id: str, attempt: int, status: str,
+        chunks: int | None = None, error: str | None = None, duplicate_of: str | None = None,
+    ) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["attempts"] != attempt:
+                return False
+            now = datetime.now(timezone.utc)
+            job.update(
+                status=status, error=error, updated_at=now,
+                finished_at=now if status in ("stored", "failed") else None,
+            )
+            if chunks is not None:
+                job["chunks"] = chunks
+            if duplicate_of is not None:
+                job["duplicate_of"] = duplicate_of
+            return True
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, status: str | None = None, limit: int = 100) -> list[dict]:
+        with self._lock:
+            jobs = [dict(job) for job in reversed(self._jobs.values()) if status is None or job["status"] == status]
+        return jobs[:limit]
+
+    def job_counts(self) -> dict[str, int]:
+        counts = {}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return counts
+
+    def active_embedding_space(self) -> EmbeddingSpace:
+        """
+        The corpus holds one set of vectors, the base space: a new model
+        means building a new artifact with it, not a backfill.
+        """
+        return base_space(self.config.dimensions)
+
+    def list_embedding_spaces(self) -> list[EmbeddingSpace]:
+        return [self.active_embedding_space()]
+
+    def get_embedding_space(self, name: str) -> EmbeddingSpace | None:
+        space = self.active_embedding_space()
+        return space if space.name == name else None
+
+    def create_embedding_space(self, name: str, model: str, dimensions: int) -> EmbeddingSpace:
+        raise NotImplementedError("memory-numpy holds a single embedding space; rebuild its artifact instead")
+
+    def nearest(self, query_embeddings, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Exact top_k by cosine distance for a (queries x dimensions) matrix.
+        Returns (row indices, distances), each queries x min(top_k, rows),
+        sorted by distance.
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        segments, _ = self._snapshot()
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        offset = 0
+        for matrix, norms in segments:
+            for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+                block = matrix[start:start + SCORE_BLOCK_ROWS]
+                scores = (queries @ block.T) / np.maximum(norms[start:start + len(block)], 1e-12)
+                rows = np.broadcast_to(np.arange(offset + start, offset + start + len(block)), scores.shape)
+                # Keep only the running top_k: merge this block with the best so far.
+                scores = np.concatenate([best_scores, scores], axis=1)
+                rows = np.concatenate([best_rows, rows], axis=1)
+                if scores.shape[1] > top_k:
+                    keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+                    scores = np.take_along_axis(scores, keep, axis=1)
+                    rows = np.take_along_axis(rows, keep, axis=1)
+                best_scores, best_rows = scores, rows
+            offset += len(matrix)
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_rows, order, axis=1), 1.0 - np.take_along_axis(best_scores, order, axis=1)
+
+    def batch_search_documents(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[list[dict]]:
+        """Exact search for every embedding; ef_search, probes and space are ignored."""
+        if not len(query_embeddings):
+            return []
+        rows, distances = self.nearest(query_embeddings, top_k)
+        _, chunks = self._snapshot()
+        return [
+            [{**chunks[row], "distance": float(distance)} for row, distance in zip(query_rows, query_distances)]
+            for query_rows, query_distances in zip(rows, distances)
+        ]
+
+    def search_documents(
+        self,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+        after: tuple[float, int] | None = None,
+    ) -> list[dict]:
+        if after is None:
+            return self.batch_search_documents([query_embedding], top_k)[0]
+        # Exact search has no index to resume: widen the search until a
+        # full page lies past the key.
+        after = (float(after[0]), int(after[1]))
+        _, chunks = self._snapshot()
+        fetch_k = top_k
+        while True:
+            rows, distances = self.nearest([query_embedding], fetch_k)
+            page = sorted(
+                (float(distance), chunks[row]["id"], row)
+                for row, distance in zip(rows[0].tolist(), distances[0].tolist())
+            )
+            page = [hit for hit in page if hit[:2] > after]
+            if len(page) >= top_k or fetch_k >= len(chunks):
+                break
+            fetch_k *= 4
+        return [{**chunks[row], "distance": distance} for distance, _, row in page[:top_k]]
+
+    def list_documents(self, after_id: int, limit: int) -> list[dict]:
+        with self._lock:
+            documents = (dict(d) for document_id, d in self._documents.items() if document_id > after_id)
+            return list(itertools.islice(documents, limit))
+
+    def hybrid_search_documents(
+        self,
+        query: str,
+        query_embedding: list[float],
+        top_k: int,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        space: EmbeddingSpace | None = None,
+    ) -> list[dict]:
+        """
+        Reciprocal rank fusion of the exact vector ranking and a lexical
+        ranking by case-insensitive occurrences of the query and its terms.
+        """
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        rows, distances = self.nearest([query_embedding], candidates)
+        # Taken after nearest(), so it covers every row nearest() returned.
+        segments, chunks = self._snapshot()
+        phrase = query.casefold()
+        terms = phrase.split()
+        lexical = []
+        for row, chunk in enumerate(itertools.islice(chunks, sum(len(matrix) for matrix, _ in segments))):
+            content = chunk["content"].casefold()
+            hits = content.count(phrase) * len(terms) + sum(content.count(term) for term in terms)
+            if hits:
+                lexical.append((hits, row))
+        lexical.sort(key=lambda item: -item[0])
+
+        scores, distance_of = {}, dict(zip(rows[0].tolist(), distances[0].tolist()))
+        for ranking in (rows[0].tolist(), [row for _, row in lexical[:candidates]]):
+            for rank, row in enumerate(ranking, start=1):
+                scores[row] = scores.get(row, 0.0) + 1.0 / (HYBRID_RRF_K + rank)
+        fused = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+        missing = [row for row, _ in fused if row not in distance_of]
+        if missing:
+            # Only lexical matches lack a distance; score just those rows.
+            vectors, norms = self._rows(segments, missing)
+            q = np.asarray(query_embedding, dtype=np.float32)
+            scores = vectors @ q / np.maximum(norms * np.linalg.norm(q), 1e-12)
+            distance_of.update(zip(missing, (1.0 - scores).tolist()))
+        return [{**chunks[row], "distance": distance_of[row], "score": score} for row, score in fused]
+
+    def save_snapshot(self, path: str, model_name: str | None = None) -> None:
+        """Writes the corpus as an artifact directory that loads memory-mapped."""
+        segments, chunks = self._snapshot()
+        matrix = np.concatenate([m for m, _ in segments]) if segments else np.empty((0, self.config.dimensions))
+        write_artifact(
+            path,
+            [{**chunk, "source_filename": chunk["source"]} for chunk in chunks[:len(matrix)]],
+            matrix,
+            model_name=model_name,
+        )
+
+    def pool_status(self) -> dict:
+        segments, chunks = self._snapshot()
+        return {
+            "rows": len(chunks),
+            "segments": len(segments),
+            "resident_bytes": int(sum(m.nbytes for m, _ in segments if not isinstance(m, np.memmap))),
+            "mapped_bytes": int(sum(m.nbytes for m, _ in segments if isinstance(m, np.memmap))),
+        }
+
+    def after_fork(self):
+        # Nothing to reset: memory-mapped pages are shared copy-on-write.
+        pass
+
+    def close(self):
+        pass
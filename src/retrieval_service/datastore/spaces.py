@@ -0,0 +1,95 @@
+# src/retrieval_service/datastore/spaces.py
+import os
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+
+from ..embeddings import EMBEDDING_MODEL_NAME
+
+# An embedding space is one embedding model's vectors for every chunk. The
+# base space lives in chunks.embedding and is written by ingestion; any other
+# space lives in its own shadow table, chunk_embeddings_<id>, filled by the
+# backfill job (see embedding_spaces.py). Searches read the active space.
+#
+# backfilling -> indexing -> ready -> retired; only a ready space can be
+# activated, and the active one cannot be retired.
+SPACE_STATUSES = ("backfilling", "indexing", "ready", "retired")
+
+SHADOW_TABLE_PREFIX = "chunk_embeddings_"
+# pgvector indexes vector columns of up to 2000 dimensions; wider spaces
+# are stored as halfvec, which indexes up to 4000.
+MAX_VECTOR_INDEX_DIMENSIONS = 2000
+MAX_HALFVEC_INDEX_DIMENSIONS = 4000
+
+# A process re-reads which space is active at most this often, so searches
+# pay no extra query; a switch reaches every instance within this time.
+ACTIVE_SPACE_TTL = float(os.environ.get("ACTIVE_SPACE_TTL", "10"))
+
+HNSW_M = int(os.environ.get("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "64"))
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+
+
+@dataclass(frozen=True)
+class EmbeddingSpace:
+    id: int
+    name: str
+    model: str
+    dimensions: int
+    # None for the base space, chunks.embedding.
+    table_name: str | None = None
+    status: str = "ready"
+    active: bool = False
+    # Highest chunk id the backfill has stored; chunks below it may still be
+    # missing (see count_missing_chunks).
+    backfill_cursor: int = 0
+    rows_embedded: int = 0
+    # Time spent in embedding requests, for the backfill throughput.
+    embed_seconds: float = 0.0
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    ready_at: datetime | None = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "EmbeddingSpace":
+        return cls(**{f.name: row[f.name] for f in fields(cls) if f.name in row})
+
+    @property
+    def is_base(self) -> bool:
+        return self.table_name is None
+
+    @property
+    def vector_type(self) -> str:
+        return "vector" if self.dimensions <= MAX_VECTOR_INDEX_DIMENSIONS else "halfvec"
+
+    @property
+    def index_name(self) -> str:
+        return f"ix_{self.table_name}_ann"
+
+    @property
+    def throughput(self) -> float:
+        """Backfilled chunks per second spent embedding."""
+        return self.rows_embedded / self.embed_seconds if self.embed_seconds else 0.0
+
+    def to_dict(self) -> dict:
+        values = {
+            name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in asdict(self).items()
+        }
+        values["throughput"] = round(self.throughput, 2)
+        return values
+
+
+def shadow_table_name(space_id: int) -> str:
+    return f"{SHADOW_TABLE_PREFIX}{int(space_id)}"
+
+
+def base_space(dimensions: int) -> EmbeddingSpace:
+    """The space of chunks.embedding, for a database without a registry row for it."""
+    return EmbeddingSpace(
+        id=0, name=EMBEDDING_MODEL_NAME, model=EMBEDDING_MODEL_NAME, dimensions=dimensions, active=True
+    )
+
+
+def check_dimensions(dimensions: int) -> None:
+    if not 1 <= dimensions <= MAX_HALFVEC_INDEX_DIMENSIONS:
+        raise ValueError(f"dimensions must be between 1 and {MAX_HALFVEC_INDEX_DIMENSIONS}")
@@ -0,0 +1,52 @@
+import asyncio
+import functools
+import inspect
+import threading
+
+from .datastore import Client
+
+
+class SyncClient:
+    """
+    Exposes an async Client to synchronous callers (the Flask views).
+
+    The wrapped client lives on one event loop running in a daemon thread, so
+    its connection pool is shared: request threads only hand coroutines to the
+    loop and wait for the result, and many searches are in flight on a handful
+    of connections at once.
+    """
+    def __init__(self, client: Client):
+        self.client = client
+        self._start_loop()
+
+    def _start_loop(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name=f"{self.client.kind}-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro):
+        """Runs a coroutine on the client's loop and blocks for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            return self.run(attr(*args, **kwargs))
+        return call
+
+    def after_fork(self):
+        # Threads do not survive fork(): the child gets a fresh loop and the
+        # client drops the parent's pool.
+        self.client.after_fork()
+        self._start_loop()
+
+    def close(self):
+        self.run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
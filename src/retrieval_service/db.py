@@ -1,36 +1,95 @@
 # src/retrieval_service/db.py
+import atexit
 import os
+import threading
 from flask import g
 # Use relative imports for datastore
+from .datastore.datastore import Client
 from .datastore.factory import create_datastore
-from .datastore.providers.cloudsql_postgres import Config
+from .datastore.sync_client import SyncClient
+from .datastore.providers.cloudsql_postgres import Config, close_connector
+from .datastore.providers import memory_numpy
 
-# This variable will hold the single, shared datastore client
+# This variable will hold the single, shared datastore client.
+# It is created lazily in each worker process (after gunicorn forks) and then
+# reused by every request handled by that process.
 _datastore = None
+_datastore_lock = threading.Lock()
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def _config_from_env() -> Config:
+    """Builds the datastore config, including pool settings, from the environment."""
+    kind = os.environ.get("DATASTORE_KIND", "cloudsql-postgres")
+    if kind == "memory-numpy":
+        return memory_numpy.Config(
+            kind=kind,
+            path=os.environ.get("MEMORY_CORPUS_PATH"),
+            mmap=_env_bool("MEMORY_CORPUS_MMAP", True),
+        )
+    return Config(
+        kind=kind,
+        project=os.environ.get("DB_PROJECT"),
+        region=os.environ.get("DB_REGION"),
+        instance=os.environ.get("DB_INSTANCE"),
+        user=os.environ.get("DB_USER"),
+        # Password is automatically handled in the Datastore init
+        password=os.environ.get("DB_PASSWORD"),
+        database=os.environ.get("DB_NAME"),
+        pool_size=int(os.environ.get("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "2")),
+        pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=_env_bool("DB_POOL_PRE_PING", True),
+    )
+
+def get_datastore():
+    """
+    Returns the process-wide datastore client, creating it on first use.
+    """
+    global _datastore
+    if _datastore is None:
+        with _datastore_lock:
+            if _datastore is None:
+                datastore = create_datastore(_config_from_env())
+                if isinstance(datastore, Client):
+                    # Async providers run on their own event loop thread.
+                    datastore = SyncClient(datastore)
+                _datastore = datastore
+    return _datastore
+
+def close_datastore():
+    """Disposes the process-wide datastore and its Cloud SQL Connector."""
+    global _datastore
+    if _datastore is not None:
+        _datastore.close()
+        _datastore = None
+    close_connector()
+
+def _after_fork_in_child():
+    # A forked worker must not share pooled sockets with its parent. Keep the
+    # client object but drop the inherited connections; new ones are opened
+    # lazily on first checkout.
+    global _datastore_lock
+    _datastore_lock = threading.Lock()
+    if _datastore is not None:
+        _datastore.after_fork()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(close_datastore)
 
 def get_db():
     """
-    Connects to the database if not already connected.
-    Uses the application context (g) to store the connection for a single request.
+    Returns a database session for the current request.
+    Uses the application context (g) to store the session for a single request.
     """
-    if 'datastore' not in g:
-        # If there's no connection for this request, create one.
-        db_config = Config(
-            kind="cloudsql-postgres",
-            project=os.environ.get("DB_PROJECT"),
-            region=os.environ.get("DB_REGION"),
-            instance=os.environ.get("DB_INSTANCE"),
-            user=os.environ.get("DB_USER"),
-            # Password is automatically handled in the Datastore init
-            password=os.environ.get("DB_PASSWORD"),
-            database=os.environ.get("DB_NAME"),
-        )
-        g.datastore = create_datastore(db_config)
-    
-    # Return an active session from the datastore
     if 'db_session' not in g:
-        g.db_session = g.datastore.get_session()
-        
+        g.db_session = get_datastore().get_session()
+
     return g.db_session
 
 def close_db(e=None):
@@ -39,5 +98,6 @@ def close_db(e=None):
     db_session = g.pop('db_session', None)
     if db_session is not None:
         db_session.close()
-    
-    # Note: We don't close the entire datastore engine here, only the session.
\ No newline at end of file
+
+    # Note: We don't close the entire datastore engine here, only the session.
+    # The engine and its pool live for the lifetime of the worker process.
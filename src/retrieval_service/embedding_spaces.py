@@ -0,0 +1,258 @@
+# src/retrieval_service/embedding_spaces.py
+"""
+Versioned embedding spaces.
+
+Re-embeds the corpus with another model into a shadow table while searches
+keep reading the active space, then switches searches over. Run from src/
+with the service's datastore settings:
+
+    python -m retrieval_service.embedding_spaces create text-embedding-005 --dimensions 768
+    python -m retrieval_service.embedding_spaces backfill text-embedding-005 --rows-per-second 200
+    python -m retrieval_service.embedding_spaces activate text-embedding-005
+    python -m retrieval_service.embedding_spaces list
+
+The backfill walks the chunks missing from the space in id order and
+commits every page, so an interrupted run resumes where it stopped. Once it
+reaches the last chunk it builds the space's HNSW index and marks the space
+ready.
+Ingestion keeps writing the base space only: run the backfill with --follow
+to embed new chunks into other spaces as they arrive.
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+
+from .datastore.spaces import ACTIVE_SPACE_TTL, EmbeddingSpace
+from .db import get_datastore
+from .embeddings import create_embedding_client
+from .ingestion.streaming import threaded
+
+logger = logging.getLogger(__name__)
+
+# Chunks read, embedded and committed together.
+BACKFILL_BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", "250"))
+# Upper bound on chunks embedded per second, to leave embedding quota to
+# ingestion and queries; 0 leaves only the embedding client's backoff.
+BACKFILL_ROWS_PER_SECOND = float(os.environ.get("BACKFILL_ROWS_PER_SECOND", "100"))
+BACKFILL_REPORT_SECONDS = float(os.environ.get("BACKFILL_REPORT_SECONDS", "30"))
+
+
+class RateLimiter:
+    """Paces work to at most rate units per second on average; 0 is unlimited."""
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = time.monotonic()
+
+    def wait(self, units: int):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + units / self.rate
+
+
+class BackfillProgress:
+    """Logs chunks done, throughput and time left at most every interval seconds."""
+    def __init__(self, space: EmbeddingSpace, remaining: int, interval: float = BACKFILL_REPORT_SECONDS):
+        self.name = space.name
+        self.total = space.rows_embedded + remaining
+        self.done = space.rows_embedded
+        self.interval = interval
+        self._started = time.monotonic()
+        self._run_rows = 0
+        self._last_report = self._started
+
+    def add(self, rows: int):
+        self.done += rows
+        self._run_rows += rows
+        if time.monotonic() - self._last_report >= self.interval:
+            self.report()
+
+    def report(self):
+        now = time.monotonic()
+        self._last_report = now
+        rate = self._run_rows / (now - self._started) if now > self._started else 0.0
+        # Chunks ingested during the run may push done past the first count.
+        total = max(self.total, self.done)
+        left = total - self.done
+        eta = f"{left / rate / 60:.1f} min left" if rate else "time left unknown"
+        logger.info(
+            "%s: %d/%d chunks (%.1f%%), %.1f chunks/s, %s",
+            self.name, self.done, total, 100.0 * self.done / total if total else 100.0, rate, eta,
+        )
+
+
+def backfill(
+    datastore,
+    space: EmbeddingSpace,
+    embed_service,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    rows_per_second: float = BACKFILL_ROWS_PER_SECOND,
+    stopping: threading.Event | None = None,
+) -> EmbeddingSpace:
+    """
+    Embeds the chunks that have no vector in the space with embed_service
+    and stores them in its shadow table, batch_size at a time, in one pass
+    in id order. The next page is read and embedded while the previous one
+    is written. Returns the updated space.
+    """
+    if space.is_base:
+        raise ValueError(f"{space.name} is the base space; ingestion writes it")
+    if space.status == "retired":
+        raise ValueError(f"{space.name} is retired")
+    stopping = stopping or threading.Event()
+    limiter = RateLimiter(rows_per_second)
+    progress = BackfillProgress(space, datastore.count_missing_chunks(space))
+
+    def pages():
+        after = 0
+        while not stopping.is_set():
+            page = datastore.next_backfill_chunks(space, after, batch_size)
+            if not page:
+                return
+            after = page[-1][0]
+            yield page
+
+    def embed(page):
+        limiter.wait(len(page))
+        start = time.perf_counter()
+        vectors = embed_service.embed_documents([content for _, content in page])
+        return page, vectors, time.perf_counter() - start
+
+    for page, vectors, seconds in threaded(pages(), embed, name="backfill-embed"):
+        if vectors and len(vectors[0]) != space.dimensions:
+            raise ValueError(
+                f"{space.model} returned {len(vectors[0])}-d vectors; {space.name} has {space.dimensions} dimensions"
+            )
+        space = datastore.store_space_embeddings(
+            space, [chunk_id for chunk_id, _ in page], vectors, page[-1][0], seconds
+        )
+        progress.add(len(page))
+        if stopping.is_set():
+            break
+    progress.report()
+    return space
+
+
+def finish(datastore, space: EmbeddingSpace) -> EmbeddingSpace:
+    """Builds the index of a fully backfilled space and marks it ready."""
+    if space.status == "backfilling":
+        space = datastore.set_embedding_space_status(space, "indexing")
+    if space.status == "indexing":
+        logger.info("%s: building index %s", space.name, space.index_name)
+        start = time.perf_counter()
+        datastore.build_embedding_space_index(space)
+        space = datastore.set_embedding_space_status(space, "ready")
+        logger.info("%s: ready, index built in %.0fs", space.name, time.perf_counter() - start)
+    return space
+
+
+def _get_space(datastore, name: str) -> EmbeddingSpace:
+    space = datastore.get_embedding_space(name)
+    if space is None:
+        raise SystemExit(f"Unknown embedding space: {name}")
+    return space
+
+
+def list_command(datastore, args):
+    active = datastore.active_embedding_space()
+    for space in datastore.list_embedding_spaces():
+        behind = (
+            datastore.count_missing_chunks(space)
+            if not space.is_base and space.status != "retired" else 0
+        )
+        print(
+            f"{'*' if space.name == active.name else ' '} {space.name:<32} {space.model:<28} "
+            f"{space.dimensions:>5}d {space.status:<11} {space.table_name or 'chunks.embedding':<22} "
+            f"{space.rows_embedded} embedded, {behind} behind, {space.throughput:.1f} chunks/s"
+        )
+
+
+def create_command(datastore, args):
+    if datastore.get_embedding_space(args.name) is not None:
+        raise SystemExit(f"Embedding space {args.name} already exists")
+    space = datastore.create_embedding_space(args.name, args.model or args.name, args.dimensions)
+    logger.info("Created %s (%s, %dd) in %s", space.name, space.model, space.dimensions, space.table_name)
+
+
+def backfill_command(datastore, args):
+    space = _get_space(datastore, args.name)
+    embed_service = create_embedding_client(model_name=space.model)
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    while True:
+        space = backfill(datastore, space, embed_service, args.batch_size, args.rows_per_second, stopping)
+        if stopping.is_set():
+            logger.info("%s: stopped at chunk %d; run again to resume", space.name, space.backfill_cursor)
+            return
+        space = finish(datastore, space)
+        if not args.follow or stopping.wait(args.follow):
+            return
+
+
+def activate_command(datastore, args):
+    space = _get_space(datastore, args.name)
+    if not space.is_base:
+        behind = datastore.count_missing_chunks(space)
+        if behind and not args.force:
+            raise SystemExit(f"{space.name} is {behind} chunks behind; run backfill first or pass --force")
+    version = datastore.activate_embedding_space(space)
+    logger.info(
+        "Searches now read %s (corpus version %d); instances switch within %ss",
+        space.name, version, ACTIVE_SPACE_TTL,
+    )
+
+
+def retire_command(datastore, args):
+    space = datastore.retire_embedding_space(_get_space(datastore, args.name))
+    logger.info("Retired %s and dropped its vectors", space.name)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog="python -m retrieval_service.embedding_spaces", description=__doc__.split("\n\n")[1]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show every space and its backfill progress").set_defaults(run=list_command)
+
+    create = commands.add_parser("create", help="register a space and create its shadow table")
+    create.add_argument("name")
+    create.add_argument("--model", help="embedding model (default: the space name)")
+    create.add_argument("--dimensions", type=int, required=True)
+    create.set_defaults(run=create_command)
+
+    fill = commands.add_parser("backfill", help="embed the chunks the space is missing, then index it")
+    fill.add_argument("name")
+    fill.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    fill.add_argument("--rows-per-second", type=float, default=BACKFILL_ROWS_PER_SECOND, help="0 for no limit")
+    fill.add_argument("--follow", type=float, metavar="SECONDS", help="keep embedding new chunks, polling this often")
+    fill.set_defaults(run=backfill_command)
+
+    activate = commands.add_parser("activate", help="switch searches to a ready space")
+    activate.add_argument("name")
+    activate.add_argument("--force", action="store_true", help="even if recent chunks are not embedded yet")
+    activate.set_defaults(run=activate_command)
+
+    retire = commands.add_parser("retire", help="drop an inactive space's vectors")
+    retire.add_argument("name")
+    retire.set_defaults(run=retire_command)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        args.run(get_datastore(), args)
+    except (ValueError, NotImplementedError) as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
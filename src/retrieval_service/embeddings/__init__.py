@@ -0,0 +1,129 @@
+# src/retrieval_service/embeddings/__init__.py
+import os
+import threading
+
+from .cache import QueryEmbeddingCache, normalize_query
+from .client import BatchingEmbeddingClient, EmbeddingError
+from .fake import FakeEmbedder
+
+EMBEDDING_MODEL_NAME = os.environ.get("EMBEDDING_MODEL_NAME", "text-embedding-004")
+# "vertex" calls Vertex AI; "fake" uses the deterministic offline embedder.
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "vertex")
+
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_EMBEDDING_CACHE_TTL", "86400"))
+
+# Bulk (ingestion) embedding: upper bound on in-flight batches, and the
+# request latency above which the client backs off. Unset means 429s only.
+EMBEDDING_MAX_CONCURRENCY = int(os.environ.get("EMBEDDING_MAX_CONCURRENCY", "8"))
+EMBEDDING_TARGET_LATENCY = os.environ.get("EMBEDDING_TARGET_LATENCY")
+# Simulated per-request latency for the fake backend, for offline benchmarks.
+FAKE_EMBEDDING_LATENCY = float(os.environ.get("FAKE_EMBEDDING_LATENCY", "0"))
+
+# One embedder and query cache per model are shared by every request in the
+# process; searches use the model of the active embedding space.
+_embedders = {}
+_embedding_client = None
+_query_caches = {}
+_lock = threading.Lock()
+
+def create_embedder(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME):
+    """Creates an embedding client for the given backend."""
+    if backend == "fake":
+        return FakeEmbedder(model_name=f"fake-{model_name}", latency=FAKE_EMBEDDING_LATENCY)
+    if backend == "vertex":
+        from langchain_google_vertexai import VertexAIEmbeddings
+        return VertexAIEmbeddings(
+            model_name=model_name,
+            project=os.environ.get("GOOGLE_CLOUD_PROJECT"),
+        )
+    raise ValueError(f"Unsupported embedding backend: {backend}")
+
+def create_embedding_client(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Creates a BatchingEmbeddingClient for bulk embedding: token-packed,
+    concurrent batches with adaptive concurrency and jittered retries.
+    """
+    return BatchingEmbeddingClient(
+        create_embedder(backend, model_name),
+        max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+        target_latency=float(EMBEDDING_TARGET_LATENCY) if EMBEDDING_TARGET_LATENCY else None,
+    )
+
+def get_embedder(model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Returns the process-wide embedding client for model_name, creating it
+    on first use.
+    """
+    embedder = _embedders.get(model_name)
+    if embedder is None:
+        with _lock:
+            embedder = _embedders.get(model_name)
+            if embedder is None:
+                embedder = _embedders[model_name] = create_embedder(model_name=model_name)
+    return embedder
+
+def get_embedding_client() -> BatchingEmbeddingClient:
+    """
+    Returns the process-wide bulk embedding client used by background
+    ingestion, sharing the embedder with query embedding.
+    """
+    global _embedding_client
+    if _embedding_client is None:
+        embedder = get_embedder()
+        with _lock:
+            if _embedding_client is None:
+                _embedding_client = BatchingEmbeddingClient(
+                    embedder,
+                    max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+                    target_latency=float(EMBEDDING_TARGET_LATENCY) if EMBEDDING_TARGET_LATENCY else None,
+                )
+    return _embedding_client
+
+def _embed_queries(embedder, texts: list[str]) -> list[list[float]]:
+    # Vertex AI embeds queries with a different task type than documents;
+    # embed() sends the whole list in as few requests as possible.
+    if isinstance(embedder, FakeEmbedder):
+        return embedder.embed_documents(texts)
+    return embedder.embed(texts, embeddings_task_type="RETRIEVAL_QUERY")
+
+def get_query_cache(model_name: str = EMBEDDING_MODEL_NAME) -> QueryEmbeddingCache:
+    """Returns the process-wide query embedding cache for model_name."""
+    cache = _query_caches.get(model_name)
+    if cache is None:
+        embedder = get_embedder(model_name)
+        with _lock:
+            cache = _query_caches.get(model_name)
+            if cache is None:
+                cache = _query_caches[model_name] = QueryEmbeddingCache(
+                    embedder.embed_query,
+                    embed_many_fn=lambda texts: _embed_queries(embedder, texts),
+                    model_name=getattr(embedder, "model_name", model_name),
+                    max_entries=QUERY_CACHE_SIZE,
+                    ttl_seconds=QUERY_CACHE_TTL,
+                )
+    return cache
+
+def embed_query(query: str, model_name: str = EMBEDDING_MODEL_NAME) -> list[float]:
+    """Embeds a single search query, served from the cache when possible."""
+    return get_query_cache(model_name).get(query)
+
+def embed_queries(queries: list[str], model_name: str = EMBEDDING_MODEL_NAME) -> list[list[float]]:
+    """Embeds several search queries with at most one batched request."""
+    return get_query_cache(model_name).get_many(queries)
+
+__all__ = [
+    "EMBEDDING_MODEL_NAME",
+    "BatchingEmbeddingClient",
+    "EmbeddingError",
+    "FakeEmbedder",
+    "QueryEmbeddingCache",
+    "create_embedder",
+    "create_embedding_client",
+    "embed_queries",
+    "embed_query",
+    "get_embedder",
+    "get_embedding_client",
+    "get_query_cache",
+    "normalize_query",
+]
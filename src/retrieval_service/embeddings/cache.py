@@ -0,0 +1,167 @@
+# src/retrieval_service/embeddings/cache.py
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form used as the cache key: Unicode NFKC, case-folded, with
+    runs of whitespace collapsed to a single space.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with a per-entry TTL.
+
+    Keys are (normalized query, model name). The normalized form is only the
+    key: the query itself is embedded as the caller wrote it, and spellings
+    that share a key share the embedding of the first one embedded. When
+    several threads miss on the same key at once, only the first calls
+    embed_fn; the others wait on its in-flight result instead of issuing
+    duplicate embedding requests.
+    """
+    def __init__(
+        self,
+        embed_fn: Callable[[str], list[float]],
+        model_name: str,
+        max_entries: int = 4096,
+        ttl_seconds: float = 86400.0,
+        clock: Callable[[], float] = time.monotonic,
+        embed_many_fn: Callable[[list[str]], list[list[float]]] | None = None,
+    ):
+        self.embed_fn = embed_fn
+        self.embed_many_fn = embed_many_fn or (lambda texts: [embed_fn(text) for text in texts])
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._in_flight: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, query: str) -> list[float]:
+        """Returns the embedding for query, computing it at most once per key."""
+        key = (normalize_query(query), self.model_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return list(value)
+                del self._entries[key]
+                self.expirations += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return list(future.result())
+
+        try:
+            value = self.embed_fn(query)
+        except BaseException as e:
+            # Failures are shared with the waiters but never cached.
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            self._store(key, value)
+        future.set_result(value)
+        return list(value)
+
+    def get_many(self, queries: list[str]) -> list[list[float]]:
+        """
+        Returns one embedding per query. All misses are embedded with a
+        single embed_many_fn call; keys already in flight are awaited.
+        """
+        keys = [(normalize_query(query), self.model_name) for query in queries]
+        # The first spelling of each key is the one embedded.
+        texts = {}
+        for key, query in zip(keys, queries):
+            texts.setdefault(key, query)
+        values, leading, waiting = {}, {}, {}
+        with self._lock:
+            for key in texts:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    value, expires_at = entry
+                    if self.clock() < expires_at:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        values[key] = value
+                        continue
+                    del self._entries[key]
+                    self.expirations += 1
+                if key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                    self.coalesced += 1
+                else:
+                    leading[key] = self._in_flight[key] = Future()
+                    self.misses += 1
+
+        if leading:
+            try:
+                vectors = self.embed_many_fn([texts[key] for key in leading])
+            except BaseException as e:
+                with self._lock:
+                    for key in leading:
+                        del self._in_flight[key]
+                for future in leading.values():
+                    future.set_exception(e)
+                raise
+            with self._lock:
+                for key, value in zip(leading, vectors):
+                    del self._in_flight[key]
+                    self._store(key, value)
+            for (key, future), value in zip(leading.items(), vectors):
+                future.set_result(value)
+                values[key] = value
+        for key, future in waiting.items():
+            values[key] = future.result()
+        return [list(values[key]) for key in keys]
+
+    def _store(self, key, value):
+        self._entries[key] = (value, self.clock() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "in_flight": len(self._in_flight),
+            }
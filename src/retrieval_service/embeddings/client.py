@@ -0,0 +1,195 @@
+# src/retrieval_service/embeddings/client.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Request limits for text-embedding-004 on Vertex AI.
+MAX_BATCH_ITEMS = 250
+MAX_BATCH_TOKENS = 20000
+
+
+class EmbeddingError(Exception):
+    """A batch could not be embedded after all retries."""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative token estimate without a tokenizer: UTF-8 bytes / 3.
+    That is about one token per Hangul syllable and overestimates English
+    (~4 characters per token), so packed batches stay under the limit.
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def is_rate_limited(error: Exception) -> bool:
+    name = type(error).__name__
+    return name in ("ResourceExhausted", "TooManyRequests") or "429" in str(error)
+
+
+def is_retryable(error: Exception) -> bool:
+    name = type(error).__name__
+    return is_rate_limited(error) or name in (
+        "ServiceUnavailable",
+        "InternalServerError",
+        "DeadlineExceeded",
+        "GatewayTimeout",
+        "TimeoutError",
+        "ConnectionError",
+    )
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: grows by one after a window of fast successes,
+    halves on a 429, and shrinks by one when latency exceeds the target.
+    """
+    def __init__(self, initial: int, minimum: int, maximum: int, target_latency: float | None):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float):
+        with self._cond:
+            if self.target_latency is not None and latency > self.target_latency:
+                self.limit = max(self.minimum, self.limit - 1)
+                self._successes = 0
+                return
+            self._successes += 1
+            if self._successes >= self.limit:
+                self.limit = min(self.maximum, self.limit + 1)
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_rate_limited(self):
+        with self._cond:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+
+
+class BatchingEmbeddingClient:
+    """
+    Wraps an embedder (VertexAIEmbeddings or FakeEmbedder) for bulk use:
+    packs texts into batches up to the model's item and token limits, keeps
+    several batches in flight under an adaptive concurrency limit, and
+    retries throttled or transient failures with full-jitter exponential
+    backoff. A batch is never silently dropped: it either succeeds or
+    embed_documents raises EmbeddingError.
+    """
+    def __init__(
+        self,
+        embedder,
+        max_batch_items: int = MAX_BATCH_ITEMS,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_concurrency: int = 8,
+        initial_concurrency: int = 2,
+        target_latency: float | None = None,
+        max_retries: int = 8,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        token_counter=estimate_tokens,
+    ):
+        self.embedder = embedder
+        self.model_name = getattr(embedder, "model_name", None)
+        self.max_batch_items = max_batch_items
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.token_counter = token_counter
+        self.limiter = AdaptiveLimiter(
+            min(initial_concurrency, max_concurrency), 1, max_concurrency, target_latency
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.texts = 0
+        self.request_seconds = 0.0
+
+    def pack_batches(self, texts: list[str]) -> list[list[int]]:
+        """Greedily groups text indices into batches within both limits."""
+        batches, current, tokens = [], [], 0
+        for index, text in enumerate(texts):
+            cost = self.token_counter(text)
+            if current and (len(current) >= self.max_batch_items or tokens + cost > self.max_batch_tokens):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(index)
+            tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                vectors = self.embedder.embed_documents(texts)
+            except Exception as e:
+                self.limiter.release()
+                if is_rate_limited(e):
+                    self.limiter.on_rate_limited()
+                    with self._lock:
+                        self.rate_limited += 1
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise EmbeddingError(f"Embedding {len(texts)} texts failed: {e}") from e
+                with self._lock:
+                    self.retries += 1
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+                continue
+            latency = time.perf_counter() - start
+            self.limiter.release()
+            self.limiter.on_success(latency)
+            with self._lock:
+                self.requests += 1
+                self.texts += len(texts)
+                self.request_seconds += latency
+            return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embeds texts in order, running packed batches concurrently."""
+        if not texts:
+            return []
+        batches = self.pack_batches(texts)
+        results = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            futures = {
+                pool.submit(self._embed_batch, [texts[i] for i in batch]): batch
+                for batch in batches
+            }
+            for future, batch in futures.items():
+                for index, vector in zip(batch, future.result()):
+                    results[index] = vector
+        return results
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "concurrency_limit": self.limiter.limit,
+                "avg_request_seconds": self.request_seconds / self.requests if self.requests else 0.0,
+            }
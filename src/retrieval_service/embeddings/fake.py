@@ -0,0 +1,37 @@
+# src/retrieval_service/embeddings/fake.py
+import hashlib
+import math
+import random
+import time
+
+
+class FakeEmbedder:
+    """
+    Deterministic, offline stand-in for VertexAIEmbeddings.
+
+    Each text maps to a fixed unit vector seeded from its SHA-256, so equal
+    texts always get equal vectors and no network call is made. Useful for
+    tests, local development and benchmarks. latency (seconds) is slept
+    once per call to mimic a remote embedding request.
+    """
+    def __init__(self, dimensions: int = 768, model_name: str = "fake-embedder", latency: float = 0.0):
+        self.dimensions = dimensions
+        self.model_name = model_name
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
@@ -0,0 +1,232 @@
+# src/retrieval_service/ingestion/artifacts.py
+import csv
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+import numpy as np
+
+# A processed-chunk artifact is a directory holding:
+#   chunks.parquet   one row of metadata + content per chunk
+#   embeddings.npy   float32 matrix, row i is the embedding of chunk i
+#   artifact.json    row count, dimensions, embedding model, format version
+# The .npy file can be memory-mapped, so loading a snapshot never parses text.
+# The artifact path is a symlink to a "<path>.artifact-<id>" directory, so a
+# rewrite is published by a single rename of the link.
+METADATA_FILE = "chunks.parquet"
+EMBEDDINGS_FILE = "embeddings.npy"
+INFO_FILE = "artifact.json"
+FORMAT_VERSION = 1
+VERSION_SUFFIX = ".artifact-"
+
+METADATA_COLUMNS = ["source_filename", "title", "authors", "publication_date", "content"]
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, INFO_FILE))
+
+
+class ArtifactWriter:
+    """
+    Writes an artifact of a known number of rows batch by batch, so an
+    artifact larger than memory can be built: metadata goes to a parquet
+    file one row group per batch and embeddings into a memory-mapped .npy.
+    Files are written to a new version directory and the artifact path is
+    switched to it by one atomic rename on close(), so a crash never leaves
+    a half-written artifact behind and the previous one stays readable
+    until then.
+    """
+    def __init__(self, path: str, rows: int, dimensions: int, model_name: str | None = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path = os.path.normpath(path)
+        self.rows = rows
+        self.dimensions = dimensions
+        self.model_name = model_name
+        self.written = 0
+        self._version = f"{self.path}{VERSION_SUFFIX}{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._version)
+        self._schema = pa.schema([(column, pa.string()) for column in METADATA_COLUMNS])
+        self._metadata = pq.ParquetWriter(
+            os.path.join(self._version, METADATA_FILE), self._schema, compression="zstd"
+        )
+        if rows:
+            self._embeddings = np.lib.format.open_memmap(
+                os.path.join(self._version, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(rows, dimensions)
+            )
+        else:
+            # An empty file cannot be memory-mapped.
+            self._embeddings = np.empty((0, dimensions), dtype=np.float32)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(self, chunks: list[dict], embeddings) -> None:
+        import pyarrow as pa
+
+        if not chunks:
+            return
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(chunks), -1)
+        if matrix.shape[1] != self.dimensions or self.written + len(chunks) > self.rows:
+            raise ValueError(
+                f"Cannot append {matrix.shape} embeddings to an artifact of "
+                f"{self.rows} x {self.dimensions} holding {self.written} rows"
+            )
+        self._metadata.write_table(pa.Table.from_pylist(
+            [{column: chunk.get(column) for column in METADATA_COLUMNS} for chunk in chunks], schema=self._schema,
+        ))
+        self._embeddings[self.written:self.written + len(chunks)] = matrix
+        self.written += len(chunks)
+
+    def close(self) -> None:
+        if self.written != self.rows:
+            self.abort()
+            raise ValueError(f"Expected {self.rows} rows, {self.written} were written")
+        self._metadata.close()
+        if isinstance(self._embeddings, np.memmap):
+            self._embeddings.flush()
+        else:
+            with open(os.path.join(self._version, EMBEDDINGS_FILE), "wb") as f:
+                np.save(f, self._embeddings)
+        del self._embeddings
+        info = {
+            "format_version": FORMAT_VERSION,
+            "rows": self.rows,
+            "dimensions": self.dimensions,
+            "embedding_model": self.model_name,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with open(os.path.join(self._version, INFO_FILE), "w") as f:
+            json.dump(info, f, indent=2)
+
+        link = self._version + ".link"
+        os.symlink(os.path.basename(self._version), link)
+        if os.path.isdir(self.path) and not os.path.islink(self.path):
+            # An artifact written before versioned directories is moved aside
+            # once; only this first switch is not atomic.
+            os.rename(self.path, f"{self.path}{VERSION_SUFFIX}unversioned")
+        os.replace(link, self.path)
+        # Older versions, and those left by crashed writers. Readers that
+        # memory-mapped a removed version keep their mapping.
+        for version in glob.glob(glob.escape(self.path + VERSION_SUFFIX) + "*"):
+            if version == self._version:
+                continue
+            if os.path.isdir(version) and not os.path.islink(version):
+                shutil.rmtree(version, ignore_errors=True)
+            else:
+                os.remove(version)
+
+    def abort(self) -> None:
+        self._metadata.close()
+        self._embeddings = None
+        shutil.rmtree(self._version, ignore_errors=True)
+
+
+def write_artifact(path: str, chunks: list[dict], embeddings, model_name: str | None = None) -> None:
+    """Writes chunk metadata and their embeddings as an artifact directory."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(chunks):
+        raise ValueError(f"Expected {len(chunks)} embeddings, got array of shape {matrix.shape}")
+    with ArtifactWriter(path, len(chunks), int(matrix.shape[1]), model_name) as writer:
+        writer.append(chunks, matrix)
+
+
+def artifact_info(path: str) -> dict:
+    with open(os.path.join(path, INFO_FILE)) as f:
+        return json.load(f)
+
+
+def iter_artifact_batches(path: str, batch_size: int = 10000, sources: set[str] | None = None):
+    """
+    Yields (chunk metadata, embeddings) of an artifact directory in batches
+    of at most batch_size rows, keeping only chunks of the given source
+    files if sources is set. Only one batch is in memory at a time.
+    """
+    import pyarrow.parquet as pq
+
+    # Resolved once, so a rewrite published meanwhile is not mixed in.
+    path = os.path.realpath(path)
+    metadata_file = pq.ParquetFile(os.path.join(path, METADATA_FILE))
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+    _check_rows(path, metadata_file.metadata.num_rows, embeddings)
+    offset = 0
+    for record_batch in metadata_file.iter_batches(batch_size=batch_size):
+        metadata = record_batch.to_pylist()
+        rows = np.arange(offset, offset + len(metadata))
+        offset += len(metadata)
+        if sources is not None:
+            keep = [i for i, chunk in enumerate(metadata) if chunk["source_filename"] in sources]
+            metadata, rows = [metadata[i] for i in keep], rows[keep]
+        if metadata:
+            yield metadata, np.asarray(embeddings[rows], dtype=np.float32)
+
+
+def count_artifact_rows(path: str, sources: set[str] | None = None) -> int:
+    """Counts an artifact's rows (of the given source files), reading only that column."""
+    import pyarrow.parquet as pq
+
+    if sources is None:
+        return artifact_info(path)["rows"]
+    return sum(
+        sum(1 for source in batch.column(0).to_pylist() if source in sources)
+        for batch in pq.ParquetFile(os.path.join(path, METADATA_FILE)).iter_batches(columns=["source_filename"])
+    )
+
+
+def read_artifact(path: str, mmap: bool = True) -> tuple[list[dict], np.ndarray]:
+    """
+    Returns (chunk metadata, embedding matrix) for an artifact directory or
+    a legacy processed_*.csv file with JSON-encoded embeddings.
+    """
+    if not is_artifact(path):
+        return _read_legacy_csv(path)
+
+    import pyarrow.parquet as pq
+
+    path = os.path.realpath(path)
+    metadata = pq.read_table(os.path.join(path, METADATA_FILE)).to_pylist()
+    embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r" if mmap else None)
+    _check_rows(path, len(metadata), embeddings)
+    return metadata, embeddings
+
+
+def _check_rows(path: str, metadata_rows: int, embeddings: np.ndarray) -> None:
+    """Raises unless both files hold the rows and dimensions artifact.json records."""
+    info = artifact_info(path)
+    expected = (info["rows"], info["dimensions"])
+    if metadata_rows != expected[0] or embeddings.shape != expected:
+        raise ValueError(
+            f"Artifact {path} is inconsistent: {metadata_rows} metadata rows and "
+            f"{embeddings.shape} embeddings, expected {expected}"
+        )
+
+
+def iter_records(path: str):
+    """Yields chunk dicts with an "embedding" float32 array, in file order."""
+    metadata, embeddings = read_artifact(path)
+    for chunk, embedding in zip(metadata, embeddings):
+        yield {**chunk, "embedding": embedding}
+
+
+def _read_legacy_csv(path: str) -> tuple[list[dict], np.ndarray]:
+    csv.field_size_limit(sys.maxsize)
+    metadata, vectors = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if not row.get("embedding"):
+                continue
+            metadata.append({column: row.get(column) for column in METADATA_COLUMNS})
+            vectors.append(json.loads(row["embedding"]))
+    embeddings = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    return metadata, embeddings
@@ -0,0 +1,141 @@
+# src/retrieval_service/ingestion/dedup.py
+import hashlib
+import os
+import re
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+# MinHash signature length, split into LSH_BANDS bands of equal width. With
+# 16 bands of 8 rows, two documents become candidates with probability
+# 1 - (1 - J^8)^16: ~0.5 at Jaccard 0.7, >0.99 at 0.85.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+SHINGLE_WORDS = 5
+# Candidates whose estimated Jaccard similarity reaches this are duplicates.
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+
+_PRIME = (1 << 31) - 1
+_MAX_HASH = np.uint64(_PRIME)
+_rng = np.random.default_rng(20250901)
+# Fixed affine permutations h(x) = (a * x + b) mod p; with 31-bit inputs
+# the products fit in uint64. Signatures are only comparable if these never
+# change, so the seed is part of the stored format.
+_A = _rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class Fingerprint:
+    """Exact hash and MinHash signature of one document's text."""
+    content_sha256: str
+    minhash: np.ndarray  # NUM_PERMUTATIONS uint32 values
+
+    def band_hashes(self) -> list[int]:
+        """One signed 64-bit hash per LSH band, as stored in PostgreSQL."""
+        return [
+            int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "big", signed=True)
+            for band in np.split(self.minhash, LSH_BANDS)
+        ]
+
+    def similarity(self, other_minhash: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the two documents' shingle sets."""
+        return float(np.mean(self.minhash == other_minhash))
+
+    def minhash_bytes(self) -> bytes:
+        return self.minhash.astype("<u4").tobytes()
+
+
+def minhash_from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
+
+
+def fingerprint(text: str) -> Fingerprint | None:
+    """
+    Fingerprints text by its words, so case, punctuation and layout
+    differences between two extractions of the same document do not
+    matter. Returns None for text without words.
+    """
+    words = _WORD.findall(text.casefold())
+    if not words:
+        return None
+    content_sha256 = hashlib.sha256(" ".join(words).encode("utf-8")).hexdigest()
+    width = min(SHINGLE_WORDS, len(words))
+    shingles = {" ".join(words[i:i + width]) for i in range(len(words) - width + 1)}
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) & _PRIME for shingle in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    signature = np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    # Blocks of shingles bound the (shingles x permutations) buffer.
+    for start in range(0, len(hashes), 4096):
+        permuted = (hashes[start:start + 4096, None] * _A + _B) % _MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return Fingerprint(content_sha256, signature.astype(np.uint32))
+
+
+def fingerprint_chunks(chunks: list[dict]) -> Fingerprint | None:
+    """Fingerprints a document from its chunk records, in order."""
+    return fingerprint(" ".join(chunk["content"] for chunk in chunks))
+
+
+def best_match(fp: Fingerprint, candidates, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+    """
+    Picks the candidate fp duplicates, from (key, content_sha256, minhash)
+    triples. Returns (key, kind, similarity), kind being "exact" or "near",
+    or None.
+    """
+    best = None
+    for key, content_sha256, minhash in candidates:
+        if content_sha256 == fp.content_sha256:
+            return key, "exact", 1.0
+        similarity = fp.similarity(minhash)
+        if similarity >= threshold and (best is None or similarity > best[2]):
+            best = (key, "near", similarity)
+    return best
+
+
+class DuplicateIndex:
+    """
+    In-memory exact-hash map plus LSH band index over canonical documents,
+    for batch ingestion where every document is at hand.
+    """
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._fingerprints = {}
+        self._exact = {}
+        self._bands = {}
+
+    def add(self, key: str, fp: Fingerprint):
+        self._fingerprints[key] = fp
+        self._exact.setdefault(fp.content_sha256, key)
+        for band, band_hash in enumerate(fp.band_hashes()):
+            self._bands.setdefault((band, band_hash), []).append(key)
+
+    def find(self, fp: Fingerprint):
+        """Returns (canonical key, kind, similarity) or None."""
+        if fp.content_sha256 in self._exact:
+            return self._exact[fp.content_sha256], "exact", 1.0
+        keys = {key for band in enumerate(fp.band_hashes()) for key in self._bands.get(band, ())}
+        candidates = [
+            (key, self._fingerprints[key].content_sha256, self._fingerprints[key].minhash) for key in sorted(keys)
+        ]
+        return best_match(fp, candidates, self.threshold)
+
+
+def find_duplicate(datastore, source: str, fp: Fingerprint):
+    """
+    Looks fp up among the datastore's canonical documents. Returns
+    (candidate row, kind, similarity) or None.
+    """
+    candidates = datastore.find_duplicate_candidates(source, fp.content_sha256, fp.band_hashes())
+    by_id = {candidate["id"]: candidate for candidate in candidates}
+    match = best_match(
+        fp, [(c["id"], c["content_sha256"], minhash_from_bytes(c["minhash"])) for c in candidates]
+    )
+    if match is None:
+        return None
+    return by_id[match[0]], match[1], match[2]
@@ -0,0 +1,64 @@
+# src/retrieval_service/ingestion/embedding_cache.py
+import hashlib
+import sqlite3
+
+import numpy as np
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of chunk embeddings keyed by (chunk text hash, model), so
+    re-chunking or reprocessing a corpus only pays for text it has not seen.
+    Vectors are stored as float32 blobs in a single SQLite file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        # The streaming pipeline opens the cache on one thread and uses it on
+        # its embedding thread; it is never used by two threads at once.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " text_sha256 TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (text_sha256, model))"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, texts: list[str], model: str) -> dict[int, np.ndarray]:
+        """Returns {index into texts: embedding} for the texts already cached."""
+        found = {}
+        keys = [text_sha256(text) for text in texts]
+        # SQLite limits the number of bound parameters per statement.
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT text_sha256, vector FROM embeddings WHERE model = ? "
+                f"AND text_sha256 IN ({','.join('?' * len(batch))})",
+                [model, *batch],
+            ).fetchall()
+            vectors = {key: np.frombuffer(blob, dtype="<f4") for key, blob in rows}
+            for offset, key in enumerate(batch):
+                if key in vectors:
+                    found[start + offset] = vectors[key]
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, texts: list[str], vectors, model: str):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (text_sha256, model, vector) VALUES (?, ?, ?)",
+            [
+                (text_sha256(text), model, np.asarray(vector, dtype="<f4").tobytes())
+                for text, vector in zip(texts, vectors)
+            ],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
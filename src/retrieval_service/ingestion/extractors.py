@@ -0,0 +1,112 @@
+# src/retrieval_service/ingestion/extractors.py
+import re
+from abc import ABC, abstractmethod
+
+
+class MetadataExtractor(ABC):
+    """
+    Turns a PDF's document metadata and first-page text into the title,
+    authors and publication_date stored with every chunk.
+    """
+    name = "base"
+    # Whether extract() wants the first page as layout-sorted text.
+    needs_sorted_first_page = False
+
+    @abstractmethod
+    def extract(self, filename: str, pdf_metadata: dict, first_page_text: str) -> dict:
+        pass
+
+
+class PaperExtractor(MetadataExtractor):
+    """Research papers: trust the PDF's embedded metadata."""
+    name = "papers"
+
+    def extract(self, filename, pdf_metadata, first_page_text):
+        return {
+            "title": pdf_metadata.get('title') or filename.replace(".pdf", ""),
+            "authors": pdf_metadata.get('author') or 'Unknown Authors',
+            "publication_date": pdf_metadata.get('creationDate') or 'Unknown Date',
+        }
+
+
+def _match_fields(patterns: dict, text: str) -> dict:
+    metadata = {}
+    for key, pattern in patterns.items():
+        match = pattern.search(text)
+        # Clean up the extracted text
+        metadata[key] = match.group(1).replace('\n', ' ').strip() if match else 'Not Found'
+    return metadata
+
+
+class USPatentExtractor(MetadataExtractor):
+    """US patents, using the INID codes printed on the front page."""
+    name = "us-patents"
+    needs_sorted_first_page = True
+
+    # Regex patterns for common US patent formats. These may need refinement.
+    patterns = {
+        'patent_id': re.compile(r'\(12\)\sUnited States Patent\s.*?\(10\)\sPatent No\.:\s*(US\s[\d,]+)', re.DOTALL),
+        'title': re.compile(r'\(54\)\s(.*?)\(71\)', re.DOTALL),
+        'inventors': re.compile(r'\(72\)\sInventors:\s*(.*?)(?=\n\(|$)'),
+        'assignee': re.compile(r'\(73\)\sAssignee:\s*(.*?)(?=\n\(|$)'),
+        'publication_date': re.compile(r'\(45\)\sDate of Patent:\s*(.*?)(?=\n\(|$)'),
+    }
+
+    def extract(self, filename, pdf_metadata, first_page_text):
+        metadata = _match_fields(self.patterns, first_page_text)
+        return {
+            "title": metadata['title'],
+            # Combine inventors and assignee into a single 'authors' field
+            "authors": f"Inventors: {metadata['inventors']}; Assignee: {metadata['assignee']}",
+            "publication_date": metadata['publication_date'],
+        }
+
+
+class KRPatentExtractor(MetadataExtractor):
+    """Korean (KIPO) patent publications and registrations."""
+    name = "kr-patents"
+    needs_sorted_first_page = True
+
+    patterns = {
+        'title': re.compile(r'\(54\)\s*발명의\s*명칭\s*(.*?)(?=\n\(\d\d\)|$)', re.DOTALL),
+        'inventors': re.compile(r'\(72\)\s*발명자\s*(.*?)(?=\n\(\d\d\)|$)', re.DOTALL),
+        'assignee': re.compile(r'\(7[13]\)\s*(?:출원인|특허권자)\s*(.*?)(?=\n\(\d\d\)|$)', re.DOTALL),
+        # Registration date (45) for granted patents, else publication date (43).
+        'publication_date': re.compile(r'\(4[53]\)\s*(?:등록일자|공고일자|공개일자)\s*([\d년월일 .\-]+)'),
+    }
+
+    def extract(self, filename, pdf_metadata, first_page_text):
+        metadata = _match_fields(self.patterns, first_page_text)
+        return {
+            "title": metadata['title'],
+            "authors": f"Inventors: {metadata['inventors']}; Assignee: {metadata['assignee']}",
+            "publication_date": metadata['publication_date'],
+        }
+
+
+class PatentExtractor(MetadataExtractor):
+    """Dispatches to the KR or US extractor based on the front page."""
+    name = "patents"
+    needs_sorted_first_page = True
+
+    def __init__(self):
+        self.us = USPatentExtractor()
+        self.kr = KRPatentExtractor()
+
+    def extract(self, filename, pdf_metadata, first_page_text):
+        if "대한민국특허청" in first_page_text or "(KR)" in first_page_text:
+            return self.kr.extract(filename, pdf_metadata, first_page_text)
+        return self.us.extract(filename, pdf_metadata, first_page_text)
+
+
+EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (PaperExtractor(), USPatentExtractor(), KRPatentExtractor(), PatentExtractor())
+}
+
+
+def get_extractor(name: str) -> MetadataExtractor:
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported extractor: {name}") from None
@@ -0,0 +1,222 @@
+# src/retrieval_service/ingestion/incremental.py
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from .artifacts import (
+    ArtifactWriter,
+    artifact_info,
+    count_artifact_rows,
+    is_artifact,
+    iter_artifact_batches,
+    read_artifact,
+    write_artifact,
+)
+from .embedding_cache import EmbeddingCache
+
+# Spooled parts live next to the artifact until the run is folded into it.
+SPOOL_SUFFIX = ".spool"
+JOURNAL_FILE = "journal.jsonl"
+_PART = re.compile(r"^part-(\d+)$")
+
+
+def embed_with_cache(embed_service, contents: list[str], model: str, cache: EmbeddingCache, group_size: int = 2000):
+    """
+    Embeds contents, reading and filling the on-disk cache. Returns one
+    vector per input, or None for inputs whose group failed.
+
+    Missing texts are handed to embed_service group_size at a time; a
+    BatchingEmbeddingClient packs and parallelizes each group and retries
+    throttled batches, so a group only fails once its retries are spent.
+    Each finished group is cached right away, so a failed run resumes
+    where it stopped.
+    """
+    embeddings = [None] * len(contents)
+    for index, vector in cache.get_many(contents, model).items():
+        embeddings[index] = vector
+    missing = [i for i, vector in enumerate(embeddings) if vector is None]
+    print(f"Embedding cache: {len(contents) - len(missing)} hits, {len(missing)} to embed.")
+
+    for start in range(0, len(missing), group_size):
+        batch = missing[start:start + group_size]
+        texts = [contents[i] for i in batch]
+        try:
+            vectors = embed_service.embed_documents(texts)
+        except Exception as e:
+            print(f"Error embedding {len(texts)} chunks starting at index {batch[0]}. Error: {e}")
+            continue
+        cache.put_many(texts, vectors, model)
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector
+    return embeddings
+
+
+class ChunkSpool:
+    """
+    Append-only staging area for one run of the pipeline, next to the
+    artifact it will be folded into. Every embedded batch is written as a
+    numbered part (a small artifact), and a file is committed by a journal
+    line once all of its chunks are in parts. A crashed run keeps its
+    committed files: the next run finds them here and does not extract or
+    embed them again.
+    """
+    def __init__(self, artifact_path: str, settings: dict, embedding_model: str):
+        self.path = artifact_path.rstrip("/") + SPOOL_SUFFIX
+        self.settings = settings
+        self.embedding_model = embedding_model
+        os.makedirs(self.path, exist_ok=True)
+        # filename -> journal record of its latest commit.
+        self.committed = {}
+        journal = os.path.join(self.path, JOURNAL_FILE)
+        if os.path.exists(journal):
+            with open(journal) as f:
+                for line in f:
+                    # A torn last line from a crash mid-write is ignored.
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.committed[record["filename"]] = record
+        self._next_part = max(self._part_numbers(), default=0) + 1
+        # filename -> [first part, last part, chunks] of files still open.
+        self._open = {}
+        self._failed = set()
+        self._journal = open(journal, "a")
+
+    def _part_numbers(self) -> list[int]:
+        return [int(m.group(1)) for m in map(_PART.match, os.listdir(self.path)) if m]
+
+    def _part_path(self, number: int) -> str:
+        return os.path.join(self.path, f"part-{number:06d}")
+
+    def is_current(self, filename: str, sha256: str) -> bool:
+        record = self.committed.get(filename)
+        return (
+            record is not None
+            and record["sha256"] == sha256
+            and record["settings"] == self.settings
+            and record["embedding_model"] == self.embedding_model
+        )
+
+    def append(self, chunks: list[dict], embeddings: list, finished: list[tuple[str, str, dict]]):
+        """
+        Writes the chunks that have an embedding as a new part, then commits
+        the finished files, given as (filename, sha256, manifest fields).
+        Files with a chunk that could not be embedded are not committed.
+        """
+        rows = [(chunk, vector) for chunk, vector in zip(chunks, embeddings) if vector is not None]
+        self._failed.update(chunk["source_filename"] for chunk, vector in zip(chunks, embeddings) if vector is None)
+        if rows:
+            number = self._next_part
+            write_artifact(
+                self._part_path(number), [chunk for chunk, _ in rows], [vector for _, vector in rows],
+                model_name=self.embedding_model,
+            )
+            self._next_part += 1
+            for chunk, _ in rows:
+                span = self._open.setdefault(chunk["source_filename"], [number, number, 0])
+                span[1] = number
+                span[2] += 1
+        for filename, sha256, fields in finished:
+            first, last, count = self._open.pop(filename, (None, None, 0))
+            if filename in self._failed:
+                print(f"Not committing {filename}: some chunks could not be embedded. It is retried next run.")
+                continue
+            record = {
+                "filename": filename,
+                "sha256": sha256,
+                "settings": self.settings,
+                "embedding_model": self.embedding_model,
+                "chunks": count,
+                "parts": [first, last] if count else None,
+                "fields": fields,
+            }
+            self._journal.write(json.dumps(record) + "\n")
+            self.committed[filename] = record
+        if finished:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    @property
+    def failed(self) -> set[str]:
+        return set(self._failed)
+
+    def iter_batches(self, filenames: set[str]):
+        """Yields (chunk metadata, embeddings) of the committed chunks of filenames, in part order."""
+        for number in sorted(self._part_numbers()):
+            metadata, embeddings = read_artifact(self._part_path(number))
+            keep = []
+            for i, chunk in enumerate(metadata):
+                record = self.committed.get(chunk["source_filename"])
+                if chunk["source_filename"] in filenames and record["parts"] and (
+                    record["parts"][0] <= number <= record["parts"][1]
+                ):
+                    keep.append(i)
+            if keep:
+                yield [metadata[i] for i in keep], np.asarray(embeddings[keep], dtype=np.float32)
+
+    def dimensions(self) -> int | None:
+        numbers = self._part_numbers()
+        return artifact_info(self._part_path(min(numbers)))["dimensions"] if numbers else None
+
+    def close(self):
+        self._journal.close()
+
+    def remove(self):
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def fold_spool(
+    artifact_path: str,
+    manifest,
+    spool: ChunkSpool,
+    unchanged: set[str],
+    file_hashes: dict[str, str],
+    batch_size: int = 10000,
+):
+    """
+    Rewrites the artifact as the previous artifact's chunks of unchanged
+    files followed by the spool's committed chunks, streaming one batch at a
+    time, then records the committed files in the manifest and removes the
+    spool. Until the artifact is renamed into place the previous one stays
+    intact and the spool can be folded again.
+    """
+    removed = manifest.retain(file_hashes)
+    committed = {
+        filename: record for filename, record in spool.committed.items()
+        if filename in file_hashes and filename not in unchanged
+    }
+    if not committed and not removed:
+        spool.remove()
+        print("No new chunks. Artifact is up to date.")
+        return
+
+    previous = is_artifact(artifact_path)
+    carried = count_artifact_rows(artifact_path, unchanged) if previous and unchanged else 0
+    fresh = sum(record["chunks"] for record in committed.values())
+    dimensions = spool.dimensions() or (artifact_info(artifact_path)["dimensions"] if previous else None)
+    if dimensions is None:
+        print("No chunks were embedded. Exiting.")
+    else:
+        with ArtifactWriter(artifact_path, carried + fresh, dimensions, spool.embedding_model) as writer:
+            if carried:
+                for chunks, embeddings in iter_artifact_batches(artifact_path, batch_size, unchanged):
+                    writer.append(chunks, embeddings)
+            for chunks, embeddings in spool.iter_batches(set(committed)):
+                writer.append(chunks, embeddings)
+
+    for filename, record in committed.items():
+        manifest.record(
+            filename, record["sha256"], record["settings"], record["embedding_model"], record["chunks"],
+            **record["fields"],
+        )
+    manifest.save()
+    spool.remove()
+    print(
+        f"Artifact now holds {carried + fresh} chunks: {fresh} new, "
+        f"{carried} reused, {len(removed)} files removed."
+    )
@@ -0,0 +1,67 @@
+# src/retrieval_service/ingestion/manifest.py
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hashes a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """
+    Records, per input file, the content hash, chunker settings and
+    embedding model its chunks were produced with. A file whose entry still
+    matches can be skipped and its chunks reused from the previous artifact.
+    """
+    def __init__(self, path: str, files: dict | None = None):
+        self.path = path
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestionManifest":
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            return cls(path, json.load(f).get("files", {}))
+
+    def is_current(self, filename: str, sha256: str, chunker: dict, embedding_model: str) -> bool:
+        entry = self.files.get(filename)
+        return (
+            entry is not None
+            and entry["sha256"] == sha256
+            and entry["chunker"] == chunker
+            and entry["embedding_model"] == embedding_model
+        )
+
+    def record(self, filename: str, sha256: str, chunker: dict, embedding_model: str, chunks: int, **extra):
+        self.files[filename] = {
+            "sha256": sha256,
+            "chunker": chunker,
+            "embedding_model": embedding_model,
+            "chunks": chunks,
+            "processed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **extra,
+        }
+
+    def retain(self, filenames) -> list[str]:
+        """Drops entries for files no longer present; returns the dropped names."""
+        keep = set(filenames)
+        removed = [name for name in self.files if name not in keep]
+        for name in removed:
+            del self.files[name]
+        return removed
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"files": self.files}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,290 @@
+# src/retrieval_service/ingestion/pipeline.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .dedup import DuplicateIndex, Fingerprint, fingerprint_chunks
+from .embedding_cache import EmbeddingCache
+from .extractors import get_extractor
+from .incremental import ChunkSpool, embed_with_cache, fold_spool
+from .manifest import MANIFEST_FILE, IngestionManifest, file_sha256
+from .streaming import StreamingSplitter, threaded
+
+CHUNKER_SETTINGS = {"splitter": "RecursiveCharacterTextSplitter", "chunk_size": 1000, "chunk_overlap": 100}
+EMBEDDING_CACHE_PATH = "./data/embedding_cache.sqlite"
+# Chunks per embedding batch, and per part written to the spool.
+EMBED_BATCH_CHUNKS = int(os.environ.get("EMBED_BATCH_CHUNKS", "2000"))
+
+
+@dataclass
+class ExtractedFile:
+    filename: str
+    chunks: list[dict] = field(default_factory=list)
+    pages: int = 0
+    error: str | None = None
+
+
+@dataclass
+class PipelineStats:
+    files: int = 0
+    skipped: int = 0
+    failed: int = 0
+    pages: int = 0
+    chunks: int = 0
+    resumed: int = 0
+    # Stages overlap: extraction and embedding are the time each stage was
+    # busy, total the wall time of the run.
+    extract_seconds: float = 0.0
+    embed_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    def report(self) -> str:
+        pages_per_s = self.pages / self.extract_seconds if self.extract_seconds else 0.0
+        chunks_per_s = self.chunks / self.extract_seconds if self.extract_seconds else 0.0
+        embedded_per_s = self.chunks / self.embed_seconds if self.embed_seconds else 0.0
+        return (
+            f"{self.files} files processed, {self.skipped} unchanged, {self.resumed} resumed, {self.failed} failed. "
+            f"Extraction: {self.pages} pages, {self.chunks} chunks in {self.extract_seconds:.1f}s "
+            f"({pages_per_s:.1f} pages/s, {chunks_per_s:.1f} chunks/s). "
+            f"Embedding: {self.embed_seconds:.1f}s ({embedded_per_s:.1f} chunks/s). "
+            f"Total: {self.total_seconds:.1f}s."
+        )
+
+
+@dataclass
+class ChunkBatch:
+    chunks: list[dict]
+    # (filename, sha256, manifest fields) of files whose last chunk is in
+    # this batch or an earlier one.
+    finished: list[tuple[str, str, dict]]
+    embeddings: list | None = None
+
+
+# Splitters are built once per worker process and chunker setting.
+_splitters = {}
+
+def _get_splitter(chunker: dict):
+    key = (chunker["chunk_size"], chunker["chunk_overlap"])
+    if key not in _splitters:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        _splitters[key] = RecursiveCharacterTextSplitter(chunk_size=key[0], chunk_overlap=key[1])
+    return _splitters[key]
+
+
+def extract_and_chunk(path: str, extractor_name: str, chunker: dict) -> ExtractedFile:
+    """
+    Parses one PDF and splits it into chunk records. Runs in a worker
+    process. Pages stream into the splitter instead of being joined into
+    one string, and every page is parsed exactly once: the first page's text
+    page is reused for the layout-sorted text the metadata extractor needs.
+    """
+    import fitz  # PyMuPDF
+
+    filename = os.path.basename(path)
+    extractor = get_extractor(extractor_name)
+    splitter = StreamingSplitter(_get_splitter(chunker))
+    chunk_texts = []
+    pages = 0
+    try:
+        with fitz.open(path) as doc:
+            first_page_text = ""
+            for page in doc:
+                textpage = page.get_textpage()
+                text = page.get_text("text", textpage=textpage)
+                if pages == 0:
+                    first_page_text = (
+                        page.get_text("text", textpage=textpage, sort=True)
+                        if extractor.needs_sorted_first_page
+                        else text
+                    )
+                chunk_texts.extend(splitter.feed(text))
+                pages += 1
+            metadata = extractor.extract(filename, doc.metadata or {}, first_page_text)
+        chunk_texts.extend(splitter.close())
+    except Exception as e:
+        return ExtractedFile(filename, error=str(e))
+
+    chunks = [{"source_filename": filename, **metadata, "content": chunk_text} for chunk_text in chunk_texts]
+    return ExtractedFile(filename, chunks=chunks, pages=pages)
+
+
+def extract_pdf(path: str, extractor_name: str, chunker: dict = CHUNKER_SETTINGS) -> list[dict]:
+    """Extracts and chunks a single PDF. Raises on failure."""
+    result = extract_and_chunk(path, extractor_name, chunker)
+    if result.error:
+        raise ValueError(f"Could not process {result.filename}: {result.error}")
+    return result.chunks
+
+
+def embed_chunks(chunks: list[dict], embed_service) -> list[dict]:
+    """Adds an "embedding" to every chunk record, in place."""
+    vectors = embed_service.embed_documents([chunk["content"] for chunk in chunks])
+    for chunk, vector in zip(chunks, vectors):
+        chunk["embedding"] = vector
+    return chunks
+
+
+def ingest_pdf(path: str, extractor_name: str, embed_service, chunker: dict = CHUNKER_SETTINGS) -> list[dict]:
+    """
+    Extracts, chunks and embeds a single PDF, returning chunk records with
+    an "embedding" ready for Client.add_documents. Raises on failure.
+    """
+    return embed_chunks(extract_pdf(path, extractor_name, chunker), embed_service)
+
+
+def list_pdfs(directory: str) -> list[str]:
+    return sorted(f for f in os.listdir(directory) if f.lower().endswith(".pdf"))
+
+
+def extract_files(directory: str, filenames: list[str], extractor_name: str, chunker: dict, workers: int | None = None):
+    """
+    Yields ExtractedFile results in filename order from a process pool. At
+    most twice as many files as workers are in flight, so extraction never
+    runs further ahead of the consumer than that.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(filenames) <= 1:
+        for filename in filenames:
+            yield extract_and_chunk(os.path.join(directory, filename), extractor_name, chunker)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(filenames))) as pool:
+        pending = deque()
+        for filename in filenames:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(extract_and_chunk, os.path.join(directory, filename), extractor_name, chunker))
+        while pending:
+            yield pending.popleft().result()
+
+
+def seed_duplicate_index(index: DuplicateIndex, entries: dict[str, dict]):
+    """Adds the canonical files among filename -> manifest fields to index."""
+    for filename in sorted(entries):
+        entry = entries[filename]
+        if "content_sha256" in entry and not entry.get("duplicate_of"):
+            index.add(filename, Fingerprint(entry["content_sha256"], np.asarray(entry["minhash"], dtype=np.uint32)))
+
+
+def batch_chunks(results, file_hashes: dict[str, str], index: DuplicateIndex, stats: PipelineStats, batch_size: int):
+    """
+    Turns extracted files into ChunkBatches of batch_size chunks. A file
+    that duplicates, exactly or nearly, one already indexed is finished
+    without chunks, so it is never embedded; files are taken in filename
+    order, so the canonical copy does not depend on extraction timing.
+    """
+    chunks, finished = [], []
+    start = time.perf_counter()
+    for result in results:
+        stats.extract_seconds += time.perf_counter() - start
+        if result.error:
+            stats.failed += 1
+            print(f"Could not process {result.filename}. Error: {result.error}")
+            start = time.perf_counter()
+            continue
+        print(f"Processed: {result.filename} ({result.pages} pages, {len(result.chunks)} chunks)")
+        stats.files += 1
+        stats.pages += result.pages
+        stats.chunks += len(result.chunks)
+        fields, file_chunks = {}, result.chunks
+        fp = fingerprint_chunks(file_chunks)
+        if fp is not None:
+            fields = {"content_sha256": fp.content_sha256, "minhash": fp.minhash.tolist()}
+            match = index.find(fp)
+            if match is None:
+                index.add(result.filename, fp)
+            else:
+                canonical, kind, similarity = match
+                fields["duplicate_of"] = canonical
+                file_chunks = []
+                print(f"Skipping {result.filename}: {kind} duplicate of {canonical} (similarity {similarity:.2f}).")
+        for chunk in file_chunks:
+            chunks.append(chunk)
+            if len(chunks) >= batch_size:
+                yield ChunkBatch(chunks, finished)
+                chunks, finished = [], []
+        finished.append((result.filename, file_hashes[result.filename], fields))
+        start = time.perf_counter()
+    if chunks or finished:
+        yield ChunkBatch(chunks, finished)
+
+
+def run_pipeline(
+    input_dir: str,
+    artifact_path: str,
+    extractor_name: str,
+    embed_service,
+    embedding_model: str,
+    chunker: dict = CHUNKER_SETTINGS,
+    cache_path: str = EMBEDDING_CACHE_PATH,
+    workers: int | None = None,
+    batch_size: int = EMBED_BATCH_CHUNKS,
+) -> PipelineStats:
+    """
+    Incrementally processes every PDF in input_dir into the artifact at
+    artifact_path. Unchanged files are skipped; the rest stream through
+    three stages joined by bounded queues: extraction and chunking in a
+    process pool, embedding of chunk batches (through the on-disk cache),
+    and an append-only spool. Memory therefore stays flat however large
+    the corpus, and an interrupted run resumes from the files it had
+    committed to the spool. At the end the spool is folded into the
+    artifact.
+    """
+    stats = PipelineStats()
+    if not os.path.isdir(input_dir):
+        print(f"Error: Directory not found at '{input_dir}'")
+        return stats
+    run_start = time.perf_counter()
+
+    # The extractor is part of the settings: switching it reprocesses everything.
+    settings = {**chunker, "extractor": extractor_name}
+    manifest = IngestionManifest.load(os.path.join(artifact_path, MANIFEST_FILE))
+    spool = ChunkSpool(artifact_path, settings, embedding_model)
+    file_hashes, unchanged, resumed, to_process = {}, set(), set(), []
+    for filename in list_pdfs(input_dir):
+        file_hashes[filename] = file_sha256(os.path.join(input_dir, filename))
+        if manifest.is_current(filename, file_hashes[filename], settings, embedding_model):
+            unchanged.add(filename)
+        elif spool.is_current(filename, file_hashes[filename]):
+            resumed.add(filename)
+        else:
+            to_process.append(filename)
+    stats.skipped = len(unchanged)
+    stats.resumed = len(resumed)
+    print(f"{len(to_process)} files to process, {len(unchanged)} unchanged, {len(resumed)} already spooled.")
+
+    index = DuplicateIndex()
+    seed_duplicate_index(index, {filename: manifest.files.get(filename, {}) for filename in unchanged})
+    seed_duplicate_index(index, {filename: spool.committed[filename]["fields"] for filename in resumed})
+
+    cache = EmbeddingCache(cache_path)
+
+    def embed(batch: ChunkBatch) -> ChunkBatch:
+        start = time.perf_counter()
+        batch.embeddings = embed_with_cache(
+            embed_service, [chunk["content"] for chunk in batch.chunks], embedding_model, cache, batch_size
+        ) if batch.chunks else []
+        stats.embed_seconds += time.perf_counter() - start
+        return batch
+
+    try:
+        batches = batch_chunks(
+            extract_files(input_dir, to_process, extractor_name, chunker, workers),
+            file_hashes, index, stats, batch_size,
+        )
+        for batch in threaded(threaded(batches, name="extract"), embed, name="embed"):
+            spool.append(batch.chunks, batch.embeddings, batch.finished)
+    finally:
+        cache.close()
+        spool.close()
+
+    stats.failed += len(spool.failed)
+    fold_spool(artifact_path, manifest, spool, unchanged, file_hashes)
+    stats.total_seconds = time.perf_counter() - run_start
+    print(stats.report())
+    if hasattr(embed_service, "stats"):
+        print(f"Embedding client: {embed_service.stats()}")
+    return stats
@@ -0,0 +1,89 @@
+# src/retrieval_service/ingestion/streaming.py
+import os
+import queue
+import threading
+
+# Text buffered before the splitter runs; documents shorter than this are
+# split exactly as if all their pages had been joined up front.
+SPLIT_FLUSH_CHARS = int(os.environ.get("SPLIT_FLUSH_CHARS", "100000"))
+# Items a stage may run ahead of its consumer.
+STAGE_QUEUE_SIZE = int(os.environ.get("STAGE_QUEUE_SIZE", "2"))
+
+
+class StreamingSplitter:
+    """
+    Splits text that arrives a page at a time. Pages are buffered until they
+    hold flush_chars characters; the buffer is then split, every chunk but
+    the last is emitted, and the last is kept to be split again with the
+    following pages, so chunks still overlap across the flush point.
+    """
+    def __init__(self, splitter, flush_chars: int = SPLIT_FLUSH_CHARS):
+        self.splitter = splitter
+        self.flush_chars = flush_chars
+        self._parts = []
+        self._size = 0
+
+    def feed(self, text: str) -> list[str]:
+        self._parts.append(text)
+        self._size += len(text) + 1
+        if self._size < self.flush_chars:
+            return []
+        chunks = self.splitter.split_text(" ".join(self._parts))
+        if len(chunks) < 2:
+            return []
+        self._parts = [chunks[-1]]
+        self._size = len(chunks[-1]) + 1
+        return chunks[:-1]
+
+    def close(self) -> list[str]:
+        chunks = self.splitter.split_text(" ".join(self._parts)) if self._parts else []
+        self._parts = []
+        self._size = 0
+        return chunks
+
+
+_END = object()
+
+
+def threaded(items, fn=None, maxsize: int = STAGE_QUEUE_SIZE, name: str = "stage"):
+    """
+    Iterates items, mapped through fn if given, on a background thread and
+    yields the results through a queue of at most maxsize entries. The
+    thread blocks while the queue is full, so a slow consumer bounds how far
+    ahead the stage runs. An exception in the stage is re-raised here.
+    """
+    results = queue.Queue(maxsize)
+    stopping = threading.Event()
+
+    def put(entry) -> bool:
+        while not stopping.is_set():
+            try:
+                results.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run():
+        try:
+            for item in items:
+                if not put((fn(item) if fn is not None else item, None)):
+                    return
+            put((_END, None))
+        except BaseException as e:
+            put((_END, e))
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            value, error = results.get()
+            if error is not None:
+                raise error
+            if value is _END:
+                return
+            yield value
+    finally:
+        # The consumer stopped early or failed: release the stage thread.
+        stopping.set()
+        thread.join()
@@ -0,0 +1,209 @@
+# src/retrieval_service/jobs.py
+import logging
+import os
+import socket
+import threading
+import uuid
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+
+from .db import get_datastore
+from .metrics import INGEST_JOBS, trace_id
+
+logger = logging.getLogger(__name__)
+
+# queued -> extracting -> embedding -> stored | failed
+JOB_STATUSES = ("queued", "extracting", "embedding", "stored", "failed")
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+# How long an idle worker waits before looking for jobs queued by another
+# process; jobs queued by this one wake it immediately.
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", "5"))
+# A job whose row has not been updated for this long is presumed lost with
+# its worker and is run again, at most JOB_MAX_ATTEMPTS times in all. Must
+# exceed the slowest single stage (extracting or embedding one file).
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "900"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+# Jobs for files staged on this machine's disk are only claimed here. Any
+# other worker fails them once they have sat untouched for JOB_PINNED_SECONDS,
+# since a host that went away took the staged file with it. Must exceed how
+# long an upload can wait in its own host's queue.
+HOST = os.environ.get("INGEST_HOST") or socket.gethostname()
+JOB_PINNED_SECONDS = float(os.environ.get("JOB_PINNED_SECONDS", "3600"))
+
+
+@dataclass
+class Job:
+    id: str
+    source_uri: str
+    filename: str
+    extractor: str
+    generation: str | None = None
+    status: str = "queued"
+    chunks: int = 0
+    error: str | None = None
+    # Source of the document this file duplicates; such files are not stored.
+    duplicate_of: str | None = None
+    attempts: int = 0
+    # Trace id of the request that queued the job.
+    trace_id: str | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Job":
+        return cls(**{f.name: row[f.name] for f in fields(cls) if f.name in row})
+
+    def to_dict(self) -> dict:
+        return {
+            name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in asdict(self).items()
+        }
+
+
+class JobLost(Exception):
+    """The job's lease expired and another worker has claimed it."""
+
+
+class JobRunner:
+    """
+    Bounded pool of ingestion worker threads. Jobs are rows in the
+    datastore's ingestion_jobs table: every worker claims the oldest
+    runnable one, so the service, standalone workers (see worker.py) and any
+    number of replicas share one queue, and job state survives restarts.
+
+    process(job, progress) does the work: it calls progress(status) as it
+    moves through the stages and returns a dict of chunks/duplicate_of.
+    """
+    def __init__(self, process, workers: int = INGEST_WORKERS, poll_seconds: float = JOB_POLL_SECONDS):
+        self.process = process
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._exit_when_idle = False
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"ingest-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def submit(
+        self, source_uri: str, filename: str, extractor: str,
+        generation: str | None = None, local: bool = False,
+    ) -> tuple[Job, bool]:
+        """
+        Queues ingestion of source_uri, once per generation (an object
+        version); without one every call queues a new job. local pins the
+        job to this host. Returns the job and whether it is new.
+        """
+        job_id = uuid.uuid4().hex
+        row, created = get_datastore().enqueue_job({
+            "id": job_id,
+            "source_uri": source_uri,
+            "generation": generation or job_id,
+            "filename": filename,
+            "extractor": extractor,
+            "host": HOST if local else None,
+            "trace_id": trace_id(),
+        })
+        if created:
+            self._wake.set()
+        return Job.from_row(row), created
+
+    def get(self, job_id: str) -> Job | None:
+        row = get_datastore().get_job(job_id)
+        return Job.from_row(row) if row else None
+
+    def list_jobs(self, status: str | None = None, limit: int = 100) -> list[Job]:
+        return [Job.from_row(row) for row in get_datastore().list_jobs(status, limit)]
+
+    def counts(self) -> dict[str, int]:
+        return get_datastore().job_counts()
+
+    def _work(self):
+        datastore = get_datastore()
+        while not self._stopping.is_set():
+            try:
+                row = datastore.claim_job(HOST, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_PINNED_SECONDS)
+            except Exception:
+                logger.exception("Could not claim an ingestion job")
+                row = None
+            if row is None:
+                if self._exit_when_idle:
+                    return
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            try:
+                self._run(datastore, Job.from_row(row))
+            except Exception:
+                # Recording the outcome failed; the lease expiry retries the job.
+                logger.exception("Could not record ingestion job %s", row["id"])
+
+    def _run(self, datastore, job: Job):
+        def progress(status: str):
+            if not datastore.update_job(job.id, job.attempts, status):
+                raise JobLost(job.id)
+            job.status = status
+
+        try:
+            result = self.process(job, progress) or {}
+            job.status, job.error = "stored", None
+            job.chunks = result.get("chunks", 0)
+            job.duplicate_of = result.get("duplicate_of")
+        except JobLost:
+            logger.warning("Ingestion job %s was claimed by another worker", job.id)
+            return
+        except Exception as e:
+            logger.exception("Ingestion job %s failed", job.id)
+            job.status, job.error = "failed", str(e)
+        datastore.update_job(
+            job.id, job.attempts, job.status, chunks=job.chunks, error=job.error, duplicate_of=job.duplicate_of
+        )
+        INGEST_JOBS.labels(job.status).inc()
+
+    def drain(self):
+        """Runs until no job is claimable, then stops; for one-shot workers."""
+        self._exit_when_idle = True
+        self.start()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def shutdown(self, timeout: float | None = None):
+        """
+        Stops claiming jobs and waits up to timeout for running ones. A job
+        cut short stays claimed until its lease expires and is then retried.
+        """
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+
+_runner = None
+_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """Returns the process-wide job runner, started on first use."""
+    global _runner
+    if _runner is None:
+        with _lock:
+            if _runner is None:
+                from .worker import process_job
+
+                _runner = JobRunner(process_job)
+                _runner.start()
+    return _runner
@@ -1,6 +1,11 @@
 # src/retrieval_service/main.py
 
-from flask import Blueprint
+from flask import Blueprint, jsonify
+
+from .db import get_datastore
+from .embeddings import get_query_cache
+from .metrics import metrics_response
+from .search_cache import get_search_cache
 
 # This file now only defines a blueprint for the main routes.
 main_bp = Blueprint("main_bp", __name__)
@@ -8,4 +13,22 @@ main_bp = Blueprint("main_bp", __name__)
 @main_bp.route("/")
 def index():
     """Health check endpoint."""
-    return "Retrieval service is running."
\ No newline at end of file
+    return "Retrieval service is running."
+
+@main_bp.route("/stats")
+def stats():
+    """Per-process runtime statistics, used to size pools across instances."""
+    search_cache = get_search_cache()
+    datastore = get_datastore()
+    space = datastore.active_embedding_space()
+    return jsonify({
+        "pool": datastore.pool_status(),
+        "embedding_space": space.name,
+        "query_embedding_cache": get_query_cache(space.model).stats(),
+        "search_cache": search_cache.stats() if search_cache else None,
+    })
+
+@main_bp.route("/metrics")
+def metrics():
+    """Prometheus metrics: request and stage latency histograms, pool gauges, ingestion counters."""
+    return metrics_response()
@@ -0,0 +1,133 @@
+# src/retrieval_service/metrics.py
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Incoming X-Trace-Id is echoed back and attached to every stage; requests
+# without one get a fresh id.
+TRACE_HEADER = "X-Trace-Id"
+_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Stage latencies are mostly milliseconds; the upper buckets catch embedding
+# retries and cold pool connections.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_SECONDS = Histogram(
+    "retrieval_request_seconds", "Request latency by endpoint.",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "retrieval_stage_seconds", "Latency of one stage of request or job handling.",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+INGESTED_CHUNKS = Counter("retrieval_ingested_chunks_total", "Chunks written to the corpus.", ["path"])
+INGEST_JOBS = Counter("retrieval_ingest_jobs_total", "Finished background ingestion jobs.", ["status"])
+DUPLICATE_DOCUMENTS = Counter(
+    "retrieval_duplicate_documents_total", "Ingested documents linked to an existing one.", ["kind"]
+)
+
+
+class PoolCollector:
+    """Reports the datastore's pool_status() as gauges at scrape time."""
+    def describe(self):
+        # Without this the registry would call collect(), and so create the
+        # datastore, as soon as the collector is registered.
+        return []
+
+    def collect(self):
+        from .db import get_datastore
+
+        for key, value in get_datastore().pool_status().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield GaugeMetricFamily(f"retrieval_datastore_{key}", f"Datastore pool_status()['{key}'].", value=value)
+
+
+# Under a multi-process server set PROMETHEUS_MULTIPROC_DIR, so /metrics
+# aggregates every worker's histograms. Pool gauges are per process and are
+# only exported in single-process mode.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+if not MULTIPROCESS:
+    REGISTRY.register(PoolCollector())
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = 0.0
+
+    @property
+    def ms(self) -> float:
+        return round(self.seconds * 1000, 2)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Times the enclosed block into retrieval_stage_seconds and, inside a
+    request, into its Server-Timing header. Yields a StageTimer whose
+    seconds/ms are set when the block exits.
+    """
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(timer.seconds)
+        if has_request_context():
+            g.setdefault("server_timing", []).append((name, timer.seconds))
+
+
+def trace_id() -> str | None:
+    return g.get("trace_id") if has_request_context() else None
+
+
+def _before_request():
+    incoming = request.headers.get(TRACE_HEADER, "")
+    g.trace_id = incoming if _TRACE_ID.match(incoming) else uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if endpoint != "/metrics":
+        REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(elapsed)
+    timings = g.get("server_timing", [])
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in [*timings, ("total", elapsed)]
+    )
+    response.headers[TRACE_HEADER] = g.trace_id
+    return response
+
+
+def init_app(app):
+    """Times every request and tags its response with Server-Timing and the trace id."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+def metrics_response() -> Response:
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,9 @@
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import (
+    BigInteger, Boolean, CheckConstraint, Column, Computed, DateTime, Float, ForeignKey, Identity, Index,
+    Integer, LargeBinary, SmallInteger, String, Text, UniqueConstraint, func, text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from pgvector.sqlalchemy import Vector
 
 # This defines the base class that all database models inherit from.
@@ -8,18 +12,128 @@ Base = declarative_base()
 
 class Document(Base):
     """
-    SQLAlchemy model for the 'documents' table.
+    SQLAlchemy model for the 'documents' table: one row per source file,
+    holding the metadata shared by all of its chunks.
     """
     __tablename__ = "documents"
 
-    id = Column(Integer, primary_key=True)
-    source = Column(String(255), nullable=False)
+    id = Column(BigInteger, Identity(), primary_key=True)
+    source = Column(String(255), nullable=False, unique=True)
     title = Column(Text, nullable=True)
     authors = Column(Text, nullable=True)
     publication_date = Column(String(50), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Set on exact or near duplicates of another document, which keep no
+    # chunks of their own. See ingestion/dedup.py.
+    canonical_id = Column(BigInteger, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    content_sha256 = Column(String(64), nullable=True, index=True)
+    minhash = Column(LargeBinary, nullable=True)
+
+    chunks = relationship("Chunk", back_populates="document", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<Document(id={self.id}, title='{self.title}', source='{self.source}')>"
+
+class Chunk(Base):
+    """
+    SQLAlchemy model for the 'chunks' table: the searchable text and
+    embedding of one piece of a document.
+    """
+    __tablename__ = "chunks"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    document_id = Column(
+        BigInteger, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     content = Column(Text, nullable=False)
-    # The 'embedding' column must match the dimensions of your vectors.
+    # The base embedding space: the model that wrote it is registered in
+    # embedding_spaces, and vectors of other models live in shadow tables.
     embedding = Column(Vector(768), nullable=False)
+    # Full-text vector for hybrid search, maintained by PostgreSQL.
+    content_tsv = Column(TSVECTOR, Computed("to_tsvector('simple', content)", persisted=True))
+    # Deployments with VECTOR_STORAGE_MODE=halfvec or bit also have a
+    # trigger-maintained embedding_half or embedding_bit column (see the
+    # compact vector storage migration); it is never written directly.
+
+    document = relationship("Document", back_populates="chunks")
 
     def __repr__(self):
-        return f"<Document(id={self.id}, title='{self.title}', source='{self.source}')>"
\ No newline at end of file
+        return f"<Chunk(id={self.id}, document_id={self.document_id})>"
+
+class DocumentMinhashBand(Base):
+    """
+    SQLAlchemy model for the 'document_minhash_bands' table: the LSH band
+    hashes of canonical documents, used to find near-duplicate candidates.
+    """
+    __tablename__ = "document_minhash_bands"
+
+    band = Column(SmallInteger, primary_key=True)
+    hash = Column(BigInteger, primary_key=True)
+    document_id = Column(
+        BigInteger, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+class IngestionJob(Base):
+    """
+    SQLAlchemy model for the 'ingestion_jobs' table: one row per file to
+    ingest, claimed and advanced by the ingestion workers (see jobs.py).
+    """
+    __tablename__ = "ingestion_jobs"
+    __table_args__ = (
+        UniqueConstraint("source_uri", "generation", name="ingestion_jobs_source_generation_key"),
+    )
+
+    id = Column(String(32), primary_key=True)
+    source_uri = Column(Text, nullable=False)
+    generation = Column(Text, nullable=False)
+    filename = Column(Text, nullable=False)
+    extractor = Column(String(32), nullable=False)
+    host = Column(Text, nullable=True)
+    # queued -> extracting -> embedding -> stored | failed
+    status = Column(String(16), nullable=False, server_default="queued")
+    chunks = Column(Integer, nullable=False, server_default="0")
+    error = Column(Text, nullable=True)
+    duplicate_of = Column(Text, nullable=True)
+    trace_id = Column(String(64), nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class EmbeddingSpace(Base):
+    """
+    SQLAlchemy model for the 'embedding_spaces' table: one row per embedding
+    model the corpus has been embedded with. Each space other than the base
+    one (chunks.embedding) keeps its vectors in a chunk_embeddings_<id>
+    table created by the backfill job (see embedding_spaces.py).
+    """
+    __tablename__ = "embedding_spaces"
+    __table_args__ = (
+        Index("ix_embedding_spaces_active", "active", unique=True, postgresql_where=text("active")),
+    )
+
+    id = Column(Integer, Identity(), primary_key=True)
+    name = Column(String(64), nullable=False, unique=True)
+    model = Column(Text, nullable=False)
+    dimensions = Column(Integer, nullable=False)
+    table_name = Column(String(63), nullable=True, unique=True)
+    # backfilling -> indexing -> ready -> retired
+    status = Column(String(16), nullable=False, server_default="backfilling")
+    active = Column(Boolean, nullable=False, server_default=text("false"))
+    backfill_cursor = Column(BigInteger, nullable=False, server_default="0")
+    rows_embedded = Column(BigInteger, nullable=False, server_default="0")
+    embed_seconds = Column(Float(precision=53), nullable=False, server_default="0")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    ready_at = Column(DateTime(timezone=True), nullable=True)
+
+class CorpusState(Base):
+    """
+    Single-row table whose version is bumped on every write to the corpus.
+    """
+    __tablename__ = "corpus_state"
+    __table_args__ = (CheckConstraint("id = 1", name="corpus_state_single_row"),)
+
+    id = Column(Integer, primary_key=True, server_default="1")
+    version = Column(BigInteger, nullable=False, server_default="0")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,102 @@
+# src/retrieval_service/responses.py
+import datetime
+import decimal
+import gzip
+import json
+import os
+
+from flask import request
+from flask.json.provider import JSONProvider
+
+from .metrics import stage
+
+try:
+    import orjson
+except ImportError:  # stdlib json, several times slower on large result lists
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# JSON bodies of at least this many bytes are compressed when the client
+# accepts br or gzip; smaller ones cost more CPU than they save on the wire.
+COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+# Brotli quality 4-5 compresses JSON better than gzip -6 at similar speed.
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "4"))
+COMPRESSIBLE_MIMETYPES = {"application/json"}
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    # numpy scalars and arrays, e.g. distances from the memory provider.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed: jsonify,
+    dict returns and request.get_json() all go through it.
+    """
+    def dumps(self, obj, **kwargs) -> str:
+        return self.dump_bytes(obj).decode()
+
+    def dump_bytes(self, obj) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj), mimetype="application/json")
+
+
+def _encoding() -> str | None:
+    """The best content coding the client accepts: br, then gzip."""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(response):
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _encoding()
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_BYTES:
+        return response
+    with stage("compress"):
+        data = response.get_data()
+        if encoding == "br":
+            data = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    """Serializes JSON with FastJSONProvider and compresses JSON responses."""
+    app.json = FastJSONProvider(app)
+    app.after_request(_compress)
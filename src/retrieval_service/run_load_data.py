@@ -1,41 +1,119 @@
-import pandas as pd
-import requests
-import os
+import base64
+import csv
 import json
+import os
+import sys
+import time
+
+import requests
+
+from ingestion.artifacts import is_artifact, iter_records
 
 # --- You will need to set these environment variables ---
 BACKEND_URL = os.environ.get("BACKEND_URL")
 ID_TOKEN = os.environ.get("ID_TOKEN")
 
-CSV_PATH = "./data/processed_patents.csv"
+# An artifact directory written by run_process_*.py, or a legacy processed CSV.
+DATA_PATH = "./data/processed_patents"
+if not os.path.isdir(DATA_PATH):
+    DATA_PATH = "./data/processed_patents.csv"
+BATCH_SIZE = int(os.environ.get("LOAD_BATCH_SIZE", "500"))
+MAX_RETRIES = int(os.environ.get("LOAD_MAX_RETRIES", "5"))
 
-def run_load():
-    if not all([BACKEND_URL, ID_TOKEN]):
-        print("Error: Please set BACKEND_URL and ID_TOKEN environment variables.")
+METADATA_COLUMNS = ["source_filename", "title", "authors", "publication_date", "content"]
+
+def iter_ndjson(path: str, skip_lines: int = 0):
+    """
+    Streams processed chunks as NDJSON lines, one chunk per line, without
+    loading the file into memory. Lines 1..skip_lines are skipped so a load
+    can resume after the last batch the server acknowledged.
+    """
+    if is_artifact(path):
+        yield from _iter_artifact_ndjson(path, skip_lines)
         return
+    # Chunk contents can be larger than the csv module's default field limit.
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline="", encoding="utf-8") as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=1):
+            if line_no <= skip_lines or not row.get("embedding"):
+                continue
+            # Empty metadata fields are missing values, stored as NULL.
+            metadata = {
+                column: row.get(column) if column == "content" else row.get(column) or None
+                for column in METADATA_COLUMNS
+            }
+            # Number records by CSV row so acknowledgements map back to the file.
+            metadata["line"] = line_no
+            # The embedding column already holds a JSON list; splice it in as-is
+            # instead of parsing 768 floats only to serialize them again.
+            line = json.dumps(metadata)[:-1] + ', "embedding": ' + row["embedding"] + "}\n"
+            yield line.encode("utf-8")
 
-    print(f"Reading data from {CSV_PATH}...")
-    df = pd.read_csv(CSV_PATH)
+def _iter_artifact_ndjson(path: str, skip_lines: int):
+    # Embeddings are memory-mapped float32 rows; ship them as base64 bytes.
+    for line_no, record in enumerate(iter_records(path), start=1):
+        if line_no <= skip_lines:
+            continue
+        embedding = record.pop("embedding").astype("<f4").tobytes()
+        record["embedding_b64"] = base64.b64encode(embedding).decode("ascii")
+        record["line"] = line_no
+        yield (json.dumps(record) + "\n").encode("utf-8")
 
-    # The 'embedding' column is a string, convert it back to a list of floats
-    df['embedding'] = df['embedding'].apply(lambda x: json.loads(x))
+def load_from(path: str, progress: dict, headers: dict):
+    """
+    Sends one streaming load request, recording the last acknowledged row
+    in progress["last_line"]. Raises on a transport error, a batch the
+    server reported as failed, or a response that ends before the final
+    "done" acknowledgement.
+    """
+    response = requests.post(
+        f"{BACKEND_URL}/documents/load",
+        params={"batch_size": BATCH_SIZE},
+        data=iter_ndjson(path, progress["last_line"]),
+        headers=headers,
+        stream=True,
+    )
+    response.raise_for_status()
+    for raw in response.iter_lines():
+        if not raw:
+            continue
+        ack = json.loads(raw)
+        if "error" in ack:
+            raise RuntimeError(f"{ack['error']} (resume after line {progress['last_line']})")
+        if ack.get("done"):
+            print(f"Done: {ack['rows']} chunks in {ack['batches']} batches.")
+            return
+        progress["last_line"] = ack["last_line"]
+        print(f"  batch {ack['batch']}: lines {ack['first_line']}-{ack['last_line']} stored")
+    # A crashed server or a proxy timeout can end the stream cleanly mid-load.
+    raise RuntimeError(f"response ended before the load finished (resume after line {progress['last_line']})")
 
-    chunks = df.to_dict('records')
+def run_load(path: str = DATA_PATH, skip_lines: int = 0):
+    if not all([BACKEND_URL, ID_TOKEN]):
+        print("Error: Please set BACKEND_URL and ID_TOKEN environment variables.")
+        return
 
     headers = {
         "Authorization": f"Bearer {ID_TOKEN}",
-        "Content-Type": "application/json"
+        "Content-Type": "application/x-ndjson",
     }
 
-    print(f"Loading {len(chunks)} chunks to {BACKEND_URL}/documents/load...")
-    response = requests.post(f"{BACKEND_URL}/documents/load", json=chunks, headers=headers)
-
-    if response.status_code == 200:
-        print("Success!")
-        print(response.json())
-    else:
-        print(f"Error: {response.status_code}")
-        print(response.text)
+    print(f"Streaming {path} to {BACKEND_URL}/documents/load in batches of {BATCH_SIZE}...")
+    progress = {"last_line": skip_lines}
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            load_from(path, progress, headers)
+            print("Success!")
+            return
+        except (requests.RequestException, RuntimeError) as e:
+            # Acknowledged batches are committed, so only the rest is re-sent.
+            print(f"Error: {e}")
+            if attempt == MAX_RETRIES:
+                print(f"Giving up. Re-run with: python run_load_data.py {path} {progress['last_line']}")
+                return
+            time.sleep(2 ** attempt)
 
 if __name__ == "__main__":
-    run_load()
\ No newline at end of file
+    path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    skip = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    run_load(path, skip)
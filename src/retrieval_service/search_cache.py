@@ -0,0 +1,201 @@
+# src/retrieval_service/search_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .embeddings import normalize_query
+
+SEARCH_CACHE_BACKEND = os.environ.get("SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "1024"))
+# Entries for old corpus versions are unreachable; in the shared backend they
+# simply age out after this long.
+SEARCH_CACHE_REDIS_TTL = int(os.environ.get("SEARCH_CACHE_REDIS_TTL", "86400"))
+# Maximum cosine distance between two query vectors for the second query to
+# be served the first one's results. Unset disables near-duplicate matching.
+NEAR_DUPLICATE_DISTANCE = os.environ.get("SEARCH_CACHE_NEAR_DUPLICATE_DISTANCE")
+NEAR_DUPLICATE_MAX_VECTORS = int(os.environ.get("SEARCH_CACHE_NEAR_DUPLICATE_MAX_VECTORS", "512"))
+
+
+class LRUBackend:
+    """In-process LRU store, private to one worker."""
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: list[dict]):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared store (e.g. Memorystore) visible to every Cloud Run instance."""
+    def __init__(self, url: str, ttl_seconds: int = SEARCH_CACHE_REDIS_TTL, prefix: str = "sara:search:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SEARCH_CACHE_BACKEND=redis requires the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: list[dict]):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl_seconds)
+
+    def size(self) -> int:
+        return -1
+
+
+class SearchResultCache:
+    """
+    Caches search results under (query, top_k, filters, corpus version).
+
+    The corpus version comes from the datastore and is bumped on every
+    upload or load, so results computed against an older corpus are never
+    served again and no TTL has to be tuned.
+
+    With near_duplicate_distance set, a query whose embedding lies within
+    that cosine distance of a recently cached query (same version, top_k and
+    filters) is served that query's results.
+    """
+    def __init__(
+        self,
+        backend,
+        near_duplicate_distance: float | None = None,
+        near_duplicate_max_vectors: int = NEAR_DUPLICATE_MAX_VECTORS,
+    ):
+        self.backend = backend
+        self.near_duplicate_distance = near_duplicate_distance
+        self.near_duplicate_max_vectors = near_duplicate_max_vectors
+        self._lock = threading.Lock()
+        # (version, params key) -> OrderedDict of result key -> unit vector
+        self._vectors: dict = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _params_key(top_k: int, filters: dict | None, version: int) -> str:
+        return json.dumps([version, top_k, filters or {}], sort_keys=True, separators=(",", ":"))
+
+    def key(self, query: str, top_k: int, filters: dict | None, version: int) -> str:
+        raw = self._params_key(top_k, filters, version) + "\x00" + normalize_query(query)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, top_k: int, filters: dict | None, version: int):
+        """Exact lookup; callable before the query has been embedded."""
+        results = self.backend.get(self.key(query, top_k, filters, version))
+        if results is not None:
+            with self._lock:
+                self.hits += 1
+        return results
+
+    def get_near(self, query_embedding: list[float], top_k: int, filters: dict | None, version: int):
+        """Near-duplicate lookup by cosine distance; None when disabled or no match."""
+        if self.near_duplicate_distance is None:
+            self.count_miss()
+            return None
+        params = self._params_key(top_k, filters, version)
+        with self._lock:
+            candidates = self._vectors.get(params)
+            if not candidates:
+                self.misses += 1
+                return None
+            keys = list(candidates.keys())
+            matrix = np.stack(list(candidates.values()))
+        query = _unit(query_embedding)
+        distances = 1.0 - matrix @ query
+        best = int(np.argmin(distances))
+        if distances[best] > self.near_duplicate_distance:
+            self.count_miss()
+            return None
+        results = self.backend.get(keys[best])
+        if results is None:
+            self.count_miss()
+            return None
+        with self._lock:
+            self.near_hits += 1
+        return results
+
+    def put(self, query: str, top_k: int, filters: dict | None, version: int,
+            results: list[dict], query_embedding: list[float] | None = None):
+        key = self.key(query, top_k, filters, version)
+        self.backend.set(key, results)
+        if self.near_duplicate_distance is None or query_embedding is None:
+            return
+        params = self._params_key(top_k, filters, version)
+        with self._lock:
+            # Vectors for older corpus versions can never match again.
+            for stale in [p for p in self._vectors if not p.startswith(f"[{version},")]:
+                del self._vectors[stale]
+            vectors = self._vectors.setdefault(params, OrderedDict())
+            vectors[key] = _unit(query_embedding)
+            while len(vectors) > self.near_duplicate_max_vectors:
+                vectors.popitem(last=False)
+
+    def count_miss(self):
+        """Records a lookup that ends in a search without going through get_near."""
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "size": self.backend.size(),
+                "hits": self.hits,
+                "near_duplicate_hits": self.near_hits,
+                "misses": self.misses,
+                "near_duplicate_distance": self.near_duplicate_distance,
+            }
+
+
+def _unit(vector) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache() -> SearchResultCache | None:
+    """Returns the process-wide search cache, or None when caching is off."""
+    global _search_cache
+    if SEARCH_CACHE_BACKEND == "none":
+        return None
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                if SEARCH_CACHE_BACKEND == "redis":
+                    backend = RedisBackend(os.environ["REDIS_URL"])
+                elif SEARCH_CACHE_BACKEND == "memory":
+                    backend = LRUBackend()
+                else:
+                    raise ValueError(f"Unsupported search cache backend: {SEARCH_CACHE_BACKEND}")
+                _search_cache = SearchResultCache(
+                    backend,
+                    near_duplicate_distance=float(NEAR_DUPLICATE_DISTANCE) if NEAR_DUPLICATE_DISTANCE else None,
+                )
+    return _search_cache
@@ -0,0 +1,291 @@
+# src/retrieval_service/worker.py
+"""
+Background ingestion worker.
+
+Polls a bucket, or a local directory standing in for one, and ingests every
+new PDF through the ingestion_jobs queue on a bounded pool of threads. Run
+from src/ with the service's datastore settings:
+
+    INGEST_WATCH=gs://my-bucket/incoming python -m retrieval_service.worker
+    python -m retrieval_service.worker --watch ./data/inbox --once
+
+With Pub/Sub notifications on the bucket pushed to the service's
+/ingestion/notifications endpoint, run it without a watch location: it then
+only works through the jobs the notifications queue. STORAGE_EMULATOR_HOST
+points the GCS client at a fake-GCS server.
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import pathlib
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from typing import NamedTuple
+from urllib.parse import unquote, urlparse
+
+from google.cloud import storage
+from werkzeug.utils import secure_filename
+
+from .datastore.providers.cloudsql_postgres import document_row
+from .db import get_datastore
+from .embeddings import get_embedding_client
+from .ingestion.dedup import find_duplicate, fingerprint_chunks
+from .ingestion.extractors import get_extractor
+from .ingestion.pipeline import embed_chunks, extract_pdf
+from .jobs import INGEST_WORKERS, JobRunner
+from .metrics import DUPLICATE_DOCUMENTS, INGESTED_CHUNKS, stage
+
+logger = logging.getLogger(__name__)
+
+# Uploaded and downloaded files wait here until their ingestion job has run.
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "uploads"))
+# gs://bucket/prefix or a local directory to poll for new PDFs.
+INGEST_WATCH = os.environ.get("INGEST_WATCH", "")
+INGEST_POLL_SECONDS = float(os.environ.get("INGEST_POLL_SECONDS", "30"))
+INGEST_EXTRACTOR = os.environ.get("INGEST_EXTRACTOR", "papers")
+# Local files modified more recently than this may still be being copied in.
+INGEST_SETTLE_SECONDS = float(os.environ.get("INGEST_SETTLE_SECONDS", "5"))
+
+
+def gcs_uri(bucket: str, name: str) -> str:
+    return f"gs://{bucket}/{name}"
+
+def file_uri(path: str) -> str:
+    return pathlib.Path(os.path.abspath(path)).as_uri()
+
+def local_path(uri: str) -> str:
+    return unquote(urlparse(uri).path)
+
+def staging_path(filename: str) -> str:
+    # One directory per file keeps the original name, which becomes the
+    # chunks' source, without collisions.
+    directory = os.path.join(UPLOAD_DIR, uuid.uuid4().hex)
+    os.makedirs(directory)
+    return os.path.join(directory, secure_filename(os.path.basename(filename)) or "upload.pdf")
+
+def _is_staged(path: str) -> bool:
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(UPLOAD_DIR)]) == os.path.abspath(UPLOAD_DIR)
+
+
+def ingest_file(path: str, extractor_name: str, progress=None) -> dict:
+    """
+    Extracts one file and, unless it duplicates a stored document, embeds
+    and stores it. Returns {"chunks": n} or {"chunks": 0, "duplicate_of":
+    source}.
+    """
+    with stage("ingest_extract"):
+        chunks = extract_pdf(path, extractor_name)
+    if not chunks:
+        return {"chunks": 0}
+    datastore = get_datastore()
+    document = document_row(chunks[0])
+    fp = fingerprint_chunks(chunks)
+    if fp is not None:
+        with stage("ingest_dedup"):
+            match = find_duplicate(datastore, document["source"], fp)
+        if match is not None:
+            canonical, kind, _ = match
+            datastore.link_duplicate_document(document, canonical["id"], fp.content_sha256, fp.minhash_bytes())
+            DUPLICATE_DOCUMENTS.labels(kind).inc()
+            return {"chunks": 0, "duplicate_of": canonical["source"]}
+    if progress is not None:
+        progress("embedding")
+    with stage("ingest_embed"):
+        embed_chunks(chunks, get_embedding_client())
+    with stage("ingest_write"):
+        datastore.add_documents(chunks)
+        if fp is not None:
+            datastore.save_document_fingerprint(
+                document["source"], fp.content_sha256, fp.minhash_bytes(), fp.band_hashes()
+            )
+    INGESTED_CHUNKS.labels("job").inc(len(chunks))
+    return {"chunks": len(chunks)}
+
+
+def process_job(job, progress) -> dict:
+    """
+    JobRunner body: fetches job.source_uri (gs:// or file://) and ingests
+    it. Staged copies are deleted afterwards; watched local files are not.
+    """
+    if job.source_uri.startswith("gs://"):
+        bucket_name, _, name = job.source_uri[len("gs://"):].partition("/")
+        # Fetch exactly the notified version; a later upload has its own job.
+        generation = int(job.generation) if job.generation and job.generation.isdigit() else None
+        path = staging_path(name)
+        try:
+            with stage("ingest_download"):
+                storage.Client().bucket(bucket_name).blob(name, generation=generation).download_to_filename(path)
+            return ingest_file(path, job.extractor, progress)
+        finally:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    path = local_path(job.source_uri)
+    try:
+        return ingest_file(path, job.extractor, progress)
+    finally:
+        if _is_staged(path):
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+class StoredObject(NamedTuple):
+    uri: str
+    name: str
+    # Changes whenever the object is rewritten.
+    generation: str
+
+
+class LocalDirectorySource:
+    """PDFs under a local directory, standing in for a bucket."""
+    # Only workers on this machine can read the files.
+    local = True
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def __str__(self):
+        return self.root
+
+    def list_objects(self):
+        settled = time.time() - INGEST_SETTLE_SECONDS
+        for directory, _, filenames in os.walk(self.root):
+            for filename in sorted(filenames):
+                if not filename.lower().endswith(".pdf"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > settled:
+                    continue
+                yield StoredObject(
+                    file_uri(path), os.path.relpath(path, self.root), f"{stat.st_size}-{stat.st_mtime_ns}"
+                )
+
+
+class GCSSource:
+    """PDFs in a GCS bucket, optionally under a prefix."""
+    local = False
+
+    def __init__(self, bucket: str, prefix: str = ""):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def __str__(self):
+        return gcs_uri(self.bucket, self.prefix)
+
+    def list_objects(self):
+        for blob in storage.Client().list_blobs(self.bucket, prefix=self.prefix or None):
+            if blob.name.lower().endswith(".pdf"):
+                yield StoredObject(gcs_uri(self.bucket, blob.name), blob.name, str(blob.generation))
+
+
+def object_source(location: str):
+    """gs://bucket[/prefix], file:///path or a plain directory path."""
+    if location.startswith("gs://"):
+        bucket, _, prefix = location[len("gs://"):].partition("/")
+        return GCSSource(bucket, prefix)
+    if location.startswith("file://"):
+        location = local_path(location)
+    return LocalDirectorySource(location)
+
+
+class Poller:
+    """Queues a job for every object generation in a source not seen before."""
+    def __init__(self, source, runner: JobRunner, extractor: str = INGEST_EXTRACTOR):
+        self.source = source
+        self.runner = runner
+        self.extractor = extractor
+        # Generations already queued by this or an earlier poll (the table's
+        # unique key catches the rest), so a poll only writes new objects.
+        self._seen = set()
+
+    def poll(self) -> int:
+        queued = 0
+        for obj in self.source.list_objects():
+            if (obj.uri, obj.generation) in self._seen:
+                continue
+            _, created = self.runner.submit(
+                obj.uri, os.path.basename(obj.name), self.extractor,
+                generation=obj.generation, local=self.source.local,
+            )
+            self._seen.add((obj.uri, obj.generation))
+            queued += created
+        return queued
+
+
+def parse_notification(payload: dict) -> tuple[str, str, str | None] | None:
+    """
+    Reads (bucket, object name, generation) from a Cloud Storage
+    OBJECT_FINALIZE notification: a Pub/Sub push envelope, or a bare object
+    resource as sent by Eventarc (or curl, locally). None for other events.
+    """
+    message = payload.get("message")
+    if message is not None:
+        attributes = message.get("attributes") or {}
+        if attributes.get("eventType", "OBJECT_FINALIZE") != "OBJECT_FINALIZE":
+            return None
+        resource = {
+            "bucket": attributes.get("bucketId"),
+            "name": attributes.get("objectId"),
+            "generation": attributes.get("objectGeneration"),
+        }
+        if not (resource["bucket"] and resource["name"]) and message.get("data"):
+            resource = json.loads(base64.b64decode(message["data"]))
+    else:
+        resource = payload
+    if not resource.get("bucket") or not resource.get("name"):
+        return None
+    generation = resource.get("generation")
+    return resource["bucket"], resource["name"], str(generation) if generation is not None else None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m retrieval_service.worker", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--watch", default=INGEST_WATCH, help="gs://bucket/prefix or directory to poll")
+    parser.add_argument("--interval", type=float, default=INGEST_POLL_SECONDS, help="seconds between polls")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--extractor", default=INGEST_EXTRACTOR)
+    parser.add_argument("--once", action="store_true", help="poll once, run every queued job, then exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(threadName)s %(message)s")
+    get_extractor(args.extractor)  # raises ValueError for unknown names
+    runner = JobRunner(process_job, workers=args.workers)
+    poller = Poller(object_source(args.watch), runner, args.extractor) if args.watch else None
+
+    if args.once:
+        if poller is not None:
+            logger.info("Queued %d new objects from %s", poller.poll(), poller.source)
+        runner.drain()
+        logger.info("Jobs by status: %s", runner.counts())
+        return
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    runner.start()
+    logger.info("Ingestion worker started: %d threads, watching %s", args.workers, poller.source if poller else "nothing")
+    while not stopping.is_set():
+        if poller is not None:
+            try:
+                queued = poller.poll()
+                if queued:
+                    logger.info("Queued %d new objects from %s", queued, poller.source)
+            except Exception:
+                logger.exception("Polling %s failed", poller.source)
+        stopping.wait(args.interval)
+    logger.info("Stopping; running jobs get %ss to finish", args.interval)
+    runner.shutdown(timeout=args.interval)
+
+
+if __name__ == "__main__":
+    main()
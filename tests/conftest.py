@@ -0,0 +1,160 @@
+# tests/conftest.py
+import importlib.util
+import os
+import uuid
+from pathlib import Path
+
+# Module-level settings are read at import time, so the offline backends are
+# selected before anything from the services is imported.
+os.environ.setdefault("DATASTORE_KIND", "memory-numpy")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("SEARCH_CACHE_BACKEND", "none")
+
+import numpy as np
+import pytest
+import sqlalchemy as sa
+
+from retrieval_service import create_app, db
+
+DIMENSIONS = 768
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "src" / "retrieval_service" / "alembic" / "versions"
+
+
+def unit_vectors(count: int, seed: int = 0) -> np.ndarray:
+    """count random unit vectors of the service's embedding dimensions."""
+    vectors = np.random.default_rng(seed).normal(size=(count, DIMENSIONS))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_chunks(count: int, seed: int = 0, embeddings=None) -> list[dict]:
+    """Chunks of count one-chunk documents with random or given embeddings."""
+    embeddings = unit_vectors(count, seed) if embeddings is None else embeddings
+    return [
+        {
+            "source": f"doc-{i}.pdf",
+            "title": f"Document {i}",
+            "authors": "A. Author",
+            "publication_date": "2024-01-01",
+            "content": f"chunk number {i} about topic {i % 5}",
+            "embedding": list(map(float, embedding)),
+        }
+        for i, embedding in enumerate(embeddings)
+    ]
+
+
+def write_pdf(path, pages: list[str], title: str | None = None):
+    """Writes a PDF with one page per text, and the given title metadata."""
+    import fitz  # PyMuPDF
+
+    with fitz.open() as doc:
+        for text in pages:
+            doc.new_page().insert_textbox(fitz.Rect(36, 36, 560, 800), text, fontsize=9)
+        if title:
+            doc.set_metadata({"title": title, "author": "A. Author"})
+        doc.save(str(path))
+
+
+def page_text(topic: str, lines: int = 12) -> str:
+    """A page of distinct sentences about topic."""
+    return "\n".join(f"Line {i} of the notes on {topic}, measurement {i * 7} of {topic}." for i in range(lines))
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    yield app
+    db.close_datastore()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def datastore(app):
+    return db.get_datastore()
+
+
+def load_migrations() -> dict:
+    """Freshly imported alembic revision modules, by revision id."""
+    migrations = {}
+    for path in sorted(MIGRATIONS_DIR.glob("*.py")):
+        if path.name == "env.py":
+            continue
+        spec = importlib.util.spec_from_file_location(f"migration_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations[module.revision] = module
+    return migrations
+
+
+def run_migrations(engine, migrations: dict, revision: str = "head", start: str | None = None):
+    """
+    Runs the upgrades after start up to revision, one transaction each, as
+    alembic does. "head" is the newest revision of the initial_migration line.
+    """
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+
+    if revision == "head":
+        revised = {module.down_revision for module in migrations.values()}
+        (revision,) = (r for r in migrations if r not in revised and _revises(migrations, r, "initial_migration"))
+    chain = []
+    while revision != start:
+        chain.append(migrations[revision])
+        revision = migrations[revision].down_revision
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        with Operations.context(context):
+            for module in reversed(chain):
+                with context.begin_transaction():
+                    module.upgrade()
+
+
+def _revises(migrations: dict, revision: str | None, ancestor: str) -> bool:
+    while revision is not None and revision != ancestor:
+        revision = migrations[revision].down_revision
+    return revision == ancestor
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    """
+    An engine on an empty schema of the database at DATABASE_URL; tests
+    using it are skipped when that is unset. PGOPTIONS makes the schema the
+    search path of every libpq connection, including the datastore's.
+    """
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        pytest.skip("DATABASE_URL is not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = sa.create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(sa.text(f"CREATE SCHEMA {schema}"))
+    monkeypatch.setenv("PGOPTIONS", f"-c search_path={schema},public")
+    engine = sa.create_engine(url)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(sa.text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+@pytest.fixture
+def postgres_datastore(postgres, monkeypatch):
+    """A CloudSQLPostgresDatastore on the postgres schema, migrated to head."""
+    from retrieval_service.datastore.providers.cloudsql_postgres import CloudSQLPostgresDatastore, Config
+
+    run_migrations(postgres, load_migrations())
+    url = postgres.url
+    monkeypatch.setenv("DB_HOST", url.host or "127.0.0.1")
+    monkeypatch.setenv("DB_PORT", str(url.port or 5432))
+    datastore = CloudSQLPostgresDatastore(
+        Config(kind="cloudsql-postgres", user=url.username, password=url.password, database=url.database)
+    )
+    yield datastore
+    datastore.close()
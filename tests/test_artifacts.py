@@ -0,0 +1,85 @@
+# tests/test_artifacts.py
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from retrieval_service.ingestion.artifacts import (
+    METADATA_COLUMNS,
+    artifact_info,
+    count_artifact_rows,
+    is_artifact,
+    iter_artifact_batches,
+    iter_records,
+    read_artifact,
+    write_artifact,
+)
+
+from .conftest import unit_vectors
+
+
+def _chunks(count: int) -> list[dict]:
+    return [
+        {
+            "source_filename": f"doc-{i % 3}.pdf",
+            "title": f"Document {i % 3}",
+            "authors": None,
+            "publication_date": "2024-01-01",
+            "content": f"chunk {i}",
+        }
+        for i in range(count)
+    ]
+
+
+def test_artifact_round_trip(tmp_path):
+    path = str(tmp_path / "processed")
+    chunks, embeddings = _chunks(7), unit_vectors(7)
+
+    write_artifact(path, chunks, embeddings, model_name="test-model")
+
+    assert is_artifact(path)
+    info = artifact_info(path)
+    assert (info["rows"], info["dimensions"], info["embedding_model"]) == (7, embeddings.shape[1], "test-model")
+    metadata, matrix = read_artifact(path)
+    assert metadata == chunks
+    assert matrix.dtype == np.float32 and isinstance(matrix, np.memmap)
+    np.testing.assert_array_equal(matrix, embeddings)
+    assert [record["content"] for record in iter_records(path)] == [chunk["content"] for chunk in chunks]
+
+
+def test_artifact_batches_filter_by_source(tmp_path):
+    path = str(tmp_path / "processed")
+    chunks, embeddings = _chunks(10), unit_vectors(10)
+    write_artifact(path, chunks, embeddings)
+
+    batches = list(iter_artifact_batches(path, batch_size=4, sources={"doc-1.pdf"}))
+
+    assert all(len(metadata) <= 4 for metadata, _ in batches)
+    metadata = [chunk for batch, _ in batches for chunk in batch]
+    assert [chunk["content"] for chunk in metadata] == ["chunk 1", "chunk 4", "chunk 7"]
+    np.testing.assert_array_equal(np.concatenate([matrix for _, matrix in batches]), embeddings[[1, 4, 7]])
+    assert count_artifact_rows(path) == 10
+    assert count_artifact_rows(path, sources={"doc-1.pdf"}) == 3
+
+
+def test_write_artifact_rejects_mismatched_embeddings(tmp_path):
+    with pytest.raises(ValueError):
+        write_artifact(str(tmp_path / "processed"), _chunks(3), unit_vectors(2))
+
+
+def test_legacy_csv_is_read_as_an_artifact(tmp_path):
+    path = tmp_path / "processed.csv"
+    embeddings = unit_vectors(2)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=METADATA_COLUMNS + ["embedding"])
+        writer.writeheader()
+        for chunk, embedding in zip(_chunks(2), embeddings):
+            writer.writerow({**chunk, "embedding": json.dumps(embedding.tolist())})
+        # Rows without an embedding are skipped.
+        writer.writerow({**_chunks(1)[0], "embedding": ""})
+
+    metadata, matrix = read_artifact(str(path))
+
+    assert [chunk["content"] for chunk in metadata] == ["chunk 0", "chunk 1"]
+    np.testing.assert_allclose(matrix, embeddings, rtol=1e-6)
@@ -0,0 +1,84 @@
+# tests/test_asyncpg_provider.py
+import asyncio
+import re
+import threading
+
+import pytest
+
+from retrieval_service.datastore.providers import asyncpg_postgres
+from retrieval_service.datastore.spaces import EmbeddingSpace
+from retrieval_service.datastore.sync_client import SyncClient
+
+
+class EchoClient:
+    kind = "echo"
+
+    def __init__(self):
+        self.loop_threads = set()
+        self.closed = False
+        self.label = "plain attribute"
+
+    async def echo(self, value, delay=0.0):
+        self.loop_threads.add(threading.current_thread().name)
+        await asyncio.sleep(delay)
+        return value
+
+    async def fail(self):
+        raise ValueError("boom")
+
+    async def close(self):
+        self.closed = True
+
+    def after_fork(self):
+        pass
+
+
+def test_sync_client_runs_coroutines_on_one_loop_thread():
+    client = SyncClient(EchoClient())
+    try:
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(client.echo(i, delay=0.01))) for i in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(results) == list(range(10))
+        assert client.client.loop_threads == {"echo-loop"}
+        assert client.label == "plain attribute"
+    finally:
+        client.close()
+    assert client.client.closed
+
+
+def test_sync_client_raises_the_coroutines_exception():
+    client = SyncClient(EchoClient())
+    try:
+        with pytest.raises(ValueError, match="boom"):
+            client.fail()
+    finally:
+        client.close()
+
+
+def _placeholders(sql: str) -> set[int]:
+    return {int(n) for n in re.findall(r"\$(\d+)", sql)}
+
+
+def _statements():
+    statements = {
+        name: value for name, value in vars(asyncpg_postgres).items()
+        if name.endswith("_SQL") and isinstance(value, str)
+    }
+    shadow = EmbeddingSpace(id=2, name="next", model="m", dimensions=256, table_name="embedding_space_2")
+    for i, sql in enumerate(asyncpg_postgres.search_statements(shadow)):
+        statements[f"shadow_search_{i}"] = sql
+    return statements
+
+
+@pytest.mark.parametrize("name, sql", sorted(_statements().items()))
+def test_asyncpg_placeholders_are_numbered_without_gaps(name, sql):
+    # asyncpg binds arguments by position and rejects unused numbers.
+    used = _placeholders(sql)
+    assert used == set(range(1, len(used) + 1)), name
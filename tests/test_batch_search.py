@@ -0,0 +1,77 @@
+# tests/test_batch_search.py
+import pytest
+
+from retrieval_service.app import routes
+from retrieval_service.app.routes import MAX_BATCH_QUERIES
+from retrieval_service.search_cache import LRUBackend, SearchResultCache
+
+from .conftest import make_chunks
+
+QUERIES = ["topic 1", "topic 3", "chunk number 7"]
+
+
+def _search_calls(datastore, monkeypatch) -> list[int]:
+    """Records the number of embeddings of every batch_search_documents call."""
+    calls = []
+    search = datastore.batch_search_documents
+
+    def spy(embeddings, *args, **kwargs):
+        calls.append(len(embeddings))
+        return search(embeddings, *args, **kwargs)
+
+    monkeypatch.setattr(datastore, "batch_search_documents", spy)
+    return calls
+
+
+def test_batch_matches_single_searches_in_one_statement(client, datastore, monkeypatch):
+    datastore.initialize_data(make_chunks(30))
+    calls = _search_calls(datastore, monkeypatch)
+
+    response = client.post("/documents/search/batch", json={"queries": QUERIES, "top_k": 4})
+
+    assert response.status_code == 200
+    entries = response.get_json()["results"]
+    assert [entry["query"] for entry in entries] == QUERIES
+    assert calls == [len(QUERIES)]
+    for entry in entries:
+        single = client.get("/documents/search", query_string={"query": entry["query"], "top_k": 4}).get_json()
+        assert [hit["id"] for hit in entry["results"]] == [hit["id"] for hit in single]
+        assert not entry["cached"] and "search" in entry["timing_ms"]
+
+
+def test_cached_queries_skip_embedding_and_search(client, datastore, monkeypatch):
+    datastore.initialize_data(make_chunks(30))
+    cache = SearchResultCache(LRUBackend())
+    monkeypatch.setattr(routes, "get_search_cache", lambda: cache)
+    calls = _search_calls(datastore, monkeypatch)
+
+    client.post("/documents/search/batch", json={"queries": QUERIES[:2]})
+    entries = client.post("/documents/search/batch", json={"queries": QUERIES}).get_json()["results"]
+
+    assert [entry["cached"] for entry in entries] == [True, True, False]
+    assert calls == [2, 1]
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"queries": []},
+    {"queries": ["ok", ""]},
+    {"queries": "not a list"},
+    {"queries": ["q"] * (MAX_BATCH_QUERIES + 1)},
+    {"queries": ["q"], "top_k": 0},
+    {"queries": ["q"], "ef_search": "40"},
+    {"queries": ["q"], "probes": True},
+    {"queries": ["q"], "collapse": "false"},
+    {"queries": ["q"], "collapse": 0},
+])
+def test_invalid_batches_are_rejected(client, datastore, body):
+    assert client.post("/documents/search/batch", json=body).status_code == 400
+
+
+def test_batch_collapse_takes_a_json_boolean(client, datastore):
+    datastore.initialize_data(make_chunks(5))
+
+    response = client.post("/documents/search/batch", json={"queries": ["topic 1"], "top_k": 3, "collapse": True})
+
+    assert response.status_code == 200
+    assert len(response.get_json()["results"][0]["results"]) == 3
@@ -0,0 +1,59 @@
+# tests/test_benchmarks.py
+import numpy as np
+
+from retrieval_service.benchmarks import SyntheticCorpus, bench_ingest, bench_search, recall_at_k
+from retrieval_service.benchmarks.runner import chunk_row, latency_summary
+from retrieval_service.datastore.providers.memory_numpy import Config, MemoryNumpyDatastore
+
+
+def test_corpus_batches_are_deterministic_unit_vectors():
+    corpus = SyntheticCorpus(250, dimensions=32, num_topics=8, batch_size=100)
+
+    batches = list(corpus)
+
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+    # Regenerated from the seed alone, by a fresh instance too.
+    again = SyntheticCorpus(250, dimensions=32, num_topics=8, batch_size=100).batch(1)
+    assert [c["content"] for c in again] == [c["content"] for c in batches[1]]
+    np.testing.assert_array_equal([c["embedding"] for c in again], [c["embedding"] for c in batches[1]])
+    np.testing.assert_array_equal(corpus.batch_embeddings(2), np.asarray([c["embedding"] for c in batches[2]]))
+    norms = np.linalg.norm(corpus.batch_embeddings(0), axis=1)
+    np.testing.assert_allclose(norms, 1.0, rtol=1e-5)
+    assert chunk_row(batches[2][0]) == 201
+
+
+def test_exact_neighbours_match_brute_force():
+    corpus = SyntheticCorpus(250, dimensions=32, num_topics=8, batch_size=64)
+    _, queries = corpus.queries(6)
+    matrix = np.concatenate([corpus.batch_embeddings(i) for i in range(corpus.num_batches)])
+
+    exact = corpus.exact_neighbours(queries, 5)
+
+    np.testing.assert_array_equal(exact, np.argsort(-(queries @ matrix.T), axis=1)[:, :5] + 1)
+
+
+def test_exact_search_has_full_recall():
+    corpus = SyntheticCorpus(300, dimensions=32, num_topics=8, batch_size=128)
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy", dimensions=32))
+    texts, queries = corpus.queries(20)
+
+    ingest = bench_ingest(datastore, corpus)
+    summary, results = bench_search(datastore, texts, queries, top_k=10, concurrency=4)
+
+    assert (ingest["chunks"], ingest["batches"]) == (300, 3)
+    assert summary["queries"] == 20 and summary["qps"] > 0
+    recall = recall_at_k(results, corpus.exact_neighbours(queries, 10), 10)
+    assert (recall["mean"], recall["min"]) == (1.0, 1.0)
+
+
+def test_recall_counts_missed_neighbours():
+    found = [[{"content": f"chunk {row} topic0"} for row in (0, 1, 7)]]
+    exact = np.asarray([[1, 2, 3]])
+
+    assert recall_at_k(found, exact, 3) == {"k": 3, "queries": 1, "mean": 0.6667, "min": 0.6667}
+
+
+def test_latency_summary_reports_milliseconds():
+    summary = latency_summary([0.001] * 99 + [0.1])
+    assert summary["p50_ms"] == 1.0
+    assert summary["max_ms"] == 100.0
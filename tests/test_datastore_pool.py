@@ -0,0 +1,68 @@
+# tests/test_datastore_pool.py
+import threading
+
+import pytest
+
+from retrieval_service import db
+from retrieval_service.datastore.providers.cloudsql_postgres import (
+    CloudSQLPostgresDatastore,
+    Config,
+    PoolStats,
+)
+
+
+def test_config_reads_pool_settings_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DATASTORE_KIND", "cloudsql-postgres")
+    for name, value in {"DB_USER": "u", "DB_PASSWORD": "p", "DB_NAME": "d"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("DB_POOL_SIZE", "9")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "2.5")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "off")
+
+    config = db._config_from_env()
+
+    assert (config.pool_size, config.max_overflow, config.pool_timeout) == (9, 0, 2.5)
+    assert config.pool_pre_ping is False
+
+
+def test_engine_pool_is_sized_from_config():
+    datastore = CloudSQLPostgresDatastore(
+        Config(kind="cloudsql-postgres", user="u", password="p", database="d", pool_size=3, max_overflow=1)
+    )
+    try:
+        # Creating the engine opens no connection.
+        status = datastore.pool_status()
+        assert datastore.engine.pool.size() == 3
+        assert (status["pool_size"], status["max_overflow"], status["checked_out"]) == (3, 1, 0)
+        assert status["connections_opened"] == 0
+    finally:
+        datastore.close()
+
+
+def test_pool_stats_snapshot():
+    stats = PoolStats()
+    stats.record_checkout(0.5)
+    stats.record_checkout(0.1)
+    stats.record_timeout()
+    stats.record_connect()
+
+    snapshot = stats.snapshot()
+
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checkout_timeouts"] == 1
+    assert snapshot["connections_opened"] == 1
+    assert snapshot["checkout_wait_seconds_avg"] == pytest.approx(0.3)
+    assert snapshot["checkout_wait_seconds_max"] == pytest.approx(0.5)
+
+
+def test_one_datastore_is_shared_by_every_thread(app):
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(db.get_datastore())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(datastore) for datastore in seen}) == 1
+    assert seen[0] is db.get_datastore()
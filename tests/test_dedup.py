@@ -0,0 +1,92 @@
+# tests/test_dedup.py
+import os
+
+import numpy as np
+
+from retrieval_service import jobs, worker
+from retrieval_service.app import routes
+from retrieval_service.app.routes import collapse_duplicates
+from retrieval_service.embeddings import FakeEmbedder
+from retrieval_service.ingestion.artifacts import read_artifact
+from retrieval_service.ingestion.dedup import DuplicateIndex, fingerprint, minhash_from_bytes
+from retrieval_service.ingestion.manifest import MANIFEST_FILE, IngestionManifest
+from retrieval_service.ingestion.pipeline import run_pipeline
+
+from .conftest import page_text, write_pdf
+
+WORDS = [f"w{i}" for i in range(300)]
+
+
+def test_fingerprint_ignores_case_punctuation_and_layout():
+    a = fingerprint("Solar cells, made of PEROVSKITE.\n\nEfficiency: high")
+    b = fingerprint("solar   cells made of perovskite efficiency high")
+
+    assert a.content_sha256 == b.content_sha256
+    assert a.similarity(b.minhash) == 1.0
+    np.testing.assert_array_equal(minhash_from_bytes(a.minhash_bytes()), a.minhash)
+    assert fingerprint(" ... ") is None
+
+
+def test_index_finds_exact_and_near_duplicates_only():
+    index = DuplicateIndex()
+    index.add("original.pdf", fingerprint(" ".join(WORDS)))
+    edited = WORDS[:150] + ["changed"] + WORDS[151:]
+    unrelated = [f"x{i}" for i in range(300)]
+
+    assert index.find(fingerprint(" ".join(WORDS).upper())) == ("original.pdf", "exact", 1.0)
+    key, kind, similarity = index.find(fingerprint(" ".join(edited)))
+    assert (key, kind) == ("original.pdf", "near") and similarity > 0.9
+    assert index.find(fingerprint(" ".join(unrelated))) is None
+
+
+def test_collapse_keeps_the_best_hit_per_canonical_document():
+    hits = [
+        {"id": 1, "document_id": 1, "canonical_document_id": 1},
+        {"id": 2, "document_id": 2, "canonical_document_id": 1},
+        {"id": 3, "document_id": 1, "canonical_document_id": 1},
+        {"id": 4, "document_id": 3},
+        {"id": 5, "document_id": 4, "canonical_document_id": 4},
+    ]
+    assert [hit["id"] for hit in collapse_duplicates(hits, 2)] == [1, 4]
+    assert [hit["id"] for hit in collapse_duplicates(hits, 5)] == [1, 4, 5]
+
+
+def test_pipeline_skips_a_copy_of_a_file_in_the_same_run(tmp_path):
+    pdfs, artifact = tmp_path / "pdfs", str(tmp_path / "processed")
+    os.makedirs(pdfs)
+    write_pdf(pdfs / "a.pdf", [page_text("rivers")])
+    write_pdf(pdfs / "b-copy.pdf", [page_text("rivers")], title="Renamed")
+
+    run_pipeline(
+        str(pdfs), artifact, "papers", FakeEmbedder(), "fake-embedder",
+        cache_path=str(tmp_path / "cache.sqlite"), workers=1,
+    )
+
+    metadata, _ = read_artifact(artifact)
+    assert {chunk["source_filename"] for chunk in metadata} == {"a.pdf"}
+    manifest = IngestionManifest.load(os.path.join(artifact, MANIFEST_FILE))
+    assert manifest.files["b-copy.pdf"]["duplicate_of"] == "a.pdf"
+
+
+def test_uploaded_duplicates_are_linked_not_stored(client, datastore, monkeypatch, tmp_path):
+    monkeypatch.setattr(worker, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    runner = jobs.JobRunner(worker.process_job, workers=1)
+    monkeypatch.setattr(routes, "get_job_runner", lambda: runner)
+    write_pdf(tmp_path / "a.pdf", [page_text("rivers", 40)])
+    write_pdf(tmp_path / "b.pdf", [page_text("rivers", 40).replace("Line 3 ", "Row 3 ")])
+    submitted = []
+    for name in ("a.pdf", "b.pdf"):
+        with open(tmp_path / name, "rb") as f:
+            submitted.append(client.post("/documents/upload", data={"file": (f, name)}).get_json()["jobs"][0])
+        runner.drain()
+
+    first, second = (client.get(f"/jobs/{job['id']}").get_json() for job in submitted)
+
+    assert first["status"] == "stored" and first["chunks"] > 0
+    assert (second["status"], second["chunks"], second["duplicate_of"]) == ("stored", 0, "a.pdf")
+    documents = {d["source"]: d for d in datastore.list_documents(0, 10)}
+    assert set(documents) == {"a.pdf"}
+    results = client.get(
+        "/documents/search", query_string={"query": "rivers", "top_k": 3, "collapse": "true"}
+    ).get_json()
+    assert [hit["source"] for hit in results] == ["a.pdf"]
@@ -0,0 +1,89 @@
+# tests/test_embedding_client.py
+import threading
+
+import pytest
+
+from retrieval_service.embeddings import BatchingEmbeddingClient, EmbeddingError, FakeEmbedder
+from retrieval_service.embeddings.client import AdaptiveLimiter, estimate_tokens
+
+
+class ResourceExhausted(Exception):
+    """Named like the Vertex AI quota error, which the client retries."""
+
+
+class FlakyEmbedder(FakeEmbedder):
+    """Raises the given errors on the first calls, then embeds normally."""
+    def __init__(self, errors):
+        super().__init__(dimensions=4)
+        self.errors = list(errors)
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        return super().embed_documents(texts)
+
+
+def test_estimate_tokens_counts_utf8_bytes():
+    assert estimate_tokens("abc") == 2
+    assert estimate_tokens("가나다") == 4
+
+
+def test_batches_respect_item_and_token_limits():
+    client = BatchingEmbeddingClient(FakeEmbedder(), max_batch_items=3, max_batch_tokens=10, token_counter=len)
+
+    assert client.pack_batches(["a"] * 7) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert client.pack_batches(["aaaa", "aaaa", "aaaa", "x" * 25, "a"]) == [[0, 1], [2], [3], [4]]
+
+
+def test_embed_documents_keeps_input_order_across_concurrent_batches():
+    embedder = FakeEmbedder(dimensions=4)
+    client = BatchingEmbeddingClient(embedder, max_batch_items=2, max_concurrency=4, initial_concurrency=4)
+    texts = [f"text {i}" for i in range(9)]
+
+    assert client.embed_documents(texts) == embedder.embed_documents(texts)
+    assert client.stats()["requests"] == 5
+    assert client.embed_documents([]) == []
+
+
+def test_rate_limited_batches_are_retried_and_halve_concurrency():
+    embedder = FlakyEmbedder([ResourceExhausted("quota"), ResourceExhausted("quota")])
+    client = BatchingEmbeddingClient(embedder, initial_concurrency=8, max_concurrency=8, base_delay=0.0)
+
+    vectors = client.embed_documents(["a", "b"])
+
+    assert vectors == FakeEmbedder(dimensions=4).embed_documents(["a", "b"])
+    stats = client.stats()
+    assert (stats["retries"], stats["rate_limited"], stats["requests"]) == (2, 2, 1)
+    assert stats["concurrency_limit"] == 2
+
+
+def test_permanent_and_exhausted_failures_raise():
+    client = BatchingEmbeddingClient(FlakyEmbedder([ValueError("bad input")]), base_delay=0.0)
+    with pytest.raises(EmbeddingError):
+        client.embed_documents(["a"])
+    assert client.stats()["retries"] == 0
+
+    client = BatchingEmbeddingClient(FlakyEmbedder([ResourceExhausted("quota")] * 3), max_retries=2, base_delay=0.0)
+    with pytest.raises(EmbeddingError):
+        client.embed_documents(["a"])
+    assert client.stats()["retries"] == 2
+
+
+def test_adaptive_limiter_grows_on_success_and_backs_off_on_latency():
+    limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=3, target_latency=1.0)
+    for _ in range(2):
+        limiter.on_success(0.1)
+    assert limiter.limit == 3
+    for _ in range(10):
+        limiter.on_success(0.1)
+    assert limiter.limit == 3
+    limiter.on_success(5.0)
+    assert limiter.limit == 2
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.limit == 1
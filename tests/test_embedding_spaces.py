@@ -0,0 +1,163 @@
+# tests/test_embedding_spaces.py
+import argparse
+import dataclasses
+import threading
+
+import pytest
+
+from retrieval_service import embedding_spaces
+from retrieval_service.datastore.providers.cloudsql_postgres import NEXT_BACKFILL_CHUNKS_TEMPLATE
+from retrieval_service.datastore.spaces import EmbeddingSpace, check_dimensions, shadow_table_name
+from retrieval_service.embedding_spaces import RateLimiter, activate_command, backfill, finish
+from retrieval_service.embeddings import FakeEmbedder
+
+DIMENSIONS = 8
+
+
+def _space(**changes) -> EmbeddingSpace:
+    return dataclasses.replace(
+        EmbeddingSpace(id=1, name="next", model="next", dimensions=DIMENSIONS, table_name=shadow_table_name(1),
+                       status="backfilling"),
+        **changes,
+    )
+
+
+class FakeDatastore:
+    """Chunks and one shadow space, with the backfill methods of the SQL providers."""
+    def __init__(self, chunk_ids):
+        self.chunks = {chunk_id: f"chunk {chunk_id}" for chunk_id in chunk_ids}
+        self.vectors = {}
+        self.pages = []
+        self.index_built = False
+        # Called with each page's ids after it is stored.
+        self.on_store = lambda ids: None
+
+    def count_missing_chunks(self, space):
+        return len(set(self.chunks) - set(self.vectors))
+
+    def next_backfill_chunks(self, space, after_id, limit):
+        missing = sorted(i for i in self.chunks if i > after_id and i not in self.vectors)
+        return [(i, self.chunks[i]) for i in missing[:limit]]
+
+    def store_space_embeddings(self, space, chunk_ids, embeddings, cursor, seconds):
+        self.pages.append(list(chunk_ids))
+        self.vectors.update(zip(chunk_ids, embeddings))
+        self.on_store(chunk_ids)
+        return dataclasses.replace(
+            space, backfill_cursor=max(space.backfill_cursor, cursor),
+            rows_embedded=space.rows_embedded + len(chunk_ids), embed_seconds=space.embed_seconds + seconds,
+        )
+
+    def set_embedding_space_status(self, space, status):
+        return dataclasses.replace(space, status=status)
+
+    def build_embedding_space_index(self, space):
+        self.index_built = True
+
+
+def test_backfill_embeds_every_missing_chunk_once_in_id_order():
+    datastore = FakeDatastore([1, 2, 3, 5, 8, 9, 10])
+    datastore.vectors[3] = [0.0] * DIMENSIONS
+
+    space = backfill(datastore, _space(), FakeEmbedder(dimensions=DIMENSIONS), batch_size=2, rows_per_second=0)
+
+    assert datastore.pages == [[1, 2], [5, 8], [9, 10]]
+    assert (space.rows_embedded, space.backfill_cursor) == (6, 10)
+    assert datastore.vectors[5] == FakeEmbedder(dimensions=DIMENSIONS).embed_query("chunk 5")
+
+
+def test_chunks_committed_below_the_cursor_are_filled_by_the_next_pass():
+    datastore = FakeDatastore([1, 3, 4, 5])
+
+    def late_commit(ids):
+        # A slow load commits chunk 2 after the backfill has read past it.
+        if ids == [1, 3]:
+            datastore.chunks[2] = "chunk 2"
+
+    datastore.on_store = late_commit
+    embedder = FakeEmbedder(dimensions=DIMENSIONS)
+    space = backfill(datastore, _space(), embedder, batch_size=2, rows_per_second=0)
+    assert datastore.pages == [[1, 3], [4, 5]]
+    assert datastore.count_missing_chunks(space) == 1
+
+    backfill(datastore, space, embedder, batch_size=2, rows_per_second=0)
+
+    assert datastore.pages[-1] == [2]
+    assert datastore.count_missing_chunks(space) == 0
+
+
+def test_backfill_stops_after_the_current_page():
+    datastore = FakeDatastore(range(1, 11))
+    stopping = threading.Event()
+    datastore.on_store = lambda ids: stopping.set()
+
+    space = backfill(datastore, _space(), FakeEmbedder(dimensions=DIMENSIONS), 2, 0, stopping)
+
+    assert datastore.pages[0] == [1, 2] and space.rows_embedded == sum(map(len, datastore.pages))
+    assert space.rows_embedded < 10
+
+
+def test_backfill_refuses_wrong_dimensions_and_unwritable_spaces():
+    datastore = FakeDatastore([1])
+    with pytest.raises(ValueError, match="returned 4-d vectors"):
+        backfill(datastore, _space(), FakeEmbedder(dimensions=4), rows_per_second=0)
+    with pytest.raises(ValueError, match="base space"):
+        backfill(datastore, _space(table_name=None), FakeEmbedder(dimensions=DIMENSIONS))
+    with pytest.raises(ValueError, match="retired"):
+        backfill(datastore, _space(status="retired"), FakeEmbedder(dimensions=DIMENSIONS))
+
+
+def test_finish_indexes_then_marks_the_space_ready():
+    datastore = FakeDatastore([])
+
+    space = finish(datastore, _space())
+
+    assert space.status == "ready" and datastore.index_built
+    datastore.index_built = False
+    assert finish(datastore, space).status == "ready" and not datastore.index_built
+
+
+def test_activation_waits_for_the_backfill_unless_forced():
+    datastore = FakeDatastore([1, 2])
+    activated = []
+    datastore.get_embedding_space = lambda name: _space(status="ready")
+    datastore.activate_embedding_space = lambda space: activated.append(space.name) or 7
+
+    with pytest.raises(SystemExit, match="2 chunks behind"):
+        activate_command(datastore, argparse.Namespace(name="next", force=False))
+    activate_command(datastore, argparse.Namespace(name="next", force=True))
+
+    assert activated == ["next"]
+
+
+def test_rate_limiter_paces_units(monkeypatch):
+    clock = {"now": 100.0, "slept": 0.0}
+
+    def sleep(seconds):
+        clock["slept"] += seconds
+        clock["now"] += seconds
+
+    monkeypatch.setattr(embedding_spaces.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(embedding_spaces.time, "sleep", sleep)
+    limiter = RateLimiter(10)
+
+    for _ in range(3):
+        limiter.wait(5)
+
+    assert clock["slept"] == pytest.approx(1.0)
+    RateLimiter(0).wait(1000)
+    assert clock["slept"] == pytest.approx(1.0)
+
+
+def test_spaces_too_wide_for_vector_indexes_are_stored_as_halfvec():
+    assert _space(dimensions=1536).vector_type == "vector"
+    assert _space(dimensions=3072).vector_type == "halfvec"
+    assert _space().index_name == "ix_chunk_embeddings_1_ann"
+    with pytest.raises(ValueError):
+        check_dimensions(5000)
+
+
+def test_backfill_pages_select_chunks_missing_from_the_space():
+    sql = NEXT_BACKFILL_CHUNKS_TEMPLATE.format(table_name="chunk_embeddings_1", after_id=":after_id", limit=":limit")
+    assert "NOT EXISTS (SELECT 1 FROM chunk_embeddings_1 AS e WHERE e.chunk_id = c.id)" in sql
+    assert "c.id > :after_id" in sql and "ORDER BY c.id" in sql
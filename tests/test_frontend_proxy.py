@@ -0,0 +1,149 @@
+# tests/test_frontend_proxy.py
+import asyncio
+import gzip
+import importlib
+import os
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "frontend_service")
+
+
+def reply(status: int, body: bytes = b"{}", **headers) -> httpx.Response:
+    """A backend response whose body is still unread, as from the network."""
+    return httpx.Response(
+        status, stream=httpx.ByteStream(body), headers={"Content-Type": "application/json", **headers}
+    )
+
+
+@pytest.fixture(scope="module")
+def frontend():
+    # The app mounts static/ relative to the working directory.
+    cwd = os.getcwd()
+    os.chdir(FRONTEND_DIR)
+    try:
+        yield importlib.import_module("frontend_service.app")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def backend(frontend, monkeypatch):
+    """
+    Routes the frontend's backend client to a handler set by the test,
+    recording every request it receives.
+    """
+    monkeypatch.setattr(frontend, "BACKEND_URL", "http://backend")
+    monkeypatch.setattr(frontend, "HTTP_RETRY_BACKOFF", 0.0)
+
+    async def token(audience):
+        return "test-token"
+
+    monkeypatch.setattr(frontend.id_tokens, "get", token)
+    state = {"requests": [], "handler": None}
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        return state["handler"](request)
+
+    with TestClient(frontend.app) as client:
+        frontend.app.state.http = httpx.AsyncClient(
+            base_url="http://backend", transport=httpx.MockTransport(handle)
+        )
+        state["client"] = client
+        yield state
+
+
+def test_search_is_forwarded_with_auth_and_relayed_undecoded(backend):
+    body = gzip.compress(b'[{"title": "A"}]')
+    backend["handler"] = lambda request: reply(
+        200, body, **{"Content-Encoding": "gzip", "X-Next-Cursor": "abc"}
+    )
+
+    response = backend["client"].get(
+        "/api/search", params={"query": "a&b c", "top_k": 5, "fields": "title"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [{"title": "A"}]
+    assert response.headers["x-next-cursor"] == "abc"
+    sent = backend["requests"][0]
+    assert sent.url.path == "/documents/search"
+    assert dict(sent.url.params) == {"query": "a&b c", "top_k": "5", "mode": "vector", "fields": "title"}
+    assert sent.headers["authorization"] == "Bearer test-token"
+    assert sent.headers["accept-encoding"] == "gzip"
+
+
+def test_search_forwards_collapse_and_ann_tuning(backend):
+    backend["handler"] = lambda request: reply(200, b"[]")
+
+    backend["client"].get("/api/search", params={"query": "a", "collapse": "yes", "ef_search": 80, "probes": 4})
+
+    params = dict(backend["requests"][0].url.params)
+    assert (params["collapse"], params["ef_search"], params["probes"]) == ("true", "80", "4")
+    assert backend["client"].get("/api/search", params={"query": "a", "ef_search": "many"}).status_code == 422
+
+
+def test_gets_are_retried_on_unavailable_backend(backend):
+    statuses = iter([503, 502, 200])
+    backend["handler"] = lambda request: reply(next(statuses), b'{"status": "stored"}')
+
+    response = backend["client"].get("/api/jobs/abc")
+
+    assert response.status_code == 200
+    assert len(backend["requests"]) == 3
+
+
+def test_posts_are_not_retried_and_errors_keep_their_status(backend):
+    backend["handler"] = lambda request: reply(503)
+
+    response = backend["client"].post("/api/search/batch", json={"queries": ["a"]})
+
+    assert response.status_code == 503
+    assert "Error communicating with backend" in response.json()["message"]
+    assert len(backend["requests"]) == 1
+    assert backend["requests"][0].content == b'{"queries":["a"]}'
+
+
+def test_unconfigured_backend_is_reported(frontend, monkeypatch):
+    monkeypatch.setattr(frontend, "BACKEND_URL", None)
+    with TestClient(frontend.app) as client:
+        response = client.get("/api/search", params={"query": "a"})
+    assert response.status_code == 500
+
+
+def test_id_tokens_are_fetched_once_until_close_to_expiry(frontend, monkeypatch):
+    cache = frontend.IDTokenCache(refresh_margin=300)
+    fetches = []
+
+    def fetch(audience):
+        fetches.append(audience)
+        return f"token-{len(fetches)}", time.time() + (3600 if len(fetches) == 1 else 60)
+
+    monkeypatch.setattr(cache, "_fetch", fetch)
+
+    async def run():
+        first = await asyncio.gather(*(cache.get("aud") for _ in range(5)))
+        # The second token expires within the margin, so it is fetched anew each time.
+        cache._tokens["aud"] = ("stale", time.time() + 10)
+        return first, await cache.get("aud"), await cache.get("aud")
+
+    first, second, third = asyncio.run(run())
+    assert first == ["token-1"] * 5
+    assert (second, third) == ("token-2", "token-3")
+
+
+def test_trace_id_is_forwarded_and_backend_timings_are_prefixed(backend):
+    backend["handler"] = lambda request: reply(200, b"[]", **{"Server-Timing": "embed;dur=1.50, search;dur=2.00"})
+
+    response = backend["client"].get("/api/search", params={"query": "a"}, headers={"X-Trace-Id": "trace-7"})
+
+    assert response.headers["x-trace-id"] == "trace-7"
+    assert backend["requests"][0].headers["x-trace-id"] == "trace-7"
+    timing = response.headers["server-timing"]
+    for stage in ("id_token;dur=", "backend;dur=", "backend-embed;dur=1.50", "backend-search;dur=2.00", "total;dur="):
+        assert stage in timing
@@ -0,0 +1,47 @@
+# tests/test_hybrid_search.py
+from retrieval_service.datastore.providers.cloudsql_postgres import HYBRID_RRF_K, HYBRID_SEARCH_SQL
+from retrieval_service.embeddings import FakeEmbedder
+
+from .conftest import make_chunks, unit_vectors
+
+
+def _corpus(datastore, query: str, vector_match: int, lexical_match: int):
+    embeddings = unit_vectors(50)
+    embeddings[vector_match] = FakeEmbedder().embed_query(query)
+    chunks = make_chunks(50, embeddings=embeddings)
+    chunks[lexical_match]["content"] = f"field notes: {query} observed at dawn"
+    datastore.initialize_data(chunks)
+
+
+def test_fusion_promotes_a_lexical_match_the_vectors_miss(client, datastore):
+    _corpus(datastore, "zebra", vector_match=3, lexical_match=41)
+
+    vector = client.get("/documents/search", query_string={"query": "zebra", "top_k": 3}).get_json()
+    hybrid = client.get("/documents/search", query_string={"query": "zebra", "top_k": 3, "mode": "hybrid"}).get_json()
+
+    assert "doc-41.pdf" not in [hit["source"] for hit in vector]
+    assert [hit["source"] for hit in hybrid][:2] == ["doc-41.pdf", "doc-3.pdf"]
+    scores = [hit["score"] for hit in hybrid]
+    assert scores == sorted(scores, reverse=True)
+    # Each hit is in both rankings at most: 2 / (k + 1) bounds every score.
+    assert all(0 < score <= 2 / (HYBRID_RRF_K + 1) for score in scores)
+
+
+def test_a_match_in_both_rankings_comes_first(client, datastore):
+    _corpus(datastore, "zebra", vector_match=7, lexical_match=7)
+
+    hybrid = datastore.hybrid_search_documents("zebra", FakeEmbedder().embed_query("zebra"), top_k=5)
+
+    assert hybrid[0]["source"] == "doc-7.pdf"
+    assert hybrid[0]["score"] == 2 / (HYBRID_RRF_K + 1)
+    assert abs(hybrid[0]["distance"]) < 1e-5
+
+
+def test_unknown_mode_is_rejected(client, datastore):
+    assert client.get("/documents/search", query_string={"query": "a", "mode": "bm25"}).status_code == 400
+
+
+def test_hybrid_sql_fuses_vector_and_text_rankings():
+    for placeholder in (":embedding", ":query", ":candidates", ":rrf_k", ":top_k"):
+        assert placeholder in HYBRID_SEARCH_SQL.text
+    assert "row_number() OVER" in HYBRID_SEARCH_SQL.text
@@ -0,0 +1,76 @@
+# tests/test_incremental.py
+import numpy as np
+
+from retrieval_service.ingestion.embedding_cache import EmbeddingCache
+from retrieval_service.ingestion.incremental import embed_with_cache
+from retrieval_service.ingestion.manifest import IngestionManifest, file_sha256
+
+CHUNKER = {"chunk_size": 1000, "chunk_overlap": 200}
+
+
+class CountingEmbedder:
+    """Embeds a text as [len(text), 1.0] and records every call."""
+    def __init__(self, fail_on: str | None = None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        if self.fail_on in texts:
+            raise RuntimeError("throttled")
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_embedding_cache_is_keyed_by_text_and_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.put_many(["alpha", "beta"], [[1.0, 2.0], [3.0, 4.0]], "model-a")
+
+    found = cache.get_many(["beta", "gamma", "alpha"], "model-a")
+
+    assert sorted(found) == [0, 2]
+    np.testing.assert_array_equal(found[0], [3.0, 4.0])
+    assert found[0].dtype == np.float32
+    assert cache.get_many(["alpha"], "model-b") == {}
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.close()
+
+
+def test_embed_with_cache_only_embeds_unseen_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    embedder = CountingEmbedder()
+    embed_with_cache(embedder, ["a", "bb"], "m", cache)
+
+    vectors = embed_with_cache(embedder, ["bb", "ccc", "a"], "m", cache)
+
+    assert embedder.calls == [["a", "bb"], ["ccc"]]
+    assert [list(vector) for vector in vectors] == [[2.0, 1.0], [3.0, 1.0], [1.0, 1.0]]
+
+
+def test_embed_with_cache_leaves_failed_groups_empty_and_uncached(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+
+    vectors = embed_with_cache(CountingEmbedder(fail_on="bad"), ["ok", "bad", "fine"], "m", cache, group_size=2)
+
+    assert vectors[0] is None and vectors[1] is None
+    assert list(vectors[2]) == [4.0, 1.0]
+    assert sorted(cache.get_many(["ok", "bad", "fine"], "m")) == [2]
+
+
+def test_manifest_detects_changed_files_and_round_trips(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first")
+    path = str(tmp_path / "manifest.json")
+    manifest = IngestionManifest.load(path)
+    manifest.record("a.pdf", file_sha256(str(pdf)), CHUNKER, "model", chunks=3)
+    manifest.record("gone.pdf", "0" * 64, CHUNKER, "model", chunks=1)
+    assert manifest.retain(["a.pdf"]) == ["gone.pdf"]
+    manifest.save()
+
+    manifest = IngestionManifest.load(path)
+    sha = file_sha256(str(pdf))
+    assert manifest.is_current("a.pdf", sha, CHUNKER, "model")
+    assert not manifest.is_current("a.pdf", sha, {**CHUNKER, "chunk_size": 500}, "model")
+    assert not manifest.is_current("a.pdf", sha, CHUNKER, "other-model")
+    pdf.write_bytes(b"%PDF-1.4 second")
+    assert not manifest.is_current("a.pdf", file_sha256(str(pdf)), CHUNKER, "model")
+    assert not manifest.is_current("gone.pdf", "0" * 64, CHUNKER, "model")
@@ -0,0 +1,157 @@
+# tests/test_jobs.py
+import base64
+import json
+from datetime import timedelta
+
+import pytest
+
+from retrieval_service import jobs
+from retrieval_service.app import routes
+from retrieval_service.jobs import JobLost, JobRunner
+from retrieval_service.worker import parse_notification
+
+LEASE, MAX_ATTEMPTS, PINNED = 60.0, 2, 600.0
+
+
+def _enqueue(datastore, job_id: str, host: str | None = None, generation: str | None = None) -> dict:
+    row, _ = datastore.enqueue_job({
+        "id": job_id, "source_uri": f"gs://bucket/{job_id}.pdf", "generation": generation or job_id,
+        "filename": f"{job_id}.pdf", "extractor": "papers", "host": host, "trace_id": None,
+    })
+    return row
+
+
+def _age(datastore, job_id: str, seconds: float):
+    """Moves a job's last update seconds into the past."""
+    datastore._jobs[job_id]["updated_at"] -= timedelta(seconds=seconds)
+
+
+def _claim(datastore, host: str = "host-a") -> dict | None:
+    return datastore.claim_job(host, LEASE, MAX_ATTEMPTS, PINNED)
+
+
+def test_jobs_are_queued_once_per_object_version(datastore):
+    first, created = datastore.enqueue_job({**_enqueue(datastore, "a"), "id": "other"})
+    assert (first["id"], created) == ("a", False)
+    assert _enqueue(datastore, "b", generation="2")["id"] == "b"
+
+
+def test_jobs_are_claimed_oldest_first(datastore):
+    for job_id in ("a", "b", "c"):
+        _enqueue(datastore, job_id)
+
+    claimed = [_claim(datastore) for _ in range(4)]
+
+    assert [job and job["id"] for job in claimed] == ["a", "b", "c", None]
+    assert claimed[0]["status"] == "extracting" and claimed[0]["attempts"] == 1
+
+
+def test_an_expired_lease_is_reclaimed_and_fences_the_old_attempt(datastore):
+    _enqueue(datastore, "a")
+    first = _claim(datastore)
+    assert _claim(datastore) is None
+
+    _age(datastore, "a", LEASE + 1)
+    second = _claim(datastore, host="host-b")
+
+    assert second["attempts"] == 2
+    # The first worker's updates are refused once the job was re-claimed.
+    assert not datastore.update_job("a", first["attempts"], "stored", chunks=5)
+    assert datastore.update_job("a", second["attempts"], "stored", chunks=7)
+    assert datastore.get_job("a")["chunks"] == 7
+
+
+def test_a_job_lost_on_every_attempt_fails(datastore):
+    _enqueue(datastore, "a")
+    for _ in range(MAX_ATTEMPTS):
+        _claim(datastore)
+        _age(datastore, "a", LEASE + 1)
+
+    assert _claim(datastore) is None
+    job = datastore.get_job("a")
+    assert (job["status"], job["error"]) == ("failed", "Worker lost on every attempt")
+
+
+def test_pinned_jobs_run_on_their_host_or_fail_once_it_is_gone(datastore):
+    _enqueue(datastore, "a", host="host-a")
+    _enqueue(datastore, "b", host="host-a")
+
+    assert _claim(datastore, host="host-b") is None
+    assert _claim(datastore, host="host-a")["id"] == "a"
+
+    _age(datastore, "b", PINNED + 1)
+    assert _claim(datastore, host="host-b") is None
+    job = datastore.get_job("b")
+    assert (job["status"], job["error"]) == ("failed", "Host holding the staged upload went away")
+
+
+def test_runner_records_progress_results_and_failures(datastore):
+    seen = []
+
+    def process(job, progress):
+        progress("embedding")
+        seen.append(datastore.get_job(job.id)["status"])
+        if job.id == "bad":
+            raise ValueError("unreadable PDF")
+        return {"chunks": 3}
+
+    _enqueue(datastore, "good")
+    _enqueue(datastore, "bad")
+    JobRunner(process, workers=1).drain()
+
+    assert seen == ["embedding", "embedding"]
+    good, bad = datastore.get_job("good"), datastore.get_job("bad")
+    assert (good["status"], good["chunks"], good["finished_at"] is not None) == ("stored", 3, True)
+    assert (bad["status"], bad["error"]) == ("failed", "unreadable PDF")
+
+
+def test_runner_drops_a_job_another_worker_took_over(datastore):
+    lost = []
+
+    def process(job, progress):
+        # Another worker claims the job after this one's lease expired.
+        _age(datastore, job.id, LEASE + 1)
+        datastore.claim_job("host-b", LEASE, MAX_ATTEMPTS, PINNED)
+        with pytest.raises(JobLost):
+            progress("embedding")
+        lost.append(job.id)
+        raise JobLost(job.id)
+
+    _enqueue(datastore, "a")
+    runner = JobRunner(process, workers=1)
+    job = jobs.Job.from_row(_claim(datastore))
+
+    runner._run(datastore, job)
+
+    row = datastore.get_job("a")
+    assert lost == ["a"]
+    # Neither a result nor a failure of the stale attempt is recorded.
+    assert (row["status"], row["attempts"], row["error"]) == ("extracting", 2, None)
+
+
+def test_notifications_queue_each_object_version_once(client, datastore, monkeypatch):
+    runner = JobRunner(lambda job, progress: None, workers=1)
+    monkeypatch.setattr(routes, "get_job_runner", lambda: runner)
+    monkeypatch.setattr(routes, "INGEST_BUCKET", "bucket")
+    envelope = {"message": {"attributes": {
+        "eventType": "OBJECT_FINALIZE", "bucketId": "bucket", "objectId": "in/a.pdf", "objectGeneration": "17",
+    }}}
+
+    first = client.post("/ingestion/notifications", json=envelope)
+    again = client.post("/ingestion/notifications", json=envelope)
+
+    assert (first.status_code, again.status_code) == (202, 200)
+    assert first.get_json()["id"] == again.get_json()["id"]
+    assert first.get_json()["source_uri"] == "gs://bucket/in/a.pdf"
+    assert client.post("/ingestion/notifications", json={"bucket": "other", "name": "a.pdf"}).status_code == 204
+    assert client.post("/ingestion/notifications", json={"bucket": "bucket", "name": "a.txt"}).status_code == 204
+
+
+def test_parse_notification_reads_pubsub_and_eventarc_payloads():
+    resource = {"bucket": "b", "name": "x.pdf", "generation": 5}
+    data = base64.b64encode(json.dumps(resource).encode()).decode()
+
+    assert parse_notification(resource) == ("b", "x.pdf", "5")
+    assert parse_notification({"message": {"data": data}}) == ("b", "x.pdf", "5")
+    assert parse_notification({"message": {"attributes": {"eventType": "OBJECT_DELETE"}, "data": data}}) is None
+    assert parse_notification({}) is None
@@ -0,0 +1,154 @@
+# tests/test_load.py
+import base64
+import importlib
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+import sqlalchemy as sa
+
+from retrieval_service.datastore.pgcopy import (
+    COPY_HEADER,
+    COPY_TRAILER,
+    encode_copy_binary,
+    encode_int8,
+    encode_text,
+    encode_vector,
+)
+
+from .conftest import make_chunks
+
+
+def test_binary_copy_stream_layout():
+    stream = encode_copy_binary([(7, "é", None)], [encode_int8, encode_text, encode_text])
+
+    assert stream.startswith(COPY_HEADER) and stream.endswith(COPY_TRAILER)
+    body = stream[len(COPY_HEADER):-len(COPY_TRAILER)]
+    assert body == (
+        struct.pack(">h", 3)
+        + struct.pack(">iq", 8, 7)
+        + struct.pack(">i", 2) + "é".encode()
+        + struct.pack(">i", -1)
+    )
+
+
+def test_vector_field_round_trips():
+    values = [0.5, -1.25, 3.0]
+    field = encode_vector(values)
+
+    length, dimensions, unused = struct.unpack(">ihh", field[:8])
+    assert (length, dimensions, unused) == (4 + 4 * len(values), len(values), 0)
+    assert np.frombuffer(field[8:], dtype=">f4").tolist() == values
+
+
+def _ndjson(records) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def _acks(response) -> list[dict]:
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_load_acknowledges_every_batch(client, datastore):
+    chunks = make_chunks(5)
+    chunks[1]["embedding_b64"] = base64.b64encode(
+        np.asarray(chunks[1].pop("embedding"), dtype="<f4").tobytes()
+    ).decode()
+
+    response = client.post(
+        "/documents/load?batch_size=2", data=_ndjson(chunks), content_type="application/x-ndjson"
+    )
+
+    acks = _acks(response)
+    assert [(a["batch"], a["rows"], a["first_line"], a["last_line"]) for a in acks[:-1]] == [
+        (0, 2, 1, 2), (1, 2, 3, 4), (2, 1, 5, 5),
+    ]
+    assert acks[-1] == {"done": True, "batches": 3, "rows": 5}
+    assert len(datastore.list_documents(0, 10)) == 5
+
+
+def test_load_reports_the_first_bad_line_and_keeps_earlier_batches(client, datastore):
+    body = _ndjson(make_chunks(2)) + '["not", "an", "object"]\n' + _ndjson(make_chunks(1, seed=1))
+
+    acks = _acks(client.post("/documents/load?batch_size=2", data=body, content_type="application/x-ndjson"))
+
+    assert acks[0]["rows"] == 2
+    assert acks[-1] == {"error": "Invalid record after line 2: line 3 is not a JSON object", "first_line": 3}
+    assert len(datastore.list_documents(0, 10)) == 2
+
+
+def test_load_accepts_a_json_array_and_stores_empty_fields_as_null(client, datastore):
+    chunks = make_chunks(2)
+    chunks[0]["title"] = ""
+
+    acks = _acks(client.post("/documents/load", json=chunks))
+
+    assert acks[-1]["done"] is True
+    titles = {document["source"]: document["title"] for document in datastore.list_documents(0, 10)}
+    assert titles == {"doc-0.pdf": None, "doc-1.pdf": "Document 1"}
+
+
+def test_load_rejects_a_json_body_that_is_not_an_array(client, datastore):
+    acks = _acks(client.post("/documents/load", json={"source": "x"}))
+    assert acks == [{"error": "Invalid record after line 0: a JSON body must be an array of records", "first_line": 1}]
+
+
+def test_load_batches_end_between_sources(client, datastore):
+    chunks = make_chunks(5)
+    for chunk, source in zip(chunks, ["a.pdf", "a.pdf", "a.pdf", "b.pdf", "b.pdf"]):
+        chunk["source"] = source
+
+    acks = _acks(client.post("/documents/load?batch_size=2", data=_ndjson(chunks), content_type="application/x-ndjson"))
+
+    assert [(a["first_line"], a["last_line"]) for a in acks[:-1]] == [(1, 3), (4, 5)]
+    assert acks[-1] == {"done": True, "batches": 2, "rows": 5}
+
+
+def test_load_reports_a_malformed_json_body(client, datastore):
+    acks = _acks(client.post("/documents/load", data="[{", content_type="application/json"))
+    assert acks == [{"error": "Invalid record after line 0: a JSON body must be an array of records", "first_line": 1}]
+
+
+def test_load_rejects_a_bad_batch_size(client, datastore):
+    assert client.post("/documents/load?batch_size=abc", data="").status_code == 400
+    assert client.post("/documents/load?batch_size=0", data="").status_code == 400
+
+
+def test_load_client_retries_a_stream_that_ends_early(monkeypatch):
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[1] / "src" / "retrieval_service"))
+    run_load_data = importlib.import_module("run_load_data")
+    lines = [{"batch": 0, "rows": 2, "first_line": 1, "last_line": 2}]
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def iter_lines(self):
+            return [json.dumps(line).encode() for line in lines]
+
+    monkeypatch.setattr(run_load_data, "iter_ndjson", lambda path, skip: iter(()))
+    monkeypatch.setattr(run_load_data.requests, "post", lambda *args, **kwargs: Response())
+    progress = {"last_line": 0}
+
+    with pytest.raises(RuntimeError, match="resume after line 2"):
+        run_load_data.load_from("chunks.csv", progress, {})
+    lines.append({"done": True, "batches": 1, "rows": 2})
+    run_load_data.load_from("chunks.csv", progress, {})
+    assert progress == {"last_line": 2}
+
+
+def test_reloading_a_source_replaces_its_chunks(postgres, postgres_datastore):
+    chunks = make_chunks(3)
+    for chunk in chunks:
+        chunk["source"] = "a.pdf"
+
+    postgres_datastore.copy_documents(chunks)
+    # A batch committed without its acknowledgement is sent again.
+    postgres_datastore.copy_documents(chunks)
+    postgres_datastore.copy_documents(chunks[:2])
+
+    with postgres.connect() as conn:
+        counts = conn.execute(sa.text("SELECT count(DISTINCT document_id), count(*) FROM chunks")).one()
+    assert tuple(counts) == (1, 2)
@@ -0,0 +1,110 @@
+# tests/test_memory_numpy.py
+import numpy as np
+import pytest
+
+from retrieval_service.datastore.providers import memory_numpy
+from retrieval_service.datastore.providers.memory_numpy import Config, MemoryNumpyDatastore
+from retrieval_service.ingestion.artifacts import write_artifact
+
+from .conftest import DIMENSIONS, make_chunks, unit_vectors
+
+
+def brute_force(matrix: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    scores = queries @ matrix.T / np.linalg.norm(matrix, axis=1)
+    return np.argsort(-scores, axis=1)[:, :top_k]
+
+
+def _artifact(tmp_path, count: int, seed: int) -> tuple[str, np.ndarray]:
+    chunks = make_chunks(count, seed=seed)
+    path = str(tmp_path / "corpus")
+    write_artifact(path, [{**c, "source_filename": c["source"]} for c in chunks], [c["embedding"] for c in chunks])
+    return path, np.asarray([c["embedding"] for c in chunks], dtype=np.float32)
+
+
+def test_nearest_is_exact_across_segments_and_score_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_numpy, "SCORE_BLOCK_ROWS", 7)
+    path, loaded = _artifact(tmp_path, 40, seed=1)
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy", path=path))
+    appended = make_chunks(25, seed=2)
+    # Unnormalized rows check that scores are divided by the row norms.
+    for chunk in appended:
+        chunk["embedding"] = [3.0 * x for x in chunk["embedding"]]
+    datastore.add_documents(appended)
+    matrix = np.concatenate([loaded, np.asarray([c["embedding"] for c in appended], dtype=np.float32)])
+    queries = unit_vectors(5, seed=3)
+
+    rows, distances = datastore.nearest(queries, 10)
+
+    np.testing.assert_array_equal(rows, brute_force(matrix, queries, 10))
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    expected = 1.0 - (queries[0] @ matrix[rows[0, 0]]) / np.linalg.norm(matrix[rows[0, 0]])
+    assert distances[0, 0] == pytest.approx(expected, abs=1e-5)
+
+
+def test_loaded_artifacts_are_memory_mapped_and_appends_are_buffered(tmp_path):
+    path, _ = _artifact(tmp_path, 10, seed=1)
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy", path=path))
+    version = datastore.get_corpus_version()
+
+    assert datastore.pool_status()["mapped_bytes"] == 10 * DIMENSIONS * 4
+    assert datastore.copy_documents(make_chunks(3, seed=2)) == version + 1
+    status = datastore.pool_status()
+    assert (status["rows"], status["segments"], status["resident_bytes"]) == (13, 2, 3 * DIMENSIONS * 4)
+
+
+def test_snapshot_round_trips(tmp_path):
+    chunks = make_chunks(12)
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy"))
+    datastore.add_documents(chunks)
+    datastore.save_snapshot(str(tmp_path / "snapshot"))
+
+    reloaded = MemoryNumpyDatastore(Config(kind="memory-numpy", path=str(tmp_path / "snapshot")))
+    query = unit_vectors(1, seed=5)[0]
+
+    assert reloaded.search_documents(query, 5) == datastore.search_documents(query, 5)
+    assert [d["source"] for d in reloaded.list_documents(0, 20)] == [c["source"] for c in chunks]
+
+
+def test_artifacts_of_other_dimensions_are_rejected(tmp_path):
+    path, _ = _artifact(tmp_path, 3, seed=1)
+    with pytest.raises(ValueError, match="768-d embeddings, expected 384"):
+        MemoryNumpyDatastore(Config(kind="memory-numpy", path=path, dimensions=384))
+
+
+def test_batch_search_answers_each_query(tmp_path):
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy"))
+    embeddings = unit_vectors(20)
+    datastore.add_documents(make_chunks(20, embeddings=embeddings))
+
+    results = datastore.batch_search_documents([embeddings[4], embeddings[11]], 3)
+
+    assert [hits[0]["source"] for hits in results] == ["doc-4.pdf", "doc-11.pdf"]
+    assert all(len(hits) == 3 for hits in results)
+    assert datastore.batch_search_documents([], 3) == []
+
+
+def test_hybrid_scores_lexical_only_hits_from_their_own_segment(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_numpy, "HYBRID_CANDIDATES", 2)
+    path, loaded = _artifact(tmp_path, 10, seed=1)
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy", path=path))
+    appended = make_chunks(10, seed=2)
+    appended[6]["content"] = "zirconium alloy"
+    appended[6]["embedding"] = [2.0 * x for x in appended[6]["embedding"]]
+    datastore.add_documents(appended)
+    query = unit_vectors(1, seed=3)[0]
+    # Row 16 is only a lexical match, so its distance is computed separately.
+    assert 16 not in datastore.nearest([query], 3)[0][0]
+
+    hits = datastore.hybrid_search_documents("zirconium", query, 3)
+
+    hit = next(hit for hit in hits if hit["content"] == "zirconium alloy")
+    vector = np.asarray(appended[6]["embedding"], dtype=np.float32)
+    assert hit["id"] == 17
+    assert hit["distance"] == pytest.approx(1.0 - query @ vector / np.linalg.norm(vector), abs=1e-5)
+
+
+def test_snapshots_share_the_chunk_list():
+    datastore = MemoryNumpyDatastore(Config(kind="memory-numpy"))
+    datastore.add_documents(make_chunks(3))
+
+    assert datastore._snapshot()[1] is datastore._chunks
@@ -0,0 +1,55 @@
+# tests/test_metrics.py
+import io
+
+from retrieval_service import jobs
+from retrieval_service.app import routes
+from retrieval_service.metrics import TRACE_HEADER
+
+from .conftest import make_chunks
+
+
+def _timings(response) -> dict[str, float]:
+    entries = (entry.split(";dur=") for entry in response.headers["Server-Timing"].split(", "))
+    return {name: float(ms) for name, ms in entries}
+
+
+def test_search_reports_its_stages_in_server_timing(client, datastore):
+    datastore.initialize_data(make_chunks(10))
+
+    response = client.get("/documents/search", query_string={"query": "topic 2"})
+
+    timings = _timings(response)
+    assert {"embed", "search", "serialize", "total"} <= set(timings)
+    assert timings["total"] >= timings["search"] >= 0
+
+
+def test_trace_ids_are_echoed_or_generated(client, datastore):
+    assert client.get("/", headers={TRACE_HEADER: "abc-123"}).headers[TRACE_HEADER] == "abc-123"
+
+    generated = client.get("/", headers={TRACE_HEADER: "not valid!"}).headers[TRACE_HEADER]
+    assert generated != "not valid!" and len(generated) == 32
+
+
+def test_jobs_keep_the_trace_id_of_the_request_that_queued_them(client, datastore, monkeypatch, tmp_path):
+    from retrieval_service import worker
+
+    monkeypatch.setattr(worker, "UPLOAD_DIR", str(tmp_path))
+    runner = jobs.JobRunner(worker.process_job, workers=1)
+    monkeypatch.setattr(routes, "get_job_runner", lambda: runner)
+
+    response = client.post(
+        "/documents/upload", data={"file": (io.BytesIO(b"%PDF"), "a.pdf")}, headers={TRACE_HEADER: "upload-1"}
+    )
+
+    assert response.get_json()["jobs"][0]["trace_id"] == "upload-1"
+
+
+def test_metrics_export_request_latency_and_pool_gauges(client, datastore):
+    datastore.initialize_data(make_chunks(3))
+    client.get("/documents/search", query_string={"query": "topic 1"})
+
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert 'retrieval_request_seconds_count{endpoint="/documents/search",method="GET",status="200"}' in body
+    assert 'retrieval_stage_seconds_count{stage="embed"}' in body
+    assert "retrieval_datastore_rows 3.0" in body
@@ -0,0 +1,102 @@
+# tests/test_pagination.py
+import pytest
+
+from retrieval_service.app import routes
+from retrieval_service.app.routes import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from retrieval_service.search_cache import LRUBackend, SearchResultCache
+
+from .conftest import make_chunks, unit_vectors
+
+
+def _pages(client, **params) -> list[list[int]]:
+    """Follows X-Next-Cursor from the first page to the last one."""
+    pages, cursor = [], None
+    while True:
+        response = client.get("/documents/search", query_string={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([hit["id"] for hit in response.get_json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip_and_validation():
+    token = encode_cursor({"q": "abc", "d": 0.5, "i": 7})
+
+    assert "=" not in token
+    assert decode_cursor(token, {"q": str, "d": (int, float), "i": int}) == {"q": "abc", "d": 0.5, "i": 7}
+    for bad in ("not base64!", encode_cursor({"i": "7"}), encode_cursor({"i": True}), encode_cursor([1])):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(bad, {"i": int})
+
+
+def test_search_pages_cover_every_hit_once(client, datastore):
+    datastore.initialize_data(make_chunks(23))
+
+    pages = _pages(client, query="topic 3", top_k=5)
+    ids = [id for page in pages for id in page]
+    everything = client.get("/documents/search", query_string={"query": "topic 3", "top_k": 23}).get_json()
+
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert ids == [hit["id"] for hit in everything]
+
+
+def test_pages_split_ties_on_distance_by_id(client, datastore):
+    # Identical chunks all sit at the same distance from any query.
+    datastore.initialize_data(make_chunks(12, embeddings=unit_vectors(1, seed=3).repeat(12, axis=0)))
+
+    ids = [id for page in _pages(client, query="anything", top_k=5) for id in page]
+
+    assert ids == sorted(ids) and len(set(ids)) == 12
+
+
+def test_cursor_is_rejected_elsewhere(client, datastore):
+    datastore.initialize_data(make_chunks(10))
+    cursor = client.get("/documents/search", query_string={"query": "topic 1", "top_k": 3}).headers[NEXT_CURSOR_HEADER]
+
+    for params in (
+        {"query": "topic 2"},
+        {"query": "topic 1", "mode": "hybrid"},
+        {"query": "topic 1", "collapse": "true"},
+    ):
+        response = client.get("/documents/search", query_string={**params, "cursor": cursor})
+        assert response.status_code == 400
+    assert client.get("/documents/search", query_string={"query": "topic 1", "cursor": "x"}).status_code == 400
+    hybrid = client.get("/documents/search", query_string={"query": "topic 1", "mode": "hybrid", "top_k": 3})
+    assert NEXT_CURSOR_HEADER not in hybrid.headers
+
+
+def test_paged_searches_skip_the_near_cache(client, datastore, monkeypatch):
+    datastore.initialize_data(make_chunks(10))
+    cache = SearchResultCache(LRUBackend())
+    monkeypatch.setattr(routes, "get_search_cache", lambda: cache)
+    near = []
+    get_near = cache.get_near
+    monkeypatch.setattr(cache, "get_near", lambda *args: near.append(args) or get_near(*args))
+
+    first = client.get("/documents/search", query_string={"query": "topic 1", "top_k": 3})
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    second = client.get("/documents/search", query_string={"query": "topic 1", "top_k": 3, "cursor": cursor})
+    again = client.get("/documents/search", query_string={"query": "topic 1", "top_k": 3, "cursor": cursor})
+
+    assert near == []
+    assert set(hit["id"] for hit in first.get_json()).isdisjoint(hit["id"] for hit in second.get_json())
+    assert again.get_json() == second.get_json()
+    client.get("/documents/search", query_string={"query": "Topic 1 ", "top_k": 3, "collapse": "true"})
+    assert len(near) == 1
+
+
+def test_documents_are_listed_page_by_page(client, datastore):
+    datastore.initialize_data(make_chunks(7))
+
+    ids, cursor = [], None
+    while True:
+        body = client.get("/documents", query_string={"limit": 3, **({"cursor": cursor} if cursor else {})}).get_json()
+        ids += [document["id"] for document in body["documents"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(ids) == 7 and ids == sorted(ids)
+    assert client.get("/documents", query_string={"limit": "many"}).status_code == 400
+    assert client.get("/documents", query_string={"cursor": encode_cursor({"q": "x"})}).status_code == 400
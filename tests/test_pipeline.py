@@ -0,0 +1,83 @@
+# tests/test_pipeline.py
+import os
+
+import pytest
+
+from retrieval_service.embeddings.fake import FakeEmbedder
+from retrieval_service.ingestion.artifacts import read_artifact
+from retrieval_service.ingestion.extractors import MetadataExtractor, get_extractor
+from retrieval_service.ingestion.pipeline import extract_pdf, run_pipeline
+
+from .conftest import page_text, write_pdf
+
+CHUNKER = {"splitter": "RecursiveCharacterTextSplitter", "chunk_size": 200, "chunk_overlap": 20}
+
+
+def test_paper_extractor_falls_back_to_the_filename():
+    metadata = get_extractor("papers").extract("report.pdf", {}, "")
+    assert metadata == {"title": "report", "authors": "Unknown Authors", "publication_date": "Unknown Date"}
+
+
+def test_patent_extractor_dispatches_on_the_front_page():
+    us_page = (
+        "(12) United States Patent\nSmith\n(10) Patent No.: US 1,234,567\n"
+        "(45) Date of Patent: Jan. 2, 2024\n(54) WIDGET\n(71) Applicant\n"
+        "(72) Inventors: Jane Smith\n(73) Assignee: Widgets Inc.\n"
+    )
+    kr_page = "대한민국특허청(KR)\n(45) 등록일자 2024년01월02일\n(54) 발명의 명칭 위젯\n(72) 발명자 홍길동\n"
+
+    us = get_extractor("patents").extract("us.pdf", {}, us_page)
+    kr = get_extractor("patents").extract("kr.pdf", {}, kr_page)
+
+    assert us["title"] == "WIDGET"
+    assert us["authors"] == "Inventors: Jane Smith; Assignee: Widgets Inc."
+    assert us["publication_date"] == "Jan. 2, 2024"
+    assert kr["title"] == "위젯" and kr["authors"].startswith("Inventors: 홍길동;")
+    with pytest.raises(ValueError):
+        get_extractor("unknown")
+
+
+def test_an_extractor_without_extract_cannot_be_built():
+    class Incomplete(MetadataExtractor):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="extract"):
+        Incomplete()
+    with pytest.raises(TypeError):
+        MetadataExtractor()
+
+
+def test_extract_pdf_chunks_every_page(tmp_path):
+    write_pdf(tmp_path / "a.pdf", [page_text("rivers"), page_text("glaciers")], title="Water")
+
+    chunks = extract_pdf(str(tmp_path / "a.pdf"), "papers", CHUNKER)
+
+    assert len(chunks) > 2
+    assert {chunk["title"] for chunk in chunks} == {"Water"}
+    text = " ".join(chunk["content"] for chunk in chunks)
+    assert "rivers" in text and "glaciers" in text
+    assert all(len(chunk["content"]) <= CHUNKER["chunk_size"] for chunk in chunks)
+
+
+def test_run_pipeline_processes_only_new_or_changed_files(tmp_path):
+    pdfs, artifact = tmp_path / "pdfs", str(tmp_path / "processed")
+    os.makedirs(pdfs)
+    write_pdf(pdfs / "a.pdf", [page_text("rivers")])
+    write_pdf(pdfs / "b.pdf", [page_text("volcanoes")])
+    run = lambda: run_pipeline(
+        str(pdfs), artifact, "papers", FakeEmbedder(), "fake-embedder",
+        chunker=CHUNKER, cache_path=str(tmp_path / "cache.sqlite"), workers=1,
+    )
+
+    first = run()
+    metadata, embeddings = read_artifact(artifact)
+    assert (first.files, first.skipped) == (2, 0)
+    assert {chunk["source_filename"] for chunk in metadata} == {"a.pdf", "b.pdf"}
+    assert embeddings.shape == (len(metadata), 768)
+
+    write_pdf(pdfs / "b.pdf", [page_text("deserts")])
+    second = run()
+    metadata, _ = read_artifact(artifact)
+    assert (second.files, second.skipped) == (1, 1)
+    contents = " ".join(chunk["content"] for chunk in metadata)
+    assert "deserts" in contents and "volcanoes" not in contents and "rivers" in contents
@@ -0,0 +1,112 @@
+# tests/test_query_embedding_cache.py
+import threading
+import time
+
+import pytest
+
+from retrieval_service.embeddings import QueryEmbeddingCache, normalize_query
+
+
+class Recorder:
+    """embed_fn that records what it was asked to embed."""
+    def __init__(self, gate: threading.Event | None = None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, text):
+        self.calls.append(text)
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [float(len(text))]
+
+
+def test_normalize_query():
+    assert normalize_query("  Ｇraphene\tBATTERY  ") == "graphene battery"
+
+
+def test_spellings_share_a_key_but_the_query_is_embedded_as_written():
+    embed = Recorder()
+    cache = QueryEmbeddingCache(embed, model_name="m")
+
+    first = cache.get("Graphene  Battery")
+    second = cache.get("graphene battery")
+
+    assert embed.calls == ["Graphene  Battery"]
+    assert first == second
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_after_the_ttl():
+    now = [0.0]
+    embed = Recorder()
+    cache = QueryEmbeddingCache(embed, model_name="m", ttl_seconds=10, clock=lambda: now[0])
+    cache.get("q")
+    now[0] = 11.0
+    cache.get("q")
+
+    assert len(embed.calls) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    embed = Recorder()
+    cache = QueryEmbeddingCache(embed, model_name="m", max_entries=2)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")  # evicts b
+    cache.get("a")
+    cache.get("b")
+
+    assert embed.calls == ["a", "b", "c", "b"]
+
+
+def test_concurrent_misses_on_one_key_embed_once():
+    gate = threading.Event()
+    embed = Recorder(gate)
+    cache = QueryEmbeddingCache(embed, model_name="m")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("same query"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert embed.calls == ["same query"]
+    assert results == [[10.0]] * 8
+
+
+def test_failures_reach_the_caller_and_are_not_cached():
+    attempts = []
+
+    def flaky(text):
+        attempts.append(text)
+        if len(attempts) == 1:
+            raise RuntimeError("quota")
+        return [1.0]
+
+    cache = QueryEmbeddingCache(flaky, model_name="m")
+    with pytest.raises(RuntimeError, match="quota"):
+        cache.get("q")
+    assert cache.get("q") == [1.0]
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_get_many_embeds_all_misses_in_one_call():
+    batches = []
+
+    def embed_many(texts):
+        batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    cache = QueryEmbeddingCache(Recorder(), model_name="m", embed_many_fn=embed_many)
+    cache.get("cached")
+
+    vectors = cache.get_many(["Alpha", "cached", "alpha", "beta"])
+
+    assert batches == [["Alpha", "beta"]]
+    assert vectors == [[5.0], [6.0], [5.0], [4.0]]
@@ -0,0 +1,102 @@
+# tests/test_responses.py
+import datetime
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+from retrieval_service import responses
+from retrieval_service.app.routes import parse_fields, query_terms_pattern, shape_results, snippet
+
+from .conftest import make_chunks
+
+HIT = {"id": 1, "source": "a.pdf", "title": "A", "content": "Solar cells convert light. " * 3, "distance": 0.25}
+
+
+def test_parse_fields_accepts_known_names_only():
+    assert parse_fields(None) is None
+    assert parse_fields(" title, source ") == ["title", "source"]
+    assert parse_fields(["id", "distance"]) == ["id", "distance"]
+    for value in ("title,embedding", "", ",", [1]):
+        with pytest.raises(ValueError, match="fields must be a subset"):
+            parse_fields(value)
+
+
+def test_short_content_is_kept_whole_with_highlights():
+    text, highlights = snippet("Solar panels and solar cells", query_terms_pattern("SOLAR cell"), 100)
+
+    assert text == "Solar panels and solar cells"
+    assert [text[s:e] for s, e in highlights] == ["Solar", "solar", "cell"]
+
+
+def test_long_content_is_cut_around_the_densest_matches():
+    content = " ".join(["filler"] * 200 + ["battery anode battery cathode battery"] + ["filler"] * 200)
+
+    text, highlights = snippet(content, query_terms_pattern("battery anode"), 80)
+
+    assert text.startswith("…") and text.endswith("…")
+    assert len(text) <= 82
+    assert [text[s:e] for s, e in highlights] == ["battery", "anode", "battery", "battery"]
+    # Without matches the snippet is the start of the content.
+    assert snippet(content, None, 30)[0].startswith("filler filler")
+
+
+def test_shape_results_projects_and_never_mutates_cached_hits():
+    hits = [dict(HIT)]
+
+    assert shape_results(hits, None, None, "solar") is hits
+    assert shape_results(hits, ["id", "distance"], None, "solar") == [{"id": 1, "distance": 0.25}]
+    shaped = shape_results(hits, ["title", "content"], 30, "solar")
+
+    assert set(shaped[0]) == {"title", "content", "highlights"}
+    assert shaped[0]["content"].endswith("…") and shaped[0]["highlights"][0] == [0, 5]
+    assert hits == [HIT]
+
+
+def test_search_applies_fields_and_snippet(client, datastore):
+    datastore.initialize_data(make_chunks(5))
+
+    hits = client.get(
+        "/documents/search", query_string={"query": "topic 2", "fields": "source,content", "snippet": 10}
+    ).get_json()
+
+    assert all(set(hit) == {"source", "content", "highlights"} for hit in hits)
+    assert client.get("/documents/search", query_string={"query": "a", "fields": "embedding"}).status_code == 400
+    assert client.get("/documents/search", query_string={"query": "a", "snippet": 0}).status_code == 400
+    assert client.get("/documents/search", query_string={"query": "a", "snippet": "abc"}).status_code == 400
+
+
+@pytest.mark.parametrize("encoding, decompress", [
+    ("gzip", gzip.decompress),
+    pytest.param("br", lambda data: responses.brotli.decompress(data), marks=pytest.mark.skipif(
+        responses.brotli is None, reason="brotli is not installed")),
+])
+def test_large_json_responses_are_compressed(client, datastore, encoding, decompress):
+    datastore.initialize_data(make_chunks(50))
+
+    response = client.get(
+        "/documents/search", query_string={"query": "topic", "top_k": 50}, headers={"Accept-Encoding": encoding}
+    )
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(json.loads(decompress(response.get_data()))) == 50
+
+
+def test_small_or_unaccepted_responses_are_sent_as_is(client, datastore):
+    datastore.initialize_data(make_chunks(50))
+
+    small = client.get("/documents/search", query_string={"query": "topic", "top_k": 1, "fields": "id"},
+                       headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/documents/search", query_string={"query": "topic", "top_k": 50})
+
+    assert "Content-Encoding" not in small.headers and small.get_json()
+    assert "Content-Encoding" not in identity.headers and len(identity.get_json()) == 50
+
+
+def test_fast_json_serializes_numpy_values_and_dates(app):
+    body = app.json.dumps({
+        "distance": np.float32(0.5), "ids": np.arange(2), "at": datetime.date(2024, 1, 2),
+    })
+    assert json.loads(body) == {"distance": 0.5, "ids": [0, 1], "at": "2024-01-02"}
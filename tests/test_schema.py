@@ -0,0 +1,97 @@
+# tests/test_schema.py
+import sqlalchemy as sa
+
+from retrieval_service.datastore.providers.cloudsql_postgres import document_row, split_chunks
+from retrieval_service.models import Chunk, Document
+
+from .conftest import DIMENSIONS, load_migrations, make_chunks, run_migrations
+
+
+def test_split_chunks_upserts_each_document_once():
+    chunks = make_chunks(3)
+    chunks[2]["source"] = chunks[0]["source"]
+    chunks.append({**chunks[1], "source": None, "source_filename": "legacy.pdf", "content": "from a CSV row"})
+
+    params, rows = split_chunks(chunks)
+
+    assert params == {
+        "sources": ["doc-0.pdf", "doc-1.pdf", "legacy.pdf"],
+        "titles": ["Document 2", "Document 1", "Document 1"],
+        "authors": ["A. Author"] * 3,
+        "publication_dates": ["2024-01-01"] * 3,
+    }
+    assert [(source, content) for source, content, _ in rows] == [
+        ("doc-0.pdf", "chunk number 0 about topic 0"),
+        ("doc-1.pdf", "chunk number 1 about topic 1"),
+        ("doc-0.pdf", "chunk number 2 about topic 2"),
+        ("legacy.pdf", "from a CSV row"),
+    ]
+    assert rows[0][2] is chunks[0]["embedding"]
+    assert document_row({"source_filename": "x.pdf"})["source"] == "x.pdf"
+
+
+def test_chunks_reference_their_document():
+    (foreign_key,) = Chunk.__table__.c.document_id.foreign_keys
+    assert foreign_key.column is Document.__table__.c.id
+    assert foreign_key.ondelete == "CASCADE"
+    assert Document.__table__.c.source.unique
+    assert "content" not in Document.__table__.c and "source" not in Chunk.__table__.c
+
+
+def test_chunks_of_one_source_share_a_document(client, datastore):
+    chunks = make_chunks(4)
+    for chunk in chunks[2:]:
+        chunk["source"] = "doc-0.pdf"
+    datastore.initialize_data(chunks)
+
+    documents = datastore.list_documents(0, 10)
+    results = client.get("/documents/search", query_string={"query": "chunk", "top_k": 4}).get_json()
+
+    assert [document["source"] for document in documents] == ["doc-0.pdf", "doc-1.pdf"]
+    ids = {document["source"]: document["id"] for document in documents}
+    assert len(results) == 4
+    assert all(hit["document_id"] == ids[hit["source"]] for hit in results)
+
+
+def test_split_migration_keeps_writes_made_during_the_index_build(postgres, monkeypatch):
+    migrations = load_migrations()
+    run_migrations(postgres, migrations, "9b4d2e6f8a17")
+    insert = sa.text(
+        "INSERT INTO documents (source, title, content, embedding) "
+        "VALUES (:source, :source, :content, CAST(:embedding AS vector))"
+    )
+    embedding = str([0.1] * DIMENSIONS)
+    with postgres.begin() as conn:
+        for i in range(3):
+            conn.execute(insert, {"source": f"doc-{i}.pdf", "content": f"chunk {i}", "embedding": embedding})
+    split = migrations["d41f7a3c9e20"]
+    build_indexes = split._create_chunk_indexes
+
+    def build_while_writing(table):
+        # The service keeps writing to the old table between backfill and swap.
+        with postgres.begin() as conn:
+            conn.execute(insert, {"source": "late.pdf", "content": "late chunk", "embedding": embedding})
+            conn.execute(sa.text("UPDATE documents SET content = 'edited' WHERE source = 'doc-1.pdf'"))
+            conn.execute(sa.text("DELETE FROM documents WHERE source = 'doc-2.pdf'"))
+        build_indexes(table)
+
+    monkeypatch.setattr(split, "_create_chunk_indexes", build_while_writing)
+    run_migrations(postgres, migrations, "d41f7a3c9e20", start="9b4d2e6f8a17")
+
+    with postgres.begin() as conn:
+        chunks = conn.execute(sa.text(
+            "SELECT c.id, c.content, d.source FROM chunks AS c JOIN documents AS d ON d.id = c.document_id ORDER BY c.id"
+        )).all()
+        new_id = conn.execute(
+            sa.text(
+                "INSERT INTO chunks (document_id, content, embedding) "
+                "SELECT id, 'after the swap', CAST(:embedding AS vector) FROM documents WHERE source = 'late.pdf' "
+                "RETURNING id"
+            ),
+            {"embedding": embedding},
+        ).scalar()
+    assert [tuple(chunk) for chunk in chunks] == [
+        (1, "chunk 0", "doc-0.pdf"), (2, "edited", "doc-1.pdf"), (4, "late chunk", "late.pdf"),
+    ]
+    # The chunks sequence starts past the ids the mirrored inserts took.
+    assert new_id == 5
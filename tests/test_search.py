@@ -0,0 +1,62 @@
+# tests/test_search.py
+import pytest
+
+from retrieval_service.app.routes import DEFAULT_TOP_K, MAX_TOP_K, parse_top_k
+from retrieval_service.datastore.providers.cloudsql_postgres import _bounded, nearest_sql
+from retrieval_service.embeddings import FakeEmbedder
+
+from .conftest import make_chunks, unit_vectors
+
+
+@pytest.mark.parametrize("value, expected", [(None, DEFAULT_TOP_K), ("7", 7), (" 12 ", 12), (1, 1), (MAX_TOP_K, MAX_TOP_K)])
+def test_parse_top_k_accepts(value, expected):
+    assert parse_top_k(value) == expected
+
+
+@pytest.mark.parametrize("value", [0, -1, MAX_TOP_K + 1, "0", "abc", "1.5", "", True, 2.0, [3]])
+def test_parse_top_k_rejects(value):
+    with pytest.raises(ValueError, match="top_k"):
+        parse_top_k(value)
+
+
+def test_bounded_defaults_and_limits():
+    assert _bounded("ef_search", None, 40, 1000) == 40
+    assert _bounded("ef_search", 1000, 40, 1000) == 1000
+    with pytest.raises(ValueError, match="ef_search must be between 1 and 1000"):
+        _bounded("ef_search", 0, 40, 1000)
+
+
+def test_full_precision_search_orders_by_the_indexed_distance():
+    sql = nearest_sql(":embedding", ":top_k", ":rerank_limit", mode="full")
+    # The ORDER BY ... LIMIT shape is what lets the planner use the ANN index.
+    assert "ORDER BY embedding <=> :embedding" in sql
+    assert "LIMIT :top_k" in sql
+
+
+def test_search_returns_nearest_chunks_first(client, datastore):
+    query = "graphene battery electrodes"
+    embeddings = unit_vectors(20)
+    embeddings[13] = FakeEmbedder().embed_query(query)
+    datastore.initialize_data(make_chunks(20, embeddings=embeddings))
+
+    response = client.get("/documents/search", query_string={"query": query, "top_k": 5})
+
+    assert response.status_code == 200
+    hits = response.get_json()
+    assert len(hits) == 5
+    assert hits[0]["source"] == "doc-13.pdf"
+    assert hits[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+    assert [hit["distance"] for hit in hits] == sorted(hit["distance"] for hit in hits)
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"query": "q", "top_k": 0},
+    {"query": "q", "top_k": MAX_TOP_K + 1},
+    {"query": "q", "ef_search": "abc"},
+    {"query": "q", "probes": "1.5"},
+])
+def test_search_rejects_bad_parameters(client, datastore, params):
+    response = client.get("/documents/search", query_string=params)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
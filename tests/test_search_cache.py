@@ -0,0 +1,75 @@
+# tests/test_search_cache.py
+import numpy as np
+import pytest
+
+from retrieval_service.app import routes
+from retrieval_service.search_cache import LRUBackend, SearchResultCache
+
+from .conftest import make_chunks
+
+HITS = [{"id": 1, "distance": 0.1}]
+
+
+def test_results_are_keyed_by_normalized_query_top_k_filters_and_version():
+    cache = SearchResultCache(LRUBackend())
+    cache.put("Solar  Cells", 3, {"mode": "vector"}, 7, HITS)
+
+    assert cache.get("solar cells", 3, {"mode": "vector"}, 7) == HITS
+    assert cache.get("solar cells", 4, {"mode": "vector"}, 7) is None
+    assert cache.get("solar cells", 3, {"mode": "hybrid"}, 7) is None
+    # A new corpus version makes every older entry unreachable.
+    assert cache.get("solar cells", 3, {"mode": "vector"}, 8) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_backend_evicts_the_oldest_entry():
+    backend = LRUBackend(max_entries=2)
+    backend.set("a", HITS)
+    backend.set("b", HITS)
+    backend.get("a")
+    backend.set("c", HITS)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == HITS and backend.get("c") == HITS
+
+
+def test_near_duplicate_queries_share_results():
+    cache = SearchResultCache(LRUBackend(), near_duplicate_distance=0.05)
+    base = np.zeros(8)
+    base[0] = 1.0
+    close, far = base.copy(), base.copy()
+    close[1], far[1] = 0.1, 1.0
+    cache.put("first", 3, None, 1, HITS, base.tolist())
+
+    assert cache.get_near(close.tolist(), 3, None, 1) == HITS
+    assert cache.get_near(far.tolist(), 3, None, 1) is None
+    assert cache.get_near(close.tolist(), 3, None, 2) is None
+    assert cache.stats()["near_duplicate_hits"] == 1
+
+
+def test_near_duplicate_matching_is_off_by_default():
+    cache = SearchResultCache(LRUBackend())
+    cache.put("first", 3, None, 1, HITS, [1.0, 0.0])
+    assert cache.get_near([1.0, 0.0], 3, None, 1) is None
+
+
+@pytest.fixture
+def search_cache(monkeypatch):
+    cache = SearchResultCache(LRUBackend())
+    monkeypatch.setattr(routes, "get_search_cache", lambda: cache)
+    return cache
+
+
+def test_search_is_served_from_the_cache_until_the_corpus_changes(client, datastore, search_cache):
+    datastore.initialize_data(make_chunks(10))
+    params = {"query": "topic 3", "top_k": 2}
+
+    first = client.get("/documents/search", query_string=params).get_json()
+    second = client.get("/documents/search", query_string=params).get_json()
+    assert second == first
+    assert search_cache.stats()["hits"] == 1
+
+    datastore.add_documents(make_chunks(1, seed=1))
+    client.get("/documents/search", query_string=params)
+    assert search_cache.stats()["hits"] == 1
+    assert search_cache.stats()["misses"] >= 2
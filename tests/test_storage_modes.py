@@ -0,0 +1,82 @@
+# tests/test_storage_modes.py
+import pytest
+
+from retrieval_service.datastore.providers import cloudsql_postgres
+from retrieval_service.datastore.providers.cloudsql_postgres import (
+    COMPACT_INDEXES,
+    CloudSQLPostgresDatastore,
+    nearest_sql,
+    search_limits,
+)
+
+
+@pytest.mark.parametrize("mode, operator", [("halfvec", "embedding_half <=>"), ("bit", "embedding_bit <~>")])
+def test_compact_modes_rerank_candidates_on_the_full_vectors(mode, operator):
+    sql = nearest_sql(":embedding", ":top_k", ":rerank_limit", mode=mode)
+
+    select, rest = sql.split("FROM (")
+    inner, outer = rest.split(") AS candidates")
+    # Candidates come from the compact index, rerank_limit of them ...
+    assert f"ORDER BY {operator}" in inner and "LIMIT :rerank_limit" in inner
+    # ... and are ordered by the exact float32 distance.
+    assert "c.embedding <=> :embedding AS distance" in select
+    assert "ORDER BY distance" in outer and "LIMIT :top_k" in outer
+
+
+def test_paged_compact_search_keys_on_the_exact_distance():
+    sql = nearest_sql(":embedding", ":top_k", ":rerank_limit", mode="halfvec", after=(":after_distance", ":after_id"))
+    assert "WHERE (embedding <=> :embedding, id) > (CAST(:after_distance AS double precision)" in sql
+
+
+def test_search_limits_overfetch_only_in_compact_modes(monkeypatch):
+    assert search_limits(10, 40) == (10, 40)
+    assert search_limits(100, 40) == (100, 100)
+
+    monkeypatch.setattr(cloudsql_postgres, "VECTOR_STORAGE_MODE", "bit")
+    monkeypatch.setattr(cloudsql_postgres, "VECTOR_RERANK_FACTOR", 10)
+    assert search_limits(10, 40) == (100, 100)
+    assert search_limits(1000, 40) == (10000, cloudsql_postgres.MAX_EF_SEARCH)
+
+
+class FakeCursor:
+    def __init__(self, connection, index_exists):
+        self.connection, self.index_exists = connection, index_exists
+
+    def execute(self, sql):
+        self.connection.executed.append(sql)
+
+    def fetchone(self):
+        return (self.index_exists,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, index_exists):
+        self.index_exists = index_exists
+        self.executed = []
+        self.rolled_back = False
+
+    def cursor(self):
+        return FakeCursor(self, self.index_exists)
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+@pytest.mark.parametrize("mode", sorted(COMPACT_INDEXES))
+def test_first_connection_checks_the_compact_index(monkeypatch, mode):
+    monkeypatch.setattr(cloudsql_postgres, "VECTOR_STORAGE_MODE", mode)
+    monkeypatch.setattr(
+        cloudsql_postgres, "STORAGE_MODE_CHECK_SQL", f"SELECT to_regclass('{COMPACT_INDEXES[mode]}') IS NOT NULL"
+    )
+
+    present = FakeConnection(index_exists=True)
+    CloudSQLPostgresDatastore._check_storage_mode(None, present, None)
+    assert COMPACT_INDEXES[mode] in present.executed[0] and present.rolled_back
+
+    missing = FakeConnection(index_exists=False)
+    with pytest.raises(RuntimeError, match=COMPACT_INDEXES[mode]):
+        CloudSQLPostgresDatastore._check_storage_mode(None, missing, None)
+    assert missing.rolled_back
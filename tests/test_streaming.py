@@ -0,0 +1,220 @@
+# tests/test_streaming.py
+import os
+import threading
+
+import numpy as np
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from retrieval_service.embeddings import FakeEmbedder
+from retrieval_service.ingestion import pipeline
+from retrieval_service.ingestion.artifacts import (
+    EMBEDDINGS_FILE,
+    VERSION_SUFFIX,
+    ArtifactWriter,
+    iter_artifact_batches,
+    read_artifact,
+    write_artifact,
+)
+from retrieval_service.ingestion.incremental import JOURNAL_FILE, ChunkSpool, fold_spool
+from retrieval_service.ingestion.manifest import IngestionManifest
+from retrieval_service.ingestion.streaming import StreamingSplitter, threaded
+
+from .conftest import page_text, unit_vectors, write_pdf
+
+SETTINGS = {"chunk_size": 200, "chunk_overlap": 20, "extractor": "papers"}
+
+
+def _chunks(filename: str, count: int) -> list[dict]:
+    return [
+        {"source_filename": filename, "title": filename, "authors": None, "publication_date": None,
+         "content": f"{filename} chunk {i}"}
+        for i in range(count)
+    ]
+
+
+def test_short_documents_split_as_if_joined():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20)
+    pages = [page_text(topic, 4) for topic in ("rivers", "lakes", "seas")]
+    streaming = StreamingSplitter(splitter, flush_chars=10000)
+
+    chunks = [chunk for page in pages for chunk in streaming.feed(page)] + streaming.close()
+
+    assert chunks == splitter.split_text(" ".join(pages))
+
+
+def test_long_documents_are_split_as_pages_arrive():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20)
+    pages = [page_text(f"topic{i}", 6) for i in range(20)]
+    streaming = StreamingSplitter(splitter, flush_chars=1000)
+
+    emitted = [streaming.feed(page) for page in pages]
+    chunks = [chunk for batch in emitted for chunk in batch] + streaming.close()
+
+    # Chunks come out before the last page is read.
+    assert any(emitted[:-1])
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    text = " ".join(chunks)
+    assert all(f"topic{i}." in text for i in range(20))
+
+
+def test_threaded_stage_keeps_order_and_bounds_run_ahead():
+    produced = []
+
+    def items():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    results = []
+    for value in threaded(items(), lambda i: i * 2, maxsize=2):
+        # The producer is at most the queue, the item being put and the one
+        # just taken ahead of the consumer.
+        assert len(produced) - len(results) <= 4
+        results.append(value)
+
+    assert results == [i * 2 for i in range(50)]
+
+
+def test_threaded_stage_reraises_and_stops_when_abandoned():
+    def failing(i):
+        if i == 3:
+            raise ValueError("bad item")
+        return i
+
+    with pytest.raises(ValueError, match="bad item"):
+        list(threaded(range(10), failing))
+
+    before = threading.active_count()
+    stage = threaded(iter(range(1000)), maxsize=1)
+    assert next(stage) == 0
+    stage.close()
+    assert threading.active_count() == before
+
+
+def test_spool_commits_whole_files_and_survives_a_crash(tmp_path):
+    artifact = str(tmp_path / "processed")
+    spool = ChunkSpool(artifact, SETTINGS, "model")
+    a, b = _chunks("a.pdf", 3), _chunks("b.pdf", 2)
+    vectors = unit_vectors(5)
+    # a.pdf ends in the first part; b.pdf has a chunk that failed to embed.
+    spool.append(a + b[:1], list(vectors[:4]), [("a.pdf", "sha-a", {})])
+    spool.append(b[1:], [None], [("b.pdf", "sha-b", {})])
+    spool.close()
+    with open(os.path.join(artifact + ".spool", JOURNAL_FILE), "a") as f:
+        f.write('{"filename": "torn')
+
+    reopened = ChunkSpool(artifact, SETTINGS, "model")
+
+    assert reopened.is_current("a.pdf", "sha-a")
+    assert not reopened.is_current("a.pdf", "sha-changed")
+    assert not reopened.is_current("b.pdf", "sha-b")
+    assert not ChunkSpool(artifact, {**SETTINGS, "chunk_size": 500}, "model").is_current("a.pdf", "sha-a")
+    batches = list(reopened.iter_batches({"a.pdf"}))
+    assert [c["content"] for metadata, _ in batches for c in metadata] == [c["content"] for c in a]
+    np.testing.assert_array_equal(np.concatenate([m for _, m in batches]), vectors[:3])
+
+
+def test_fold_carries_unchanged_files_and_removes_the_spool(tmp_path):
+    artifact = str(tmp_path / "processed")
+    old = _chunks("keep.pdf", 2) + _chunks("changed.pdf", 2) + _chunks("deleted.pdf", 1)
+    write_artifact(artifact, old, unit_vectors(5))
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    for filename in ("keep.pdf", "changed.pdf", "deleted.pdf"):
+        manifest.record(filename, f"sha-{filename}", SETTINGS, "model", chunks=1)
+    spool = ChunkSpool(artifact, SETTINGS, "model")
+    spool.append(_chunks("changed.pdf", 3), list(unit_vectors(3, seed=1)), [("changed.pdf", "sha-new", {})])
+
+    fold_spool(artifact, manifest, spool, {"keep.pdf"}, {"keep.pdf": "sha-keep.pdf", "changed.pdf": "sha-new"})
+
+    metadata, embeddings = read_artifact(artifact)
+    assert [c["content"] for c in metadata] == [
+        "keep.pdf chunk 0", "keep.pdf chunk 1", "changed.pdf chunk 0", "changed.pdf chunk 1", "changed.pdf chunk 2",
+    ]
+    np.testing.assert_array_equal(embeddings[:2], unit_vectors(5)[:2])
+    assert not os.path.exists(artifact + ".spool")
+    assert sorted(manifest.files) == ["changed.pdf", "keep.pdf"]
+    assert manifest.files["changed.pdf"]["sha256"] == "sha-new"
+
+
+def test_interrupted_run_resumes_from_the_spool(tmp_path, monkeypatch):
+    pdfs, artifact = tmp_path / "pdfs", str(tmp_path / "processed")
+    os.makedirs(pdfs)
+    write_pdf(pdfs / "a.pdf", [page_text("rivers")])
+    write_pdf(pdfs / "b.pdf", [page_text("volcanoes")])
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    run = lambda cache: pipeline.run_pipeline(
+        str(pdfs), artifact, "papers", FakeEmbedder(), "fake-embedder",
+        chunker={**SETTINGS, "splitter": "RecursiveCharacterTextSplitter"}, cache_path=str(tmp_path / cache),
+        workers=1,
+    )
+    monkeypatch.setattr(pipeline, "fold_spool", crash)
+    with pytest.raises(KeyboardInterrupt):
+        run("first.sqlite")
+    monkeypatch.undo()
+
+    stats = run("second.sqlite")
+
+    assert (stats.resumed, stats.files) == (2, 0)
+    metadata, _ = read_artifact(artifact)
+    assert {c["source_filename"] for c in metadata} == {"a.pdf", "b.pdf"}
+
+
+def test_rewrites_publish_atomically_and_clean_up(tmp_path):
+    path = str(tmp_path / "artifact")
+    write_artifact(path, _chunks("a.pdf", 2), unit_vectors(2))
+    first_version = os.path.realpath(path)
+
+    writer = ArtifactWriter(path, 3, unit_vectors(1).shape[1])
+    writer.append(_chunks("b.pdf", 3), unit_vectors(3, seed=1))
+    # Until close() readers still see the previous artifact.
+    assert [c["source_filename"] for c in read_artifact(path)[0]] == ["a.pdf", "a.pdf"]
+    writer.close()
+
+    assert [c["source_filename"] for c in read_artifact(path)[0]] == ["b.pdf"] * 3
+    assert os.path.islink(path) and not os.path.exists(first_version)
+    assert sorted(os.listdir(tmp_path)) == sorted(["artifact", os.path.basename(os.path.realpath(path))])
+
+
+def test_failed_writes_leave_the_previous_artifact(tmp_path):
+    path = str(tmp_path / "artifact")
+    write_artifact(path, _chunks("a.pdf", 2), unit_vectors(2))
+
+    with pytest.raises(ValueError, match="Expected 3 rows"):
+        with ArtifactWriter(path, 3, unit_vectors(1).shape[1]) as writer:
+            writer.append(_chunks("b.pdf", 2), unit_vectors(2))
+    with pytest.raises(RuntimeError):
+        with ArtifactWriter(path, 1, unit_vectors(1).shape[1]):
+            raise RuntimeError("crashed")
+
+    assert [c["source_filename"] for c in read_artifact(path)[0]] == ["a.pdf", "a.pdf"]
+    assert len([name for name in os.listdir(tmp_path) if VERSION_SUFFIX in name]) == 1
+
+
+def test_an_unversioned_artifact_is_replaced(tmp_path):
+    path = str(tmp_path / "artifact")
+    write_artifact(path, _chunks("a.pdf", 1), unit_vectors(1))
+    # An artifact from before versioned directories is a plain directory.
+    real = os.path.realpath(path)
+    os.remove(path)
+    os.rename(real, path)
+
+    write_artifact(path, _chunks("b.pdf", 1), unit_vectors(1))
+
+    assert os.path.islink(path)
+    assert read_artifact(path)[0][0]["source_filename"] == "b.pdf"
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_inconsistent_artifacts_are_rejected(tmp_path):
+    path = str(tmp_path / "artifact")
+    write_artifact(path, _chunks("a.pdf", 3), unit_vectors(3))
+    np.save(os.path.join(path, EMBEDDINGS_FILE), unit_vectors(2))
+
+    with pytest.raises(ValueError, match="inconsistent"):
+        read_artifact(path)
+    with pytest.raises(ValueError, match="inconsistent"):
+        list(iter_artifact_batches(path))
@@ -0,0 +1,72 @@
+# tests/test_upload.py
+import io
+import os
+
+import pytest
+
+from retrieval_service import jobs, worker
+from retrieval_service.app import routes
+
+from .conftest import page_text, write_pdf
+
+
+@pytest.fixture
+def runner(app, monkeypatch, tmp_path):
+    """A job runner that is not started: tests run its jobs with drain()."""
+    monkeypatch.setattr(worker, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    runner = jobs.JobRunner(worker.process_job, workers=1, poll_seconds=0.01)
+    monkeypatch.setattr(routes, "get_job_runner", lambda: runner)
+    return runner
+
+
+def test_upload_stages_each_file_and_queues_a_pinned_job(client, datastore, runner):
+    response = client.post(
+        "/documents/upload",
+        data={"files": [(io.BytesIO(b"%PDF one"), "a.pdf"), (io.BytesIO(b"%PDF two"), "../b.pdf")]},
+    )
+
+    assert response.status_code == 202
+    queued = response.get_json()["jobs"]
+    assert [job["filename"] for job in queued] == ["a.pdf", "b.pdf"]
+    assert all(job["status"] == "queued" for job in queued)
+    for job, body in zip(queued, [b"%PDF one", b"%PDF two"]):
+        with open(worker.local_path(job["source_uri"]), "rb") as f:
+            assert f.read() == body
+        assert datastore.get_job(job["id"])["host"] == jobs.HOST
+
+
+def test_uploaded_pdf_is_ingested_and_searchable(client, runner, tmp_path):
+    write_pdf(tmp_path / "glaciers.pdf", [page_text("glaciers")], title="Glaciers")
+    with open(tmp_path / "glaciers.pdf", "rb") as f:
+        job = client.post("/documents/upload", data={"file": (f, "glaciers.pdf")}).get_json()["jobs"][0]
+
+    runner.drain()
+
+    status = client.get(f"/jobs/{job['id']}").get_json()
+    assert status["status"] == "stored" and status["chunks"] > 0 and status["attempts"] == 1
+    # The staged copy is removed once the job has run.
+    assert not os.path.exists(worker.local_path(job["source_uri"]))
+    results = client.get("/documents/search", query_string={"query": page_text("glaciers")[:200]}).get_json()
+    assert results and results[0]["source"] == "glaciers.pdf"
+
+
+def test_failed_jobs_record_the_error(client, runner):
+    job = client.post("/documents/upload", data={"file": (io.BytesIO(b"not a pdf"), "broken.pdf")}).get_json()["jobs"][0]
+
+    runner.drain()
+
+    status = client.get(f"/jobs/{job['id']}").get_json()
+    assert status["status"] == "failed" and status["error"]
+    listing = client.get("/jobs", query_string={"status": "failed"}).get_json()
+    assert [listed["id"] for listed in listing["jobs"]] == [job["id"]]
+    assert listing["counts"] == {"failed": 1}
+
+
+def test_upload_and_job_errors(client, runner):
+    assert client.post("/documents/upload", data={}).status_code == 400
+    response = client.post(
+        "/documents/upload?extractor=unknown", data={"file": (io.BytesIO(b"%PDF"), "a.pdf")}
+    )
+    assert response.status_code == 400
+    assert client.get("/jobs/does-not-exist").status_code == 404
+    assert client.get("/jobs?status=bogus").status_code == 400